@@ -0,0 +1,110 @@
+"""
+Payload size and server CPU per response for compression and MessagePack.
+
+    python benchmarks/bench_compress.py --page 100 --rounds 200
+
+Fetches a /companies page and user0's /shortlists page (the joined documents the mobile
+list screens load) from the in-process app on the `manage.py seed-scale` dataset in --db,
+then encodes each body every way the server can send it: JSON or MessagePack, each
+uncompressed, gzip at --gzip-levels and brotli at --brotli-qualities. CPU is process time
+per response for serialization plus compression, averaged over --rounds. The last table
+times whole requests over the ASGI transport per Accept-Encoding, so middleware cost is
+included; requests are sequential to keep per-request CPU attributable.
+"""
+import sys
+import gzip
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+import manage  # noqa: E402
+import compress  # noqa: E402
+import serialize  # noqa: E402
+import synthetic  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def cpu_ms(fn, rounds):
+    t = time.process_time()
+    for _ in range(rounds): out = fn()
+    return (time.process_time() - t) / rounds * 1000, out
+
+
+def encodings(args):
+    # name -> (serializer, compressor or None)
+    out = {}
+    formats = {"json": serialize.dumps, **({"msgpack": serialize.packb} if serialize.msgpack else {})}
+    for fmt, dumps in formats.items():
+        out[fmt] = (dumps, None)
+        for level in args.gzip_levels:
+            out[f"{fmt}+gzip-{level}"] = (dumps, lambda b, level=level: gzip.compress(b, level, mtime=0))
+        if compress.brotli:
+            for q in args.brotli_qualities:
+                out[f"{fmt}+br-{q}"] = (dumps, lambda b, q=q: compress.brotli.compress(b, quality=q))
+    return out
+
+
+async def request_cpu(http, path, params, headers, rounds):
+    size, t = 0, time.process_time()
+    for _ in range(rounds):
+        r = await http.get(path, params=params, headers=headers)
+        r.raise_for_status()
+        size += int(r.headers.get("content-length", len(r.content)))
+    return size / rounds, (time.process_time() - t) / rounds * 1000
+
+
+async def main(args):
+    args.gzip_levels = [int(x) for x in args.gzip_levels.split(",")]
+    args.brotli_qualities = [int(x) for x in args.brotli_qualities.split(",")]
+    server.db = server.client[args.db]
+    seeded = await manage.seed_scale(argparse.Namespace(expos=args.expos, companies_per_expo=args.companies_per_expo,
+                                                        users=args.users, seed=args.seed, batch=5_000))
+    print(f"dataset: {seeded['status']} (seed {args.seed}, db {args.db}); brotli: {'yes' if compress.brotli else 'no'}, "
+          f"msgpack: {'yes' if serialize.msgpack else 'no'}, orjson: {'yes' if serialize.orjson else 'no'}")
+    lists = {"companies": ("/api/companies", {"limit": args.page, "expo_id": synthetic.make_id(args.seed, "expo", 0)}),
+             "shortlists": ("/api/shortlists", {"limit": args.page})}
+    bodies, e2e = {}, {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench") as http:
+            r = await http.post("/api/auth/login", json={"email": "user0@synthetic.expointel.com", "password": synthetic.PASSWORD})
+            auth = {"Authorization": f"Bearer {r.json()['token']}"}
+            accepts = {"identity": "identity", "gzip": "gzip", **({"br": "br"} if compress.brotli else {})}
+            for name, (path, params) in lists.items():
+                bodies[name] = (await http.get(path, params=params, headers={**auth, "Accept-Encoding": "identity"})).json()
+                for label, enc in accepts.items():
+                    await request_cpu(http, path, params, {**auth, "Accept-Encoding": enc}, 3)  # warm up
+                    e2e[(name, label)] = await request_cpu(http, path, params, {**auth, "Accept-Encoding": enc}, args.requests)
+    finally:
+        server.PASSWORD_POOL.shutdown()
+        server.client.close()
+    for name, body in bodies.items():
+        base = len(serialize.dumps(body))
+        print(f"\n{name} ({len(body)} rows)\n{'encoding':<16} {'bytes':>9} {'ratio':>7} {'cpu/resp':>10}")
+        for label, (dumps, squeeze) in encodings(args).items():
+            ms, out = cpu_ms(lambda: squeeze(dumps(body)) if squeeze else dumps(body), args.rounds)
+            print(f"{label:<16} {len(out):>9} {len(out) / base:>6.1%} {ms:>8.3f}ms")
+    print(f"\n{'request':<24} {'wire bytes':>11} {'cpu/request':>12}")
+    for (name, label), (size, ms) in e2e.items():
+        print(f"{name + ' ' + label:<24} {size:>11.0f} {ms:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default="expointel_bench")
+    ap.add_argument("--expos", type=int, default=20)
+    ap.add_argument("--companies-per-expo", type=int, default=5_000)
+    ap.add_argument("--users", type=int, default=1_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--page", type=int, default=100)
+    ap.add_argument("--rounds", type=int, default=200, help="encodings per measurement")
+    ap.add_argument("--requests", type=int, default=100, help="requests per endpoint and Accept-Encoding")
+    ap.add_argument("--gzip-levels", default="1,6,9")
+    ap.add_argument("--brotli-qualities", default="1,4,11")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,191 @@
+"""
+Endpoint benchmark: latency percentiles, throughput and Mongo ops per request.
+
+    python benchmarks/bench_endpoints.py --out before.json
+    python benchmarks/bench_endpoints.py --out after.json --compare before.json
+    python benchmarks/bench_endpoints.py --url http://127.0.0.1:8001 --out uvicorn.json
+
+By default the FastAPI app is driven in-process over an ASGI transport and every Mongo
+command is counted with a command listener. With --url the requests go to a running
+server (e.g. `uvicorn server:app --port 8001` with DB_NAME set to --db) and Mongo
+ops are taken from the serverStatus opcounters delta, which includes any other traffic.
+
+The dataset is the deterministic `manage.py seed-scale` one; it is created in --db first
+if missing (--expos/--companies-per-expo/--users). Each workload runs --requests requests
+(--login-requests for /auth/login) at --concurrency, spread over --tokens synthetic users.
+Results are written as JSON; --compare prints the change against an earlier run and exits
+non-zero when a p95 or throughput regression exceeds --threshold percent.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from datetime import datetime, timezone
+
+import httpx
+from pymongo import monitoring
+from motor.motor_asyncio import AsyncIOMotorClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+import manage  # noqa: E402
+import synthetic  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+IGNORED_COMMANDS = ("ping", "endSessions", "serverStatus", "hello", "isMaster")
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts commands sent by the in-process app"""
+    def __init__(self):
+        self.count = 0
+    def started(self, event):
+        if event.command_name not in IGNORED_COMMANDS: self.count += 1
+    def succeeded(self, event): pass
+    def failed(self, event): pass
+
+
+def pct(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] if s else 0.0
+
+
+def workloads(args):
+    # name -> (request count, fn(rng, token) -> (method, path, kwargs))
+    expo_ids = [synthetic.make_id(args.seed, "expo", i) for i in range(args.expos)]
+    page = {"limit": args.page}
+    login = lambda rng, tok: ("POST", "/api/auth/login", {"json": {
+        "email": f"user{rng.randrange(args.tokens)}@synthetic.expointel.com", "password": synthetic.PASSWORD}})
+    return {
+        "companies": (args.requests, lambda rng, tok: ("GET", "/api/companies", {"params": {**page, "expo_id": rng.choice(expo_ids)}})),
+        "shortlists": (args.requests, lambda rng, tok: ("GET", "/api/shortlists", {"params": page})),
+        "networks": (args.requests, lambda rng, tok: ("GET", "/api/networks", {"params": page})),
+        "expo-days": (args.requests, lambda rng, tok: ("GET", "/api/expo-days", {"params": page})),
+        "export/shortlists": (args.requests, lambda rng, tok: ("GET", "/api/export/shortlists", {"params": {"stream": True}})),
+        "export/networks": (args.requests, lambda rng, tok: ("GET", "/api/export/networks", {"params": {"stream": True}})),
+        "export/expo-days": (args.requests, lambda rng, tok: ("GET", "/api/export/expo-days", {"params": {"stream": True}})),
+        "auth/login": (args.login_requests, login),
+    }
+
+
+async def mongo_ops(counter, admin):
+    if counter is not None: return counter.count
+    ops = (await admin.command("serverStatus"))["opcounters"]
+    return sum(ops.get(k, 0) for k in ("query", "insert", "update", "delete", "getmore", "command"))
+
+
+async def run_workload(http, name, count, make, tokens, args, counter, admin):
+    rng, latencies, statuses, sizes = random.Random(f"{args.seed}:{name}"), [], {}, 0
+    plan = [make(rng, rng.choice(tokens)) + (rng.choice(tokens),) for _ in range(count)]
+    queue = iter(plan)
+    async def worker():
+        nonlocal sizes
+        for method, path, kwargs, tok in queue:
+            t = time.perf_counter()
+            r = await http.request(method, path, headers={"Authorization": f"Bearer {tok}"}, **kwargs)
+            latencies.append((time.perf_counter() - t) * 1000)
+            statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+            sizes += len(r.content)
+    ops0, t0 = await mongo_ops(counter, admin), time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(args.concurrency, count))])
+    elapsed, ops = time.perf_counter() - t0, await mongo_ops(counter, admin) - ops0
+    return {"requests": count, "errors": sum(n for code, n in statuses.items() if code >= 400), "statuses": statuses,
+            "p50_ms": round(pct(latencies, 50), 2), "p95_ms": round(pct(latencies, 95), 2),
+            "p99_ms": round(pct(latencies, 99), 2), "max_ms": round(max(latencies), 2),
+            "rps": round(count / elapsed, 1), "mongo_ops_per_req": round(ops / count, 2),
+            "bytes_per_req": round(sizes / count)}
+
+
+def git_rev():
+    try: return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL,
+                                       cwd=Path(__file__).parent).strip()
+    except Exception: return None
+
+
+def compare(old, new, threshold):
+    # Returns the workloads whose p95 grew or throughput dropped by more than `threshold` percent
+    change = lambda a, b: (b - a) / a * 100 if a else 0.0
+    print(f"\n{'workload':<20} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9} {'ops/req':>9}")
+    regressions = []
+    for name, r in new["results"].items():
+        o = old["results"].get(name)
+        if not o: continue
+        d = {k: change(o[k], r[k]) for k in ("p50_ms", "p95_ms", "p99_ms", "rps", "mongo_ops_per_req")}
+        print(f"{name:<20} {d['p50_ms']:>+8.1f}% {d['p95_ms']:>+8.1f}% {d['p99_ms']:>+8.1f}% {d['rps']:>+8.1f}% "
+              f"{d['mongo_ops_per_req']:>+8.1f}%")
+        if d["p95_ms"] > threshold or d["rps"] < -threshold: regressions.append(name)
+    return regressions
+
+
+async def main(args):
+    counter = admin_client = None
+    if args.url:
+        transport, base_url = None, args.url
+        admin_client = AsyncIOMotorClient(os.environ["MONGO_URL"])
+        admin = admin_client.admin
+    else:
+        counter = CommandCounter()
+        admin_client = AsyncIOMotorClient(os.environ["MONGO_URL"], event_listeners=[counter])
+        transport, base_url, admin = httpx.ASGITransport(app=server.app), "http://bench", None
+    server.db = admin_client[args.db]
+    try:
+        seeded = await manage.seed_scale(argparse.Namespace(expos=args.expos, companies_per_expo=args.companies_per_expo,
+                                                            users=args.users, seed=args.seed, batch=5_000))
+        print(f"dataset: {seeded['status']} (seed {args.seed}, db {args.db})")
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=120) as http:
+            tokens = []
+            for i in range(args.tokens):
+                r = await http.post("/api/auth/login", json={"email": f"user{i}@synthetic.expointel.com", "password": synthetic.PASSWORD})
+                r.raise_for_status()
+                tokens.append(r.json()["token"])
+            results = {}
+            print(f"{'workload':<20} {'reqs':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'rps':>8} {'ops/req':>8}")
+            for name, (count, make) in workloads(args).items():
+                if args.only and name not in args.only.split(","): continue
+                r = results[name] = await run_workload(http, name, count, make, tokens, args, counter, admin)
+                print(f"{name:<20} {r['requests']:>6} {r['errors']:>4} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8} "
+                      f"{r['rps']:>8} {r['mongo_ops_per_req']:>8}")
+    finally:
+        server.PASSWORD_POOL.shutdown()
+        admin_client.close()
+        server.client.close()
+    run = {"meta": {"at": datetime.now(timezone.utc).isoformat(), "git": git_rev(), "target": args.url or "asgi",
+                    "python": platform.python_version(), "cpus": os.cpu_count(),
+                    "args": {k: v for k, v in vars(args).items() if k not in ("out", "compare")}},
+           "results": results}
+    if args.out:
+        Path(args.out).write_text(json.dumps(run, indent=2))
+        print(f"saved {args.out}")
+    if args.compare:
+        regressions = compare(json.loads(Path(args.compare).read_text()), run, args.threshold)
+        if regressions:
+            print(f"regressions over {args.threshold}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    ap.add_argument("--db", default="expointel_bench", help="database holding the synthetic dataset")
+    ap.add_argument("--expos", type=int, default=20)
+    ap.add_argument("--companies-per-expo", type=int, default=5_000)
+    ap.add_argument("--users", type=int, default=1_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--tokens", type=int, default=50, help="distinct users making requests")
+    ap.add_argument("--requests", type=int, default=500)
+    ap.add_argument("--login-requests", type=int, default=50)
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--page", type=int, default=100, help="limit for list endpoints")
+    ap.add_argument("--only", help="comma-separated workload names")
+    ap.add_argument("--out", help="write results JSON here")
+    ap.add_argument("--compare", help="earlier results JSON to diff against")
+    ap.add_argument("--threshold", type=float, default=10.0, help="regression threshold in percent")
+    sys.exit(asyncio.run(main(ap.parse_args())))
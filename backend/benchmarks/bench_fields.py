@@ -0,0 +1,94 @@
+"""
+Bytes and CPU saved per response by fields= sparse fieldsets and the orjson fast path.
+
+    python benchmarks/bench_fields.py --requests 200 --page 100
+
+Drives the in-process app over an ASGI transport on the `manage.py seed-scale` dataset in
+--db, logged in as user0 (the synthetic admin, whose Pareto-drawn activity is the largest).
+Each list endpoint is requested with its full documents and with the fieldset a list screen
+needs; requests are sequential so process CPU time per request is attributable. The second
+table encodes the full response bodies with FastAPI's default path (jsonable_encoder +
+json.dumps) and with serialize.dumps, the serializer FastJSONRoute uses.
+"""
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+
+import httpx
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+import manage  # noqa: E402
+import serialize  # noqa: E402
+import synthetic  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+FIELDSETS = {
+    "companies": "name,booth,revenue",
+    "shortlists": "notes,company.name,company.booth,company.revenue",
+    "networks": "status,contact_name,scheduled_time,company.name",
+    "expo-days": "time_slot,status,company.name,company.booth",
+}
+
+
+async def measure(http, path, params, headers, requests):
+    size, cpu, wall = 0, time.process_time(), time.perf_counter()
+    for _ in range(requests):
+        r = await http.get(path, params=params, headers=headers)
+        r.raise_for_status()
+        size += len(r.content)
+    return size / requests, (time.process_time() - cpu) / requests * 1000, (time.perf_counter() - wall) / requests * 1000, r.json()
+
+
+def encode_ms(fn, body, rounds):
+    t = time.process_time()
+    for _ in range(rounds): fn(body)
+    return (time.process_time() - t) / rounds * 1000
+
+
+async def main(args):
+    server.db = server.client[args.db]
+    seeded = await manage.seed_scale(argparse.Namespace(expos=args.expos, companies_per_expo=args.companies_per_expo,
+                                                        users=args.users, seed=args.seed, batch=5_000))
+    print(f"dataset: {seeded['status']} (seed {args.seed}, db {args.db}); orjson: {'yes' if serialize.orjson else 'no'}")
+    expo_id = synthetic.make_id(args.seed, "expo", 0)
+    bodies = {}
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench") as http:
+            r = await http.post("/api/auth/login", json={"email": "user0@synthetic.expointel.com", "password": synthetic.PASSWORD})
+            headers = {"Authorization": f"Bearer {r.json()['token']}"}
+            print(f"\n{'endpoint':<12} {'bytes full':>11} {'bytes sparse':>13} {'saved':>7} {'cpu full':>9} {'cpu sparse':>11} {'wall full':>10} {'wall sparse':>12}")
+            for name, fields in FIELDSETS.items():
+                path, params = f"/api/{name}", {"limit": args.page, **({"expo_id": expo_id} if name == "companies" else {})}
+                await measure(http, path, params, headers, 5)  # warm caches and connections
+                full = await measure(http, path, params, headers, args.requests)
+                sparse = await measure(http, path, {**params, "fields": fields}, headers, args.requests)
+                bodies[name] = full[3]
+                print(f"{name:<12} {full[0]:>11.0f} {sparse[0]:>13.0f} {(1 - sparse[0] / full[0]) * 100 if full[0] else 0:>6.1f}% "
+                      f"{full[1]:>7.2f}ms {sparse[1]:>9.2f}ms {full[2]:>8.2f}ms {sparse[2]:>10.2f}ms")
+    finally:
+        server.PASSWORD_POOL.shutdown()
+        server.client.close()
+    default = lambda body: json.dumps(jsonable_encoder(body)).encode()
+    print(f"\n{'endpoint':<12} {'rows':>6} {'jsonable_encoder':>17} {'serialize.dumps':>16} {'speedup':>8}")
+    for name, body in bodies.items():
+        slow, fast = encode_ms(default, body, args.encode_rounds), encode_ms(serialize.dumps, body, args.encode_rounds)
+        print(f"{name:<12} {len(body):>6} {slow:>15.3f}ms {fast:>14.3f}ms {slow / fast if fast else 0:>7.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default="expointel_bench")
+    ap.add_argument("--expos", type=int, default=20)
+    ap.add_argument("--companies-per-expo", type=int, default=5_000)
+    ap.add_argument("--users", type=int, default=1_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--requests", type=int, default=200, help="requests per endpoint and fieldset")
+    ap.add_argument("--page", type=int, default=100)
+    ap.add_argument("--encode-rounds", type=int, default=500)
+    asyncio.run(main(ap.parse_args()))
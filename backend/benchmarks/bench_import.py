@@ -0,0 +1,93 @@
+"""
+CSV import benchmark: single-threaded parse vs multi-core chunked parse.
+
+    python benchmarks/bench_import.py --rows 1000000
+    python benchmarks/bench_import.py --rows 1000000 --mongo   # include real writes
+
+Writes a synthetic CSV to a temp file, then imports it with importer.import_csv (one
+thread parses, normalizes and writes) and with importer.import_csv_parallel (chunks
+parsed in a process pool, one writer). Without --mongo the writer is a null collection,
+so the numbers isolate parse + normalize + prepare cost; with --mongo both runs write to
+a scratch database on MONGO_URL that is dropped afterwards.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import bson
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+import importer  # noqa: E402
+from workers import BoundedPool  # noqa: E402
+from bench_search import WORDS, INDUSTRIES, CITIES, FIRST, LAST  # noqa: E402
+
+
+class NullCollection:
+    """Encodes writes to BSON like the driver would, then drops them."""
+
+    async def insert_many(self, docs, ordered=True):
+        for d in docs: bson.encode(d)
+        return SimpleNamespace(inserted_ids=[None] * len(docs))
+
+
+def write_csv(path, rows, seed):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.writer(f)
+        w.writerow(["name", "HQ", "revenue", "booth", "industry", "contacts"])
+        for i in range(rows):
+            w.writerow([f"{rng.choice(WORDS)} {rng.choice(WORDS)} {i}", rng.choice(CITIES), f"€{rng.randint(1, 400000):,}M",
+                        f"Hall {rng.randint(1, 20)} {rng.randint(100, 999)}", rng.choice(INDUSTRIES),
+                        json.dumps([{"name": f"{rng.choice(FIRST)} {rng.choice(LAST)}", "role": "Sales"}])])
+
+
+async def run(label, coro):
+    t = time.perf_counter()
+    stats = await coro
+    stats = stats[0] if isinstance(stats, tuple) else stats
+    secs = time.perf_counter() - t
+    print(f"{label:<24} {stats['rows']:>10,} {stats['inserted']:>10,} {secs:>8.2f} {stats['rows'] / secs:>12,.0f}")
+    return stats["rows"] / secs
+
+
+async def main(args):
+    fd, path = tempfile.mkstemp(prefix="bench-import-", suffix=".csv")
+    os.close(fd)
+    name = f"expointel_bench_import_{os.getpid()}"
+    pool = BoundedPool("csv-parse", kind="process", workers=args.workers)
+    try:
+        t = time.perf_counter()
+        write_csv(path, args.rows, args.seed)
+        print(f"generated {args.rows:,} rows ({os.path.getsize(path) / 1e6:.0f} MB) in {time.perf_counter() - t:.1f}s, "
+              f"{args.workers} workers, pandas={'yes' if importer.pd is not None else 'no'}")
+        coll = lambda suffix: server.client[name][f"companies_{suffix}"] if args.mongo else NullCollection()
+        print(f"{'path':<24} {'rows':>10} {'inserted':>10} {'secs':>8} {'rows/s':>12}")
+        with open(path, encoding="utf-8-sig", newline="") as fh:
+            base = await run("sequential", importer.import_csv(fh, coll("seq"), "bench", prepare=server.prepare_company))
+        fast = await run(f"parallel x{args.workers}", importer.import_csv_parallel(
+            path, coll("par"), "bench", pool, prepare=server.prepare_company, chunk_bytes=args.chunk_mb * 1024 * 1024))
+        print(f"speedup: {fast / base:.2f}x")
+    finally:
+        pool.shutdown()
+        os.unlink(path)
+        if args.mongo: await server.client.drop_database(name)
+        server.client.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--rows", type=int, default=1_000_000)
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("--chunk-mb", type=int, default=4)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--mongo", action="store_true", help="write to a scratch database instead of a null collection")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,87 @@
+"""
+Event-loop responsiveness during a login burst.
+
+    python benchmarks/bench_login.py --logins 50 --kinds inline,thread,process
+
+Drives the FastAPI app in-process over an ASGI transport against a scratch database on
+MONGO_URL. For each password pool kind it fires N concurrent /api/auth/login requests
+while probing /api/health, and reports probe latency percentiles. "inline" reproduces
+the old behaviour of hashing on the event loop.
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+from workers import BoundedPool  # noqa: E402
+
+EMAIL, PASSWORD = "bench-login@expointel.com", "bench-password"
+
+
+def pct(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] if s else 0.0
+
+
+async def probe(http, stop, samples, interval):
+    # Latency is measured from when the probe was due, so time spent waiting for a blocked loop counts
+    due = time.perf_counter()
+    while True:
+        await http.get("/api/health")
+        now = time.perf_counter()
+        samples.append((now - due) * 1000)
+        if stop.is_set(): return
+        due = now + interval
+        await asyncio.sleep(interval)
+
+
+async def run_kind(kind, args):
+    server.PASSWORD_POOL.shutdown()
+    server.PASSWORD_POOL = BoundedPool("bcrypt", kind=kind, workers=args.workers)
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        samples, stop = [], asyncio.Event()
+        prober = asyncio.create_task(probe(http, stop, samples, args.interval))
+        t = time.perf_counter()
+        res = await asyncio.gather(*[http.post("/api/auth/login", json={"email": EMAIL, "password": PASSWORD}) for _ in range(args.logins)])
+        elapsed = time.perf_counter() - t
+        stop.set()
+        await prober
+    ok = sum(r.status_code == 200 for r in res)
+    return {"kind": kind, "logins_ok": ok, "logins_per_s": round(args.logins / elapsed, 1), "probes": len(samples),
+            "health_p50_ms": round(statistics.median(samples), 2) if samples else None,
+            "health_p99_ms": round(pct(samples, 99), 2), "health_max_ms": round(max(samples), 2) if samples else None,
+            "pool": server.PASSWORD_POOL.stats()}
+
+
+async def main(args):
+    name = f"expointel_bench_login_{os.getpid()}"
+    server.db = server.client[name]
+    try:
+        await server.db.users.insert_one({"id": "bench-user", "email": EMAIL, "name": "Bench", "role": "user",
+                                          "password_hash": server.hash_pw(PASSWORD)})
+        for kind in args.kinds.split(","):
+            r = await run_kind(kind, args)
+            print(f"{r['kind']:<8} logins ok {r['logins_ok']}/{args.logins}  {r['logins_per_s']:>6}/s  "
+                  f"/health p50 {r['health_p50_ms']} ms  p99 {r['health_p99_ms']} ms  max {r['health_max_ms']} ms  "
+                  f"(max queued {r['pool']['max_queued']})")
+    finally:
+        server.PASSWORD_POOL.shutdown()
+        await server.client.drop_database(name)
+        server.client.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--logins", type=int, default=50)
+    ap.add_argument("--kinds", default="inline,thread,process")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--interval", type=float, default=0.005, help="seconds between health probes")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Overhead of the request instrumentation on hot read paths.
+
+    python benchmarks/bench_metrics.py --rounds 10 --requests 200
+    python benchmarks/bench_metrics.py --without metrics,trace
+
+Drives the in-process app over an ASGI transport on the `manage.py seed-scale` dataset in
+--db and alternates rounds with and without the instrumentation middleware named in
+--without (metrics = Prometheus MetricsMiddleware, trace = dbtrace.TraceMiddleware), so
+drift in the machine or the database hits both sides equally. Requests are sequential to
+measure per-request CPU cost; the overhead is the ratio of median round times.
+"""
+import sys
+import time
+import asyncio
+import logging
+import argparse
+import statistics
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+import manage  # noqa: E402
+import metrics  # noqa: E402
+import dbtrace  # noqa: E402
+import synthetic  # noqa: E402
+
+logging.getLogger("httpx").setLevel(logging.WARNING)
+LAYERS = {"metrics": metrics.MetricsMiddleware, "trace": dbtrace.TraceMiddleware}
+
+
+def set_middleware(all_middleware, without):
+    # Starlette rebuilds its middleware stack on the next request when middleware_stack is None
+    server.app.user_middleware = [m for m in all_middleware if m.cls not in without]
+    server.app.middleware_stack = None
+
+
+async def one_round(http, paths, headers, requests):
+    t = time.perf_counter()
+    for i in range(requests):
+        r = await http.get(paths[i % len(paths)], headers=headers)
+        r.raise_for_status()
+    return (time.perf_counter() - t) / requests * 1000
+
+
+async def main(args):
+    server.db = server.client[args.db]
+    seeded = await manage.seed_scale(argparse.Namespace(expos=args.expos, companies_per_expo=args.companies_per_expo,
+                                                        users=args.users, seed=args.seed, batch=5_000))
+    print(f"dataset: {seeded['status']} (seed {args.seed}, db {args.db})")
+    expo_id, company_id = synthetic.make_id(args.seed, "expo", 0), synthetic.make_id(args.seed, "company", 0, 0)
+    paths = ["/api/expos", f"/api/expos/{expo_id}", f"/api/companies?expo_id={expo_id}&limit=50",
+             f"/api/companies/{company_id}", "/api/shortlists?limit=50"]
+    without = {LAYERS[name] for name in args.without.split(",")}
+    all_middleware = list(server.app.user_middleware)
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://bench") as http:
+            r = await http.post("/api/auth/login", json={"email": "user0@synthetic.expointel.com", "password": synthetic.PASSWORD})
+            headers = {"Authorization": f"Bearer {r.json()['token']}"}
+            await one_round(http, paths, headers, args.requests)  # warm caches and connections
+            on, off = [], []
+            for _ in range(args.rounds):
+                for samples, skip in ((off, without), (on, set())):
+                    set_middleware(all_middleware, skip)
+                    samples.append(await one_round(http, paths, headers, args.requests))
+    finally:
+        set_middleware(all_middleware, set())
+        server.PASSWORD_POOL.shutdown()
+        server.client.close()
+    base, inst = statistics.median(off), statistics.median(on)
+    print(f"without {args.without}: {base:.3f} ms/request")
+    print(f"with {args.without}:    {inst:.3f} ms/request")
+    print(f"overhead: {(inst - base) / base * 100:+.2f}% ({(inst - base) * 1000:+.1f} us/request)")
+    return 0 if (inst - base) / base * 100 <= args.budget else 1
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", default="expointel_bench")
+    ap.add_argument("--expos", type=int, default=20)
+    ap.add_argument("--companies-per-expo", type=int, default=5_000)
+    ap.add_argument("--users", type=int, default=1_000)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--rounds", type=int, default=10)
+    ap.add_argument("--requests", type=int, default=200, help="requests per round")
+    ap.add_argument("--without", default="metrics", help=f"comma-separated layers to toggle: {', '.join(LAYERS)}")
+    ap.add_argument("--budget", type=float, default=2.0, help="exit non-zero above this overhead percent")
+    sys.exit(asyncio.run(main(ap.parse_args())))
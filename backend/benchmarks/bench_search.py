@@ -0,0 +1,93 @@
+"""
+Company search benchmark over a synthetic dataset.
+
+    python benchmarks/bench_search.py --companies 1000000
+
+Loads N synthetic companies into a scratch database on MONGO_URL (dropped afterwards
+unless --keep), then times the legacy substring regex against the indexed prefix and
+fuzzy search paths for a fixed query mix.
+"""
+import os
+import sys
+import time
+import random
+import asyncio
+import argparse
+import statistics
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import server  # noqa: E402
+
+WORDS = ["Global", "Tech", "Systems", "Solutions", "Dynamics", "Networks", "Energy", "Robotics", "Micro", "Data",
+         "Cloud", "Industrial", "Smart", "Digital", "Quantum", "Bio", "Motors", "Logistics", "Labs", "Analytics"]
+INDUSTRIES = ["Electronics", "Smart Home", "Semiconductors", "Telecoms", "Robotics", "Enterprise Software", "FinTech"]
+CITIES = ["Munich, Germany", "Austin, USA", "Seoul, South Korea", "Dubai, UAE", "Espoo, Finland", "Zurich, Switzerland"]
+FIRST = ["Anna", "Klaus", "Sarah", "Wei", "Omar", "Julia", "Erik", "Min-jun", "Sophie", "David"]
+LAST = ["Weber", "Chen", "Park", "Hassan", "Wagner", "Lindberg", "Fischer", "Torres", "Kim", "Laurent"]
+QUERIES = {"prefix": ["glo", "quantum dyn", "robot", "klaus", "munich", "tech sol"],
+           "fuzzy": ["quantim", "robtics", "dynamcs", "analitycs"],
+           "substring": ["glo", "quantum", "robot", "ytics"]}
+
+
+def company(rng, i, expo_ids):
+    return server.prepare_company({
+        "id": f"bench-{i}", "expo_id": rng.choice(expo_ids),
+        "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(WORDS)} {i}",
+        "industry": rng.choice(INDUSTRIES), "hq": rng.choice(CITIES), "revenue": rng.randint(1, 400000),
+        "booth": f"Hall {rng.randint(1, 20)} {rng.randint(100, 999)}", "shortlist_stage": "none",
+        "contacts": [{"name": f"{rng.choice(FIRST)} {rng.choice(LAST)}", "role": "Sales"} for _ in range(rng.randint(1, 3))]})
+
+
+async def load(n, batch, seed):
+    rng = random.Random(seed)
+    expo_ids = [f"bench-expo-{i}" for i in range(max(1, n // 5000))]
+    await server.db.expos.insert_many([{"id": e, "name": e} for e in expo_ids])
+    for start in range(0, n, batch):
+        await server.db.companies.insert_many([company(rng, i, expo_ids) for i in range(start, min(n, start + batch))], ordered=False)
+        print(f"\rloaded {min(n, start + batch):,}/{n:,}", end="", flush=True)
+    print()
+    return expo_ids
+
+
+async def timed(mode, query, q, reps):
+    samples, hits = [], 0
+    for _ in range(reps):
+        t = time.perf_counter()
+        hits = len(await server.search_companies(query, q, 50, mode))
+        samples.append((time.perf_counter() - t) * 1000)
+    return samples, hits
+
+
+def pct(samples, p):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))]
+
+
+async def main(args):
+    name = f"expointel_bench_search_{os.getpid()}"
+    server.db = server.client[name]
+    try:
+        t = time.perf_counter()
+        await server.ensure_indexes()
+        expo_ids = await load(args.companies, args.batch, args.seed)
+        print(f"load + index: {time.perf_counter() - t:.1f}s")
+        print(f"{'mode':<10} {'scope':<6} {'query':<14} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8}")
+        for mode, queries in QUERIES.items():
+            for scope, q in (("all", {}), ("expo", {"expo_id": expo_ids[0]})):
+                for query in queries:
+                    samples, hits = await timed(mode, query, q, args.reps)
+                    print(f"{mode:<10} {scope:<6} {query:<14} {hits:>5} {statistics.median(samples):>8.2f} {pct(samples, 95):>8.2f}")
+    finally:
+        if not args.keep: await server.client.drop_database(name)
+        server.client.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--companies", type=int, default=1_000_000)
+    ap.add_argument("--batch", type=int, default=10_000)
+    ap.add_argument("--reps", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--keep", action="store_true", help="keep the scratch database")
+    asyncio.run(main(ap.parse_args()))
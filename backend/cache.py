@@ -0,0 +1,94 @@
+"""
+In-process caches shared by the API workers.
+"""
+import time
+import asyncio
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries also expire `ttl` seconds after they are set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0, clock=time.monotonic):
+        self.maxsize, self.ttl, self.clock = maxsize, ttl, clock
+        self._data = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is not None:
+            value, expires = item
+            if expires > self.clock():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl: float = None):
+        self._data[key] = (value, self.clock() + (self.ttl if ttl is None else ttl))
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0}
+
+
+class VersionedCache(TTLCache):
+    """TTLCache for values derived from data that changes as a whole (e.g. the expo catalog).
+    bump() starts a new generation and drops every entry; set_if_current() refuses values
+    computed under an older generation, so a read racing a write cannot store stale data."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0, clock=time.monotonic):
+        super().__init__(maxsize, ttl, clock)
+        self.version, self.bumps = 0, 0
+
+    def bump(self, version: int = None):
+        self.version = self.version + 1 if version is None else version
+        self.bumps += 1
+        self.clear()
+
+    def set_if_current(self, key, value, version: int):
+        if version == self.version: self.set(key, value)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "version": self.version, "invalidations": self.bumps}
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one in-flight execution of the first caller's fn.
+    The shared call runs as its own task, so a caller that disconnects does not cancel it for
+    the others. Nothing is kept once the call finishes."""
+
+    def __init__(self):
+        self._calls = {}
+        self.leaders = self.collapsed = 0
+
+    async def do(self, key, fn):
+        task = self._calls.get(key)
+        if task is None:
+            self.leaders += 1
+            task = self._calls[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.collapsed += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict:
+        total = self.leaders + self.collapsed
+        return {"in_flight": len(self._calls), "leaders": self.leaders, "collapsed": self.collapsed,
+                "collapse_rate": round(self.collapsed / total, 4) if total else 0.0}
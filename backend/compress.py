@@ -0,0 +1,115 @@
+"""
+Response compression negotiated from Accept-Encoding.
+
+CompressionMiddleware compresses text-like responses of at least `minimum_size` bytes with
+brotli when the client accepts it and the brotli package is installed, gzip otherwise.
+Whole bodies are compressed in one call; streamed bodies (CSV exports) are compressed chunk
+by chunk. Event streams, already-encoded bodies and responses without a body pass through.
+A strong ETag becomes weak on compressed responses, since the bytes differ per encoding.
+"""
+import gzip
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: smaller than gzip on JSON at similar CPU
+    brotli = None
+
+COMPRESSIBLE = ("text/", "application/json", "application/msgpack", "application/javascript", "image/svg+xml")
+SKIPPED = ("text/event-stream",)
+
+
+def accepted_encodings(header: str) -> dict:
+    # "gzip;q=0.8, br, *;q=0" -> {"gzip": 0.8, "br": 1.0, "*": 0.0}
+    out = {}
+    for part in header.split(","):
+        name, _, params = part.strip().partition(";")
+        q = params.strip()
+        try: out[name.strip().lower()] = float(q[2:]) if q.startswith("q=") else 1.0
+        except ValueError: continue
+    return out
+
+
+def choose_encoding(header: str):
+    q = accepted_encodings(header or "")
+    for encoding in ("br", "gzip"):
+        if encoding == "br" and brotli is None: continue
+        if q.get(encoding, q.get("*", 0.0)) > 0: return encoding
+    return None
+
+
+class _Stream:
+    """Incremental compressor with a uniform compress/finish interface."""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            c = brotli.Compressor(quality=brotli_quality)
+            self.compress, self.finish = c.process, c.finish
+        else:
+            c = zlib.compressobj(gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+            self.compress, self.finish = c.compress, c.flush
+
+
+class CompressionMiddleware:
+    """ASGI middleware: compresses eligible responses for clients that accept br or gzip."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app, self.minimum_size = app, minimum_size
+        self.gzip_level, self.brotli_quality = gzip_level, brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br": return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+        if encoding is None or scope["method"] == "HEAD": return await self.app(scope, receive, send)
+        start, mode, stream = None, None, None
+
+        async def send_compressed(message):
+            nonlocal start, mode, stream
+            if message["type"] == "http.response.start":
+                start = message  # held until the first body chunk shows whether to compress
+                return
+            if message["type"] != "http.response.body": return await send(message)
+            body, more = message.get("body", b""), message.get("more_body", False)
+            if mode is None:
+                if not self.eligible(start, body, more):
+                    mode = "plain"
+                    await send(start)
+                elif more:
+                    mode, stream = "stream", _Stream(encoding, self.gzip_level, self.brotli_quality)
+                    await send(self.encoded_start(start, encoding, None))
+                else:
+                    mode, body = "whole", self.compress(body, encoding)
+                    await send(self.encoded_start(start, encoding, len(body)))
+                    return await send({"type": "http.response.body", "body": body})
+            if mode == "plain": return await send(message)
+            out = stream.compress(body) + (b"" if more else stream.finish())
+            if out or not more: await send({"type": "http.response.body", "body": out, "more_body": more})
+
+        await self.app(scope, receive, send_compressed)
+
+    def eligible(self, start: dict, body: bytes, more: bool) -> bool:
+        if start["status"] < 200 or start["status"] in (204, 304): return False
+        headers = {k.lower(): v for k, v in start.get("headers", [])}
+        if b"content-encoding" in headers: return False
+        ctype = headers.get(b"content-type", b"").decode("latin-1").lower()
+        if ctype.startswith(SKIPPED) or not ctype.startswith(COMPRESSIBLE): return False
+        if more: return True  # streamed: size unknown up front
+        length = headers.get(b"content-length")
+        return (int(length) if length else len(body)) >= self.minimum_size
+
+    def encoded_start(self, start: dict, encoding: str, length) -> dict:
+        headers, vary = [], [b"Accept-Encoding"]
+        for k, v in start.get("headers", []):
+            lk = k.lower()
+            if lk == b"vary": vary.insert(-1, v)
+            elif lk == b"etag" and v.startswith(b'"'): headers.append((k, b"W/" + v))
+            elif lk != b"content-length": headers.append((k, v))
+        headers.append((b"vary", b", ".join(vary)))
+        headers.append((b"content-encoding", encoding.encode()))
+        if length is not None: headers.append((b"content-length", str(length).encode()))
+        return {**start, "headers": headers}
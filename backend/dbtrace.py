@@ -0,0 +1,131 @@
+"""
+Per-request MongoDB command tracing.
+
+TraceListener is registered on the Motor client and attributes every command to the
+RequestTrace held in the CURRENT contextvar (Motor copies the caller's context into its
+executor threads). TraceMiddleware opens one trace per HTTP request, reports it in a
+Server-Timing header, folds it into per-route totals and warns when a request repeats the
+same find_one shape more than `find_one_threshold` times (a likely N+1 loop).
+"""
+import logging
+import threading
+import contextvars
+from collections import Counter
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+CURRENT = contextvars.ContextVar("db_trace", default=None)
+IGNORED_COMMANDS = {"ping", "hello", "isMaster", "endSessions"}
+
+
+def query_shape(value):
+    # Filter structure with the values blanked out: {"id": "x"} and {"id": "y"} share a shape
+    if isinstance(value, dict): return "{" + ",".join(f"{k}:{query_shape(v)}" for k, v in sorted(value.items())) + "}"
+    if isinstance(value, (list, tuple)): return "[...]"
+    return "?"
+
+
+def is_find_one(name: str, cmd) -> bool:
+    return name == "find" and cmd.get("limit") == 1 and cmd.get("singleBatch", False)
+
+
+class RequestTrace:
+    """Commands issued while serving one request."""
+
+    def __init__(self):
+        self.count, self.seconds = 0, 0.0
+        self.slowest_ms, self.slowest = 0.0, None
+        self.find_ones = Counter()
+        self._labels, self._lock = {}, threading.Lock()
+
+    def started(self, event):
+        coll = event.command.get(event.command_name)
+        label = f"{event.command_name} {coll}" if isinstance(coll, str) else event.command_name
+        with self._lock:
+            self.count += 1
+            self._labels[(event.connection_id, event.request_id)] = label
+            if is_find_one(event.command_name, event.command):
+                self.find_ones[f"{coll} {query_shape(event.command.get('filter', {}))}"] += 1
+
+    def finished(self, event):
+        ms = event.duration_micros / 1000
+        with self._lock:
+            label = self._labels.pop((event.connection_id, event.request_id), event.command_name)
+            self.seconds += ms / 1000
+            if ms >= self.slowest_ms: self.slowest_ms, self.slowest = ms, label
+
+    def server_timing(self) -> str:
+        parts = [f'db;desc="{self.count} commands";dur={self.seconds * 1000:.2f}']
+        if self.slowest: parts.append(f'db-slowest;desc="{self.slowest}";dur={self.slowest_ms:.2f}')
+        return ", ".join(parts)
+
+
+class TraceListener(monitoring.CommandListener):
+    """Feeds command events into the current request's trace; commands outside a request are ignored."""
+
+    def started(self, event):
+        trace = CURRENT.get()
+        if trace is not None and event.command_name not in IGNORED_COMMANDS: trace.started(event)
+
+    def succeeded(self, event):
+        trace = CURRENT.get()
+        if trace is not None and event.command_name not in IGNORED_COMMANDS: trace.finished(event)
+
+    failed = succeeded
+
+
+class DbMetrics:
+    """Per-route command totals for GET /api/admin/db-metrics."""
+
+    def __init__(self):
+        self.routes = {}
+
+    def record(self, route: str, trace: RequestTrace, repeated: int):
+        r = self.routes.get(route)
+        if r is None:
+            r = self.routes[route] = {"requests": 0, "commands": 0, "db_ms": 0.0, "max_commands": 0,
+                                      "slowest_ms": 0.0, "slowest": None, "n_plus_one": 0}
+        r["requests"] += 1
+        r["commands"] += trace.count
+        r["db_ms"] += trace.seconds * 1000
+        r["max_commands"] = max(r["max_commands"], trace.count)
+        if trace.slowest_ms > r["slowest_ms"]: r["slowest_ms"], r["slowest"] = trace.slowest_ms, trace.slowest
+        r["n_plus_one"] += repeated
+
+    def snapshot(self) -> dict:
+        return {route: {**r, "db_ms": round(r["db_ms"], 2), "slowest_ms": round(r["slowest_ms"], 2),
+                        "avg_commands": round(r["commands"] / r["requests"], 2),
+                        "avg_db_ms": round(r["db_ms"] / r["requests"], 2)}
+                for route, r in sorted(self.routes.items())}
+
+    def reset(self):
+        self.routes.clear()
+
+
+class TraceMiddleware:
+    """ASGI middleware: one RequestTrace per HTTP request. Streaming responses report the
+    commands issued before their headers went out in Server-Timing; the per-route totals
+    include the whole body."""
+
+    def __init__(self, app, metrics: DbMetrics, find_one_threshold: int = 5):
+        self.app, self.metrics, self.find_one_threshold = app, metrics, find_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http": return await self.app(scope, receive, send)
+        trace = RequestTrace()
+        token = CURRENT.set(trace)
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"server-timing", trace.server_timing().encode())]}
+            await send(message)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            CURRENT.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            repeated = 0
+            for shape, n in trace.find_ones.items():
+                if n > self.find_one_threshold:
+                    repeated += 1
+                    logger.warning("N+1 suspect: %s %s issued %d identical find_one %s", scope["method"], route, n, shape)
+            self.metrics.record(f"{scope['method']} {route}", trace, repeated)
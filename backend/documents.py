@@ -0,0 +1,21 @@
+"""
+Write-time derived fields of stored documents: canonical facet keys, search keys and the
+import identity. Free of the app and its Mongo client, so process-pool workers that prepare
+imported rows (see importer.import_csv_parallel) can import it cheaply.
+"""
+import search
+import importer
+
+FACET_FIELDS = {"expos": ("region", "industry"), "companies": ("industry", "hq")}
+
+
+def facet_key(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def with_facet_keys(doc: dict, coll: str) -> dict:
+    return {**doc, **{f"{f}_key": facet_key(doc.get(f)) for f in FACET_FIELDS[coll]}}
+
+
+def prepare_company(company: dict) -> dict:
+    return {**with_facet_keys(company, "companies"), **search.index_fields(company), **importer.identity_fields(company)}
@@ -0,0 +1,144 @@
+"""
+Change notifications for the server-sent events stream (GET /api/events).
+
+Broker fans events out to subscribers, each with a bounded queue. Publishing never blocks:
+when a subscriber's queue is full (a slow or stalled client) its backlog is dropped and
+replaced by a single `resync` event, telling the client to catch up through /api/sync.
+The number of concurrent subscribers is capped; subscribe() raises Full past the cap.
+
+Events come from one of two sources. With a replica set (or mongos) `watch()` tails a
+change stream, so writes from every worker are seen. On a single node the routes publish
+their own writes in-process instead (Broker.source == "local"), which only reaches
+subscribers connected to the same worker. Both produce the same event shapes:
+
+    {"type": "shortlists" | "networks" | "expo_days", "op": "upsert" | "delete", "id", "user_id", ...}
+    {"type": "stage", "op": "update", "id": <company id>, "expo_id", "stage"}
+
+User-owned events go only to their owner; company stage changes are shared with every
+subscriber (optionally narrowed to one expo).
+"""
+import asyncio
+import logging
+from pymongo.errors import PyMongoError
+
+logger = logging.getLogger(__name__)
+USER_COLLECTIONS = ("shortlists", "networks", "expo_days")
+EVENT_FIELDS = ("id", "user_id", "expo_id", "company_id", "updated_at")
+CLOSED = object()
+
+
+class Full(Exception):
+    pass
+
+
+def change_event(coll: str, op: str, doc: dict) -> dict:
+    return {"type": coll, "op": op, **{k: doc[k] for k in EVENT_FIELDS if doc.get(k) is not None}}
+
+
+def stage_event(company: dict) -> dict:
+    return {"type": "stage", "op": "update", "id": company["id"], "expo_id": company.get("expo_id"),
+            "stage": company.get("shortlist_stage")}
+
+
+def from_change(change: dict):
+    # Change stream document -> event, or None when it carries nothing to route
+    coll, doc = change["ns"]["coll"], change.get("fullDocument")
+    if doc is None: return None  # updated then deleted before the lookup
+    if coll == "tombstones": return change_event(doc["collection"], "delete", doc)
+    if coll == "companies": return stage_event(doc)
+    return change_event(coll, "upsert", doc)
+
+
+CHANGE_PIPELINE = [{"$match": {"$or": [
+    {"ns.coll": {"$in": list(USER_COLLECTIONS)}, "operationType": {"$in": ["insert", "update", "replace"]}},
+    {"ns.coll": "tombstones", "operationType": "insert"},
+    {"ns.coll": "companies", "operationType": "update", "updateDescription.updatedFields.shortlist_stage": {"$exists": True}},
+]}}]
+
+
+class Subscription:
+    def __init__(self, user_id: str, expo_id: str = None, queue_size: int = 100):
+        self.user_id, self.expo_id = user_id, expo_id
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def wants(self, event: dict) -> bool:
+        if event["type"] == "stage": return self.expo_id is None or event.get("expo_id") == self.expo_id
+        return event.get("user_id") == self.user_id and (self.expo_id is None or event.get("expo_id") in (None, self.expo_id))
+
+    def offer(self, event) -> bool:
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except asyncio.QueueFull:
+            # Slow consumer: replace the backlog with one resync marker instead of blocking the publisher
+            self.dropped += self.queue.qsize() + 1
+            while not self.queue.empty(): self.queue.get_nowait()
+            self.queue.put_nowait({"type": "resync"})
+            return False
+
+
+class Broker:
+    def __init__(self, max_subscribers: int = 1000, queue_size: int = 100):
+        self.max_subscribers, self.queue_size = max_subscribers, queue_size
+        self.subscribers, self.source, self.watcher = set(), "local", None
+        self.published = self.delivered = self.dropped = self.rejected = 0
+
+    def subscribe(self, user_id: str, expo_id: str = None) -> Subscription:
+        if len(self.subscribers) >= self.max_subscribers:
+            self.rejected += 1
+            raise Full(f"{self.max_subscribers} subscribers connected")
+        sub = Subscription(user_id, expo_id, self.queue_size)
+        self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        self.subscribers.discard(sub)
+
+    def publish(self, event: dict):
+        if event is None: return
+        self.published += 1
+        for sub in list(self.subscribers):
+            if not sub.wants(event): continue
+            if sub.offer({k: v for k, v in event.items() if k != "user_id"}): self.delivered += 1
+            else: self.dropped += 1
+
+    async def start(self, client, db, source: str = "auto"):
+        # source: "auto" follows the change stream when the deployment has one, "local" never does
+        if source == "local" or not await supports_change_streams(client): return
+        self.source, self.watcher = "change_stream", asyncio.create_task(watch(db, self))
+
+    def close(self):
+        # Stops the watcher and ends every open stream; each subscriber sees CLOSED after its backlog
+        if self.watcher: self.watcher.cancel()
+        for sub in list(self.subscribers):
+            try: sub.queue.put_nowait(CLOSED)
+            except asyncio.QueueFull:
+                while not sub.queue.empty(): sub.queue.get_nowait()
+                sub.queue.put_nowait(CLOSED)
+
+    def stats(self) -> dict:
+        return {"source": self.source, "subscribers": len(self.subscribers), "max_subscribers": self.max_subscribers,
+                "published": self.published, "delivered": self.delivered, "dropped": self.dropped, "rejected": self.rejected}
+
+
+async def supports_change_streams(client) -> bool:
+    try: hello = await client.admin.command("hello")
+    except PyMongoError: return False
+    return bool(hello.get("setName")) or hello.get("msg") == "isdbgrid"
+
+
+async def watch(db, broker: Broker, retry_seconds: float = 5.0):
+    # Tails the change stream until cancelled, resuming after errors from the last seen event
+    resume = None
+    while True:
+        try:
+            async with db.watch(CHANGE_PIPELINE, full_document="updateLookup", resume_after=resume) as stream:
+                async for change in stream:
+                    resume = change["_id"]
+                    broker.publish(from_change(change))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Change stream interrupted (%s); retrying in %.0fs", e, retry_seconds)
+            await asyncio.sleep(retry_seconds)
@@ -0,0 +1,275 @@
+"""
+Exhibitor CSV import: incremental parsing, row normalization and batched inserts.
+
+Rows are read from a text stream in fixed-size batches (file reads and normalization happen
+off the event loop), and written with unordered insert_many calls, so memory is bounded
+by one batch and a bad row is reported instead of aborting the whole import.
+
+Large files on disk can instead go through import_csv_parallel: the file is split on line
+boundaries, chunks are parsed and normalized in a process pool, and the parsed batches
+stream back in order to a single Mongo writer.
+"""
+import io
+import re
+import csv
+import json
+import math
+import time
+import uuid
+import asyncio
+import hashlib
+from collections import deque
+from datetime import datetime, timezone
+import bson
+from bson.raw_bson import RawBSONDocument
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+try:
+    import pandas as pd
+except ImportError:  # optional: vectorized revenue cleaning
+    pd = None
+
+BATCH_SIZE = 1000
+CHUNK_BYTES = 4 * 1024 * 1024
+MAX_ERRORS = 100
+PREVIEW_ROWS = 3
+IMPORT_MODES = ("insert", "upsert")
+IMPORTED_FIELDS = ("name", "hq", "revenue", "booth", "industry", "contacts")
+INSERT_ONLY_FIELDS = ("id", "shortlist_stage", "created_at")  # never overwritten by a re-import
+KEY_FIELDS = ("expo_id", "import_key")  # unique together; upserts match on them
+DUPLICATE_KEY = 11000
+DUPLICATE_MSG = "duplicate of a company already in this expo (same name and booth); re-import with mode=upsert"
+
+
+# Plain ASCII decimals only: both cleaners below must agree, and float() alone also takes nan, inf and 1_000
+REVENUE_NOISE = r"[€$M,]"
+REVENUE_NUMBER = r"[+-]?([0-9]+\.?[0-9]*|\.[0-9]+)([eE][+-]?[0-9]+)?"
+
+
+def clean_revenue(raw) -> float:
+    s = re.sub(REVENUE_NOISE, "", str(raw or "0")).strip()
+    if not re.fullmatch(REVENUE_NUMBER, s): return 0.0
+    value = float(s)
+    return value if math.isfinite(value) else 0.0
+
+
+def clean_revenue_column(values: list) -> list:
+    # Same result as clean_revenue per value; astype(float) converts like float()
+    if pd is None or len(values) < 64: return [clean_revenue(v) for v in values]
+    col = pd.Series(values, dtype="object").fillna("0").astype(str).str.replace(REVENUE_NOISE, "", regex=True).str.strip()
+    nums = col.where(col.str.fullmatch(REVENUE_NUMBER), "0").astype(float)
+    return nums.replace([math.inf, -math.inf], 0.0).tolist()
+
+
+def parse_contacts(raw) -> list:
+    if not raw: return []
+    try: contacts = json.loads(raw)
+    except ValueError: return []
+    return contacts if isinstance(contacts, list) else []
+
+
+def normalize_row(row: dict, expo_id: str, now: str, revenue: float = None) -> dict:
+    name = (row.get("name") or "").strip()
+    if not name: raise ValueError("missing name")
+    return {"id": str(uuid.uuid4()), "expo_id": expo_id, "name": name, "hq": (row.get("HQ") or row.get("hq") or "").strip(),
+            "revenue": clean_revenue(row.get("revenue")) if revenue is None else revenue,
+            "booth": (row.get("booth") or "").strip(), "industry": (row.get("industry") or "").strip(),
+            "shortlist_stage": "none", "contacts": parse_contacts(row.get("contacts")), "created_at": now}
+
+
+def normalize_rows(rows: list, expo_id: str, now: str, prepare=None):
+    # Returns (docs, index of each doc's row in `rows`, [(row index, error)])
+    docs, idx, errors = [], [], []
+    for i, (row, revenue) in enumerate(zip(rows, clean_revenue_column([r.get("revenue") for r in rows]))):
+        try: doc = normalize_row(row, expo_id, now, revenue)
+        except ValueError as e:
+            errors.append((i, str(e))); continue
+        docs.append(prepare(doc) if prepare else doc)
+        idx.append(i)
+    return docs, idx, errors
+
+
+def _key_part(value) -> str:
+    return " ".join(str(value or "").split()).casefold()
+
+
+def identity_fields(doc: dict) -> dict:
+    # Natural key within an expo, and a hash of the imported columns to skip unchanged rows on re-import
+    values = [float(v) if f == "revenue" and isinstance(v, (int, float)) else v for f, v in ((f, doc.get(f)) for f in IMPORTED_FIELDS)]
+    payload = json.dumps(values, sort_keys=True, default=str)
+    return {"import_key": f"{_key_part(doc.get('name'))}|{_key_part(doc.get('booth'))}",
+            "content_hash": hashlib.sha1(payload.encode()).hexdigest()}
+
+
+def _take(reader, n: int) -> list:
+    rows = []
+    for row in reader:
+        rows.append(row)
+        if len(rows) >= n: break
+    return rows
+
+
+async def read_batches(fh, batch_size: int = BATCH_SIZE):
+    reader = csv.DictReader(fh)
+    while True:
+        try: rows = await asyncio.to_thread(_take, reader, batch_size)
+        except csv.Error as e: raise ValueError(f"CSV parse error near line {reader.line_num}: {e}")
+        if not rows: return
+        yield rows
+
+
+def new_stats() -> dict:
+    return {"rows": 0, "inserted": 0, "updated": 0, "unchanged": 0, "rejected": 0, "batches": 0,
+            "seconds": 0.0, "rows_per_s": 0.0, "errors": [], "errors_truncated": False}
+
+
+def add_error(stats: dict, row_no: int, msg: str):
+    stats["rejected"] += 1
+    if len(stats["errors"]) < MAX_ERRORS: stats["errors"].append({"row": row_no, "error": msg})
+    else: stats["errors_truncated"] = True
+
+
+async def insert_batch(coll, docs: list, row_nos: list, stats: dict):
+    if not docs: return
+    try:
+        await coll.insert_many(docs, ordered=False)
+        stats["inserted"] += len(docs)  # not inserted_ids: pymongo leaves it empty for RawBSONDocuments
+    except BulkWriteError as e:
+        stats["inserted"] += e.details.get("nInserted", 0)
+        for err in e.details.get("writeErrors", []):
+            add_error(stats, row_nos[err["index"]], DUPLICATE_MSG if err.get("code") == DUPLICATE_KEY else err.get("errmsg", "write error"))
+    stats["batches"] += 1
+
+
+async def _bulk_upsert(coll, ops: list, op_rows: list, stats: dict, retry: bool = True):
+    try:
+        details = (await coll.bulk_write(ops, ordered=False)).bulk_api_result
+    except BulkWriteError as e:
+        details, raced = e.details, []
+        for err in details.get("writeErrors", []):
+            # A concurrent import inserted the same key between our lookup and upsert; retried, the upsert matches it
+            if retry and err.get("code") == DUPLICATE_KEY: raced.append(err["index"])
+            else: add_error(stats, op_rows[err["index"]], err.get("errmsg", "write error"))
+        if raced: await _bulk_upsert(coll, [ops[i] for i in raced], [op_rows[i] for i in raced], stats, retry=False)
+    stats["inserted"] += details.get("nUpserted", 0)
+    stats["updated"] += details.get("nModified", 0)
+    stats["unchanged"] += details.get("nMatched", 0) - details.get("nModified", 0)  # raced rows that matched identical content
+
+
+async def upsert_batch(coll, expo_id: str, docs: list, row_nos: list, stats: dict):
+    # Keyed on the unique (expo_id, import_key): existing companies keep their id and stage, unchanged rows cost no write
+    latest = {}
+    for doc, row_no in zip(docs, row_nos):
+        if doc["import_key"] in latest: stats["unchanged"] += 1  # repeated within the file; last row wins
+        latest[doc["import_key"]] = (doc, row_no)
+    if not latest: return
+    existing = {d["import_key"]: d.get("content_hash") async for d in coll.find(
+        {"expo_id": expo_id, "import_key": {"$in": list(latest)}}, {"_id": 0, "import_key": 1, "content_hash": 1})}
+    ops, op_rows = [], []
+    for key, (doc, row_no) in latest.items():
+        if key in existing and existing[key] == doc["content_hash"]:
+            stats["unchanged"] += 1; continue
+        ops.append(UpdateOne({"expo_id": expo_id, "import_key": key},
+                             {"$set": {k: v for k, v in doc.items() if k not in INSERT_ONLY_FIELDS + KEY_FIELDS},
+                              "$setOnInsert": {k: doc[k] for k in INSERT_ONLY_FIELDS if k in doc}}, upsert=True))
+        op_rows.append(row_no)
+    if ops: await _bulk_upsert(coll, ops, op_rows, stats)
+    stats["batches"] += 1
+
+
+async def write_batch(coll, expo_id: str, docs: list, row_nos: list, stats: dict, mode: str):
+    if mode == "upsert": await upsert_batch(coll, expo_id, docs, row_nos, stats)
+    else: await insert_batch(coll, docs, row_nos, stats)
+
+
+def _tally(stats: dict, nrows: int, docs: list, idx: list, errors: list):
+    # Converts batch-relative row indexes to 1-based file row numbers
+    base = stats["rows"]
+    stats["rows"] += nrows
+    for i, msg in errors: add_error(stats, base + i + 1, msg)
+    return docs, [base + i + 1 for i in idx]
+
+
+def _finish(stats: dict, t0: float) -> dict:
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    stats["rows_per_s"] = round(stats["rows"] / stats["seconds"], 1) if stats["seconds"] else 0.0
+    return stats
+
+
+async def import_csv(fh, coll, expo_id: str, prepare=None, batch_size: int = BATCH_SIZE, stats: dict = None,
+                     mode: str = "insert", on_batch=None, pool=None):
+    # Returns (stats, preview docs); `prepare` adds derived fields (search/facet/identity keys) to each document.
+    # Pass `stats` to read partial counts if a write fails mid-import;
+    # `await on_batch(stats, progress)` runs after each batch (progress is None: stream size is unknown).
+    # Batches are normalized in `pool` (a workers.BoundedPool) when given, else in a thread.
+    if mode not in IMPORT_MODES: raise ValueError(f"mode must be one of {IMPORT_MODES}")
+    stats, preview, t0 = stats if stats is not None else new_stats(), [], time.perf_counter()
+    normalize = pool.run if pool is not None else asyncio.to_thread
+    try:
+        async for rows in read_batches(fh, batch_size):
+            now = datetime.now(timezone.utc).isoformat()
+            docs, row_nos = _tally(stats, len(rows), *await normalize(normalize_rows, rows, expo_id, now, prepare))
+            if len(preview) < PREVIEW_ROWS: preview += [dict(d) for d in docs[:PREVIEW_ROWS - len(preview)]]
+            await write_batch(coll, expo_id, docs, row_nos, stats, mode)
+            if on_batch: await on_batch(stats, None)
+    except ValueError as e:
+        add_error(stats, stats["rows"] + 1, str(e))
+    return _finish(stats, t0), preview
+
+
+# ── Parallel import ──
+def split_chunks(path: str, chunk_bytes: int = CHUNK_BYTES):
+    # Returns (header, [(start, end)]) byte ranges that end on a newline outside any quoted field
+    with open(path, "rb") as f:
+        header = next(csv.reader([f.readline().decode("utf-8-sig")]), [])
+        chunks, start, quotes = [], f.tell(), 0
+        pos = start
+        for line in f:
+            pos += len(line)
+            quotes += line.count(b'"')
+            if pos - start >= chunk_bytes and quotes % 2 == 0:
+                chunks.append((start, pos))
+                start = pos
+        if pos > start: chunks.append((start, pos))
+    return header, chunks
+
+
+def parse_chunk(path: str, start: int, end: int, header: list, expo_id: str, now: str, prepare=None):
+    # Runs in a worker process: returns (row count, BSON-encoded docs, doc row indexes, errors) for one byte range.
+    # Encoding here is cheaper than pickling dicts and saves the writer from re-encoding them.
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start).decode("utf-8")
+    rows = list(csv.DictReader(io.StringIO(data, newline=""), fieldnames=header))
+    docs, idx, errors = normalize_rows(rows, expo_id, now, prepare)
+    return len(rows), [bson.encode(d) for d in docs], idx, errors
+
+
+async def import_csv_parallel(path: str, coll, expo_id: str, pool, prepare=None, stats: dict = None, mode: str = "insert",
+                              on_batch=None, chunk_bytes: int = CHUNK_BYTES, batch_size: int = BATCH_SIZE):
+    # Returns (stats, preview docs) like import_csv. `pool` is a workers.BoundedPool; `prepare` must be
+    # picklable when the pool uses processes. At most 2x the pool's concurrency chunks are parsed ahead of the writer.
+    if mode not in IMPORT_MODES: raise ValueError(f"mode must be one of {IMPORT_MODES}")
+    stats, preview, t0 = stats if stats is not None else new_stats(), [], time.perf_counter()
+    header, chunks = await asyncio.to_thread(split_chunks, path, chunk_bytes)
+    total = max(chunks[-1][1] if chunks else 1, 1)
+    now, todo, pending = datetime.now(timezone.utc).isoformat(), iter(chunks), deque()
+    def launch():
+        c = next(todo, None)
+        if c: pending.append((c, asyncio.ensure_future(pool.run(parse_chunk, path, c[0], c[1], header, expo_id, now, prepare))))
+    for _ in range(pool.concurrency * 2): launch()
+    try:
+        while pending:
+            (_, end), fut = pending.popleft()
+            nrows, docs, idx, errors = await fut
+            launch()
+            if len(preview) < PREVIEW_ROWS: preview += [bson.decode(d) for d in docs[:PREVIEW_ROWS - len(preview)]]
+            docs, row_nos = _tally(stats, nrows, [bson.decode(d) if mode == "upsert" else RawBSONDocument(d) for d in docs],
+                                   idx, errors)
+            for i in range(0, len(docs), batch_size):
+                await write_batch(coll, expo_id, docs[i:i + batch_size], row_nos[i:i + batch_size], stats, mode)
+            if on_batch: await on_batch(stats, end / total)
+    finally:
+        for _, fut in pending: fut.cancel()
+    return _finish(stats, t0), preview
@@ -0,0 +1,132 @@
+"""
+Background jobs run on the local event loop, with their state kept in MongoDB so any
+API worker can report progress. Unfinished jobs carry a heartbeat from their worker;
+recover() fails the ones whose worker is gone.
+"""
+import os
+import time
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timezone
+
+logger = logging.getLogger(__name__)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+UNFINISHED = ("queued", "running")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def orphaned_filter(cutoff: str) -> dict:
+    # Unfinished jobs of an earlier process with this WORKER_ID, or of any worker silent since `cutoff`
+    return {"status": {"$in": list(UNFINISHED)}, "$or": [{"worker": WORKER_ID}, {"heartbeat_at": {"$not": {"$gte": cutoff}}}]}
+
+
+class JobManager:
+    """Runs at most `max_concurrent` jobs at once; later submissions wait in status "queued".
+    `collection` is a callable returning the Motor collection that stores job documents.
+    While any job is unfinished, its heartbeat_at is refreshed every `heartbeat_interval` seconds."""
+
+    def __init__(self, collection, max_concurrent: int = 2, progress_interval: float = 1.0, heartbeat_interval: float = 30.0):
+        self._collection = collection
+        self.max_concurrent, self.progress_interval = max_concurrent, progress_interval
+        self.heartbeat_interval = heartbeat_interval
+        self._sem = None
+        self._tasks = set()
+        self._heartbeat = None
+        self.running = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        if self._sem is None: self._sem = asyncio.Semaphore(self.max_concurrent)
+        return self._sem
+
+    async def _set(self, jid: str, **fields):
+        await self._collection().update_one({"id": jid}, {"$set": fields})
+
+    async def submit(self, kind: str, run, meta: dict = None, cleanup=None) -> str:
+        # `run(report)` does the work; `await report(fields, progress=0..1)` persists progress (throttled).
+        # `cleanup()` runs once the job ends, whether it finished, failed or was cancelled while queued.
+        job = {"id": str(uuid.uuid4()), "kind": kind, "status": "queued", "progress": 0.0, "eta_seconds": None,
+               "worker": WORKER_ID, "created_at": _now(), "heartbeat_at": _now(), **(meta or {})}
+        try: await self._collection().insert_one(job)
+        except BaseException:
+            if cleanup: cleanup()
+            raise
+        task = asyncio.create_task(self._run(job["id"], run, cleanup))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        if self._heartbeat is None or self._heartbeat.done(): self._heartbeat = asyncio.create_task(self._beat())
+        return job["id"]
+
+    async def _beat(self):
+        # One write per interval covers every unfinished job of this worker
+        while self._tasks:
+            await asyncio.sleep(self.heartbeat_interval)
+            try:
+                await self._collection().update_many({"worker": WORKER_ID, "status": {"$in": list(UNFINISHED)}},
+                                                     {"$set": {"heartbeat_at": _now()}})
+            except Exception as e: logger.warning(f"Job heartbeat failed: {e}")
+
+    async def _run(self, jid: str, run, cleanup=None):
+        acquired = False
+        try:
+            async with self._semaphore():
+                acquired = True
+                self.running += 1
+                t0, last = time.monotonic(), 0.0
+                async def report(fields: dict, progress: float = None, force: bool = False):
+                    nonlocal last
+                    now = time.monotonic()
+                    if not force and now - last < self.progress_interval: return
+                    last = now
+                    if progress is not None:
+                        progress = max(0.0, min(progress, 1.0))
+                        fields = {**fields, "progress": round(progress, 4),
+                                  "eta_seconds": round((now - t0) * (1 - progress) / progress, 1) if progress > 0 else None}
+                    await self._set(jid, **fields)
+                await self._set(jid, status="running", started_at=_now())
+                result = await run(report)
+                await self._set(jid, status="done", progress=1.0, eta_seconds=0, result=result, finished_at=_now())
+        except asyncio.CancelledError:
+            # Also reached while still waiting for a slot, so queued jobs do not stay "queued" forever
+            await self._set(jid, status="failed", error="cancelled", finished_at=_now())
+            raise
+        except Exception as e:
+            logger.exception(f"Job {jid} failed")
+            await self._set(jid, status="failed", error=str(e), finished_at=_now())
+        finally:
+            if acquired: self.running -= 1
+            if cleanup:
+                try: cleanup()
+                except Exception as e: logger.warning(f"Job {jid} cleanup failed: {e}")
+
+    async def recover(self, stale_after: float = None) -> int:
+        # Run at startup: fails unfinished jobs left by an earlier run of this worker, or by any worker
+        # whose heartbeat is older than `stale_after` seconds (default 3 heartbeat intervals)
+        cutoff = datetime.fromtimestamp(time.time() - (stale_after or 3 * self.heartbeat_interval), timezone.utc).isoformat()
+        res = await self._collection().update_many(orphaned_filter(cutoff), {"$set": {
+            "status": "failed", "error": "interrupted: worker stopped before the job finished", "finished_at": _now()}})
+        if res.modified_count: logger.warning(f"Marked {res.modified_count} interrupted jobs as failed")
+        return res.modified_count
+
+    async def get(self, jid: str):
+        return await self._collection().find_one({"id": jid}, {"_id": 0})
+
+    async def recent(self, limit: int = 20) -> list:
+        return await self._collection().find({}, {"_id": 0}).sort("created_at", -1).limit(limit).to_list(None)
+
+    async def wait(self):
+        if self._tasks: await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def shutdown(self):
+        for t in list(self._tasks): t.cancel()
+        await self.wait()
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            await asyncio.gather(self._heartbeat, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {"max_concurrent": self.max_concurrent, "running": self.running, "queued": len(self._tasks) - self.running}
@@ -0,0 +1,133 @@
+"""
+Maintenance commands for the ExpoIntel backend.
+
+    python manage.py rebuild-expo-stats
+    python manage.py ensure-indexes
+    python manage.py audit-indexes
+    python manage.py reindex-search
+    python manage.py backfill-facet-keys
+    python manage.py backfill-import-keys
+    python manage.py dedupe-companies
+    python manage.py backfill-updated-at
+    python manage.py seed-scale --expos 100 --companies-per-expo 10000 --users 5000 --seed 42
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+from itertools import chain
+
+import server
+import synthetic
+
+
+async def rebuild_expo_stats(args):
+    return await server.rebuild_expo_stats()
+
+
+async def ensure_indexes(args):
+    await server.ensure_indexes()
+    return {name: sorted((await server.db[name].index_information()).keys()) for name in server.INDEXES}
+
+
+async def audit_indexes(args):
+    await server.ensure_indexes()
+    bad = await server.audit_query_plans()
+    return {"shapes": len(server.QUERY_SHAPES), "collscans": bad}
+
+
+async def reindex_search(args):
+    return await server.reindex_search()
+
+
+async def backfill_facet_keys(args):
+    return await server.backfill_facet_keys()
+
+
+async def backfill_import_keys(args):
+    return await server.backfill_import_keys()
+
+
+async def dedupe_companies(args):
+    result = await server.dedupe_companies()
+    if result["merged"]: await server.ensure_indexes()
+    return result
+
+
+async def backfill_updated_at(args):
+    return await server.backfill_updated_at()
+
+
+async def bulk_insert(pairs, batch_size: int) -> dict:
+    # pairs: iterable of (collection, doc); one insert_many in flight while the next batch is generated
+    buffers, counts, pending = {}, {}, None
+    async def flush(name, docs):
+        await server.db[name].insert_many(docs, ordered=False)
+        counts[name] = counts.get(name, 0) + len(docs)
+    for name, doc in pairs:
+        buf = buffers.setdefault(name, [])
+        buf.append(doc)
+        if len(buf) >= batch_size:
+            if pending: await pending
+            pending, buffers[name] = asyncio.ensure_future(flush(name, buf)), []
+    if pending: await pending
+    for name, buf in buffers.items():
+        if buf: await flush(name, buf)
+    return counts
+
+
+async def seed_scale(args):
+    t0, seed = time.perf_counter(), args.seed
+    if await server.db.expos.find_one({"id": synthetic.make_id(seed, "expo", 0)}, {"_id": 1}):
+        return {"status": "already_seeded", "seed": seed}
+    await server.ensure_indexes()
+    n, m = args.expos, args.companies_per_expo
+    pw_hash = server.hash_pw(synthetic.PASSWORD)
+    counts = await bulk_insert(chain(
+        (("expos", server.with_facet_keys(e, "expos")) for e in synthetic.expo_docs(seed, n, m)),
+        (("companies", server.prepare_company(c)) for e in range(n) for c in synthetic.company_docs(seed, e, m)),
+        (("users", u) for u in synthetic.user_docs(seed, args.users, pw_hash)),
+        chain.from_iterable(synthetic.activity_docs(seed, u, n, m) for u in range(args.users))), args.batch)
+    return {"status": "seeded", "seed": seed, "counts": counts, "password": synthetic.PASSWORD,
+            "seconds": round(time.perf_counter() - t0, 1)}
+
+
+COMMANDS = {
+    "rebuild-expo-stats": (rebuild_expo_stats, "Recount companies per expo and fix drifted expos.company_count"),
+    "ensure-indexes": (ensure_indexes, "Create the indexes declared in server.INDEXES"),
+    "audit-indexes": (audit_indexes, "Explain every server.QUERY_SHAPES entry and report COLLSCAN plans"),
+    "reindex-search": (reindex_search, "Recompute search_prefixes/search_grams/search_name for every company"),
+    "backfill-facet-keys": (backfill_facet_keys, "Write region_key/industry_key/hq_key on documents that lack them"),
+    "backfill-import-keys": (backfill_import_keys, "Write import_key/content_hash on companies that lack them"),
+    "dedupe-companies": (dedupe_companies, "Merge companies stored twice under one expo + name + booth, then create the unique index"),
+    "backfill-updated-at": (backfill_updated_at, "Write updated_at (from created_at) on shortlists, networks and expo days that lack it"),
+    "seed-scale": (seed_scale, "Bulk-insert a deterministic synthetic dataset (expos, companies, users and their activity)"),
+}
+ARGS = {
+    "seed-scale": [(("--expos",), {"type": int, "default": 100}),
+                   (("--companies-per-expo",), {"type": int, "default": 10_000}),
+                   (("--users",), {"type": int, "default": 5_000}),
+                   (("--seed",), {"type": int, "default": 42}),
+                   (("--batch",), {"type": int, "default": 5_000})],
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="manage.py")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text) in COMMANDS.items():
+        cmd = sub.add_parser(name, help=help_text)
+        for flags, kwargs in ARGS.get(name, []): cmd.add_argument(*flags, **kwargs)
+    args = parser.parse_args(argv)
+
+    async def run():
+        try:
+            return await COMMANDS[args.command][0](args)
+        finally:
+            server.client.close()
+    print(json.dumps(asyncio.run(run()), indent=2, default=str))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""
+Prometheus metrics in the text exposition format, without a client library.
+
+Hot-path metrics (request latency, response size, in-flight requests) are updated by
+MetricsMiddleware with a dict lookup and a bisect per request. Everything that already
+keeps its own counters (caches, worker pools, per-route Mongo totals, the connection pool)
+is read only at scrape time through collectors registered with Registry.collect().
+"""
+import time
+import threading
+from bisect import bisect_left
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names: return ""
+    esc = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{n}="{esc(v)}"' for n, v in zip(names, values)) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name, self.help, self.labels, self.values = name, help_text, labels, {}
+
+    def inc(self, *labels, amount: float = 1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} counter"
+        for lv, v in self.values.items(): yield f"{self.name}{_labels(self.labels, lv)} {v}"
+
+
+class Gauge(Counter):
+    def set(self, *labels, value: float):
+        self.values[labels] = value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} gauge"
+        for lv, v in self.values.items(): yield f"{self.name}{_labels(self.labels, lv)} {v}"
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labels, self.buckets = name, help_text, labels, buckets
+        self.values = {}  # labels -> [per-bucket counts (+Inf last), sum]
+
+    def observe(self, value: float, *labels):
+        v = self.values.get(labels)
+        if v is None: v = self.values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        v[0][bisect_left(self.buckets, value)] += 1
+        v[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}\n# TYPE {self.name} histogram"
+        for lv, (counts, total) in self.values.items():
+            cumulative = 0
+            for le, n in zip((*self.buckets, "+Inf"), counts):
+                cumulative += n
+                yield f"{self.name}_bucket{_labels((*self.labels, 'le'), (*lv, le))} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, lv)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, lv)} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics, self.collectors = [], []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def collect(self, fn):
+        # fn() -> iterable of metrics built at scrape time
+        self.collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = [line for m in self.metrics for line in m.render()]
+        for fn in self.collectors: lines += [line for m in fn() for line in m.render()]
+        return "\n".join(lines) + "\n"
+
+
+class PoolListener(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections per server for the Motor client."""
+
+    def __init__(self):
+        self.open, self.checked_out, self.waits = {}, {}, 0
+        self._lock = threading.Lock()
+
+    def _add(self, table, address, delta):
+        with self._lock: table[address] = table.get(address, 0) + delta
+
+    def connection_created(self, event): self._add(self.open, event.address, 1)
+    def connection_closed(self, event): self._add(self.open, event.address, -1)
+    def connection_checked_out(self, event): self._add(self.checked_out, event.address, 1)
+    def connection_checked_in(self, event): self._add(self.checked_out, event.address, -1)
+    def connection_check_out_failed(self, event):
+        with self._lock: self.waits += 1
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+    def connection_check_out_started(self, event): pass
+
+    def collect(self, max_size: int):
+        open_ = Gauge("mongodb_pool_connections", "Open connections in the Motor pool", ("server",))
+        used = Gauge("mongodb_pool_checked_out", "Connections checked out of the Motor pool", ("server",))
+        util = Gauge("mongodb_pool_utilization", "Checked-out connections / maxPoolSize", ("server",))
+        for address, n in self.open.items():
+            server = "%s:%s" % address
+            open_.set(server, value=n)
+            used.set(server, value=self.checked_out.get(address, 0))
+            util.set(server, value=round(self.checked_out.get(address, 0) / max_size, 4) if max_size else 0)
+        failed = Counter("mongodb_pool_checkout_failures_total", "Failed connection checkouts (e.g. wait queue timeouts)")
+        failed.inc(amount=self.waits)
+        return [open_, used, util, failed]
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, response size and in-flight requests per route."""
+
+    def __init__(self, app, registry: Registry, enabled: bool = True):
+        self.app, self.enabled = app, enabled
+        self.latency = registry.add(Histogram("http_request_duration_seconds", "Request latency", ("method", "route")))
+        self.size = registry.add(Histogram("http_response_size_bytes", "Response body size", ("method", "route"), SIZE_BUCKETS))
+        self.requests = registry.add(Counter("http_requests_total", "Requests by status", ("method", "route", "status")))
+        self.in_flight = registry.add(Gauge("http_requests_in_flight", "Requests being served", ("method",)))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled: return await self.app(scope, receive, send)
+        method, t0, status, size = scope["method"], time.perf_counter(), [500], [0]
+        async def send_and_measure(message):
+            if message["type"] == "http.response.start": status[0] = message["status"]
+            elif message["type"] == "http.response.body": size[0] += len(message.get("body", b""))
+            await send(message)
+        key = (method,)
+        self.in_flight.values[key] = self.in_flight.values.get(key, 0) + 1
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            self.in_flight.values[key] -= 1
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            self.latency.observe(time.perf_counter() - t0, method, route)
+            self.size.observe(size[0], method, route)
+            self.requests.inc(method, route, status[0])
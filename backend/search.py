@@ -0,0 +1,95 @@
+"""
+Company search: write-time index keys and in-process ranking.
+
+Every company stores two multikey-indexed arrays and one indexed string:
+  search_prefixes - edge prefixes (1..MAX_PREFIX chars) of every token of name, industry, hq
+                    and contact names; a query matches when each query token is one of them.
+  search_grams    - padded trigrams of the name tokens, used by the typo-tolerant mode.
+  search_name     - the normalized name; names that start with the query rank highest, so
+                    prefix search reads those first, in order, before other candidates.
+Candidates come from an index lookup; ranking happens here on the small candidate set.
+"""
+import re
+import unicodedata
+
+SEARCH_FIELDS = ("search_prefixes", "search_grams", "search_name")
+FIELD_WEIGHTS = {"name": 10.0, "contacts": 4.0, "industry": 3.0, "hq": 2.0}
+MAX_PREFIX = 10
+MIN_SIMILARITY = 0.3
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text) -> str:
+    text = unicodedata.normalize("NFKD", str(text or "")).encode("ascii", "ignore").decode()
+    return _NON_ALNUM.sub(" ", text.casefold()).strip()
+
+
+def tokenize(text) -> list:
+    return normalize(text).split()
+
+
+def prefixes(tok: str) -> list:
+    return [tok[:i] for i in range(1, min(len(tok), MAX_PREFIX) + 1)]
+
+
+def trigrams(tok: str) -> set:
+    padded = f"  {tok} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def field_tokens(doc: dict) -> dict:
+    return {"name": tokenize(doc.get("name")), "industry": tokenize(doc.get("industry")), "hq": tokenize(doc.get("hq")),
+            "contacts": [t for c in doc.get("contacts") or [] if isinstance(c, dict) for t in tokenize(c.get("name"))]}
+
+
+def index_fields(doc: dict) -> dict:
+    toks = field_tokens(doc)
+    return {"search_prefixes": sorted({p for ts in toks.values() for t in ts for p in prefixes(t)}),
+            "search_grams": sorted({g for t in toks["name"] for g in trigrams(t)}), "search_name": normalize(doc.get("name"))}
+
+
+def prefix_filter(query: str):
+    # Tokens longer than MAX_PREFIX are looked up by their indexed prefix and verified in rank()
+    qtoks = tokenize(query)
+    return {"search_prefixes": {"$all": sorted({t[:MAX_PREFIX] for t in qtoks})}} if qtoks else None
+
+
+def name_start_pattern(query: str):
+    # normalize() leaves only [0-9a-z ], so the anchored prefix needs no escaping and is an index range scan
+    qn = normalize(query)
+    return re.compile(f"^{qn}") if qn else None
+
+
+def query_grams(query: str) -> list:
+    return sorted({g for t in tokenize(query) for g in trigrams(t)})
+
+
+def similarity(a: str, b: str) -> float:
+    ga, gb = trigrams(a), trigrams(b)
+    return len(ga & gb) / len(ga | gb)
+
+
+def score(doc: dict, query: str, fuzzy: bool = False) -> float:
+    qtoks, toks = tokenize(query), field_tokens(doc)
+    if not qtoks: return 0.0
+    total = 0.0
+    for q in qtoks:
+        best = 0.0
+        for field, weight in FIELD_WEIGHTS.items():
+            for t in toks[field]:
+                if t == q: best = max(best, weight * 1.5)
+                elif t.startswith(q): best = max(best, weight * (0.5 + 0.5 * len(q) / len(t)))
+                elif fuzzy and field == "name":
+                    sim = similarity(q, t)
+                    if sim >= MIN_SIMILARITY: best = max(best, weight * sim)
+        if not best and not fuzzy: return 0.0  # prefix mode: every token must match
+        total += best
+    if normalize(doc.get("name")).startswith(" ".join(qtoks)): total += FIELD_WEIGHTS["name"]
+    return total
+
+
+def rank(docs: list, query: str, fuzzy: bool = False, limit: int = 50) -> list:
+    scored = [(score(d, query, fuzzy), d) for d in docs]
+    scored = [(s, d) for s, d in scored if s > 0]
+    scored.sort(key=lambda sd: (-sd[0], normalize(sd[1].get("name"))))
+    return [d for _, d in scored[:limit]]
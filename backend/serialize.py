@@ -0,0 +1,90 @@
+"""
+JSON responses without FastAPI's jsonable_encoder pass.
+
+FastAPI walks and copies every value a route returns through jsonable_encoder before
+json.dumps. Route results here are Mongo documents that are already JSON-shaped, so
+FastJSONRoute serializes them in one step with orjson when it is installed (stdlib json
+otherwise). Anything orjson cannot encode natively falls back to jsonable_encoder, so the
+output matches the default path. Headers a route sets on its injected `response` (paging
+cursors, totals) are carried over; routes that return a Response are left untouched.
+
+Clients that send `Accept: application/msgpack` get the same data as MessagePack when the
+msgpack package is installed; JSON stays the default.
+"""
+import json
+import asyncio
+import functools
+import contextvars
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from starlette.responses import Response
+
+try:
+    import orjson
+except ImportError:  # optional: several times faster on large lists
+    orjson = None
+try:
+    import msgpack
+except ImportError:  # optional: Accept: application/msgpack
+    msgpack = None
+
+MSGPACK = "application/msgpack"
+ACCEPT = contextvars.ContextVar("accept", default="")
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None: return orjson.dumps(obj, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=jsonable_encoder).encode()
+
+
+def packb(obj) -> bytes:
+    return msgpack.packb(obj, default=jsonable_encoder, use_bin_type=True)
+
+
+def wants_msgpack(accept: str) -> bool:
+    return msgpack is not None and MSGPACK in accept
+
+
+def negotiated_type(accept: str) -> str:
+    return MSGPACK if wants_msgpack(accept) else "application/json"
+
+
+def encode(obj, media_type: str) -> bytes:
+    return packb(obj) if media_type == MSGPACK else dumps(obj)
+
+
+def json_response(body, sub_response: Response = None) -> Response:
+    media_type = negotiated_type(ACCEPT.get())
+    r = Response(encode(body, media_type), media_type=media_type)
+    r.headers["Vary"] = "Accept"
+    if isinstance(sub_response, Response):
+        if sub_response.status_code: r.status_code = sub_response.status_code
+        r.headers.raw.extend(sub_response.headers.raw)
+    return r
+
+
+def fast_json(endpoint):
+    # Leaves the signature (and so FastAPI's dependency injection) as declared on the endpoint
+    names = [n for n, a in endpoint.__annotations__.items() if a is Response and n != "return"]
+    def wrap(body, kwargs):
+        return body if isinstance(body, Response) else json_response(body, kwargs.get(names[0]) if names else None)
+    if asyncio.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def run(*args, **kwargs): return wrap(await endpoint(*args, **kwargs), kwargs)
+    else:
+        @functools.wraps(endpoint)
+        def run(*args, **kwargs): return wrap(endpoint(*args, **kwargs), kwargs)
+    return run
+
+
+class FastJSONRoute(APIRoute):
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, fast_json(endpoint), **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        async def negotiated(request):
+            token = ACCEPT.set(request.headers.get("accept", ""))
+            try: return await handler(request)
+            finally: ACCEPT.reset(token)
+        return negotiated
@@ -1,25 +1,45 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Form
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Form, Request, Response, UploadFile, File
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import StreamingResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from motor.motor_asyncio import AsyncIOMotorClient
-import os, logging, io, csv, json, uuid
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, BulkWriteError
+from bson import ObjectId
+import os, re, logging, io, csv, json, uuid, asyncio, base64, hashlib, shutil, tempfile, contextvars
 from pathlib import Path
+from itertools import product
+from urllib.parse import parse_qs
 from pydantic import BaseModel, Field
 from typing import List, Optional
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import jwt, bcrypt
+import search
+import importer
+from documents import FACET_FIELDS, facet_key, with_facet_keys, prepare_company
+from cache import TTLCache, VersionedCache, SingleFlight
+from workers import BoundedPool
+from jobs import JobManager, orphaned_filter
+import dbtrace
+import metrics
+import serialize
+import compress
+import events
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+POOL_LISTENER = metrics.PoolListener()
+client = AsyncIOMotorClient(mongo_url, event_listeners=[dbtrace.TraceListener(), POOL_LISTENER])
 db = client[os.environ['DB_NAME']]
 JWT_SECRET = os.environ.get('JWT_SECRET', 'expointel-secret-key-2026-prod!!')
 
 app = FastAPI()
-api_router = APIRouter(prefix="/api")
+api_router = APIRouter(prefix="/api", route_class=serialize.FastJSONRoute)  # orjson, no jsonable_encoder pass
 security = HTTPBearer(auto_error=False)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,18 +49,410 @@ def hash_pw(pw: str) -> str:
     return bcrypt.hashpw(pw.encode(), bcrypt.gensalt()).decode()
 def verify_pw(pw: str, h: str) -> bool:
     return bcrypt.checkpw(pw.encode(), h.encode())
+# bcrypt is CPU bound (~100-300 ms per call); run it in a bounded pool instead of on the event loop
+PASSWORD_POOL = BoundedPool("bcrypt", kind=os.environ.get("PASSWORD_POOL", "thread"),
+                            workers=int(os.environ.get("PASSWORD_WORKERS", 4)),
+                            concurrency=int(os.environ.get("PASSWORD_CONCURRENCY", 0)) or None)
+async def hash_pw_async(pw: str) -> str:
+    return await PASSWORD_POOL.run(hash_pw, pw)
+async def verify_pw_async(pw: str, h: str) -> bool:
+    return await PASSWORD_POOL.run(verify_pw, pw, h)
 def make_token(uid: str, role: str) -> str:
     return jwt.encode({"user_id": uid, "role": role, "exp": datetime.now(timezone.utc).timestamp() + 86400*7}, JWT_SECRET, algorithm="HS256")
 
+# Verified JWT payloads keyed by token hash, and user documents keyed by user id
+TOKEN_CACHE = TTLCache(maxsize=int(os.environ.get("TOKEN_CACHE_SIZE", 10000)), ttl=float(os.environ.get("TOKEN_CACHE_TTL", 300)))
+USER_CACHE = TTLCache(maxsize=int(os.environ.get("USER_CACHE_SIZE", 10000)), ttl=float(os.environ.get("USER_CACHE_TTL", 60)))
+
+def invalidate_user(uid: str):
+    USER_CACHE.invalidate(uid)
+
+def decode_token(token: str) -> dict:
+    key = hashlib.sha256(token.encode()).hexdigest()
+    p = TOKEN_CACHE.get(key)
+    now = datetime.now(timezone.utc).timestamp()
+    if p is None:
+        try: p = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+        except jwt.ExpiredSignatureError: raise HTTPException(401, "Token expired")
+        except Exception: raise HTTPException(401, "Invalid token")
+        if "user_id" not in p: raise HTTPException(401, "Invalid token")
+        TOKEN_CACHE.set(key, p, ttl=min(TOKEN_CACHE.ttl, p.get("exp", now) - now))
+    elif p.get("exp", now) <= now:
+        TOKEN_CACHE.invalidate(key)
+        raise HTTPException(401, "Token expired")
+    return p
+
+# Set by POST /api/batch once it has authenticated, so its sub-requests skip token and user lookups
+BATCH_USER = contextvars.ContextVar("batch_user", default=None)
+
 async def current_user(cred: HTTPAuthorizationCredentials = Depends(security)):
+    if BATCH_USER.get() is not None: return dict(BATCH_USER.get())
     if not cred: raise HTTPException(401, "Not authenticated")
-    try:
-        p = jwt.decode(cred.credentials, JWT_SECRET, algorithms=["HS256"])
-        u = await db.users.find_one({"id": p["user_id"]}, {"_id": 0})
+    uid = decode_token(cred.credentials)["user_id"]
+    u = USER_CACHE.get(uid)
+    if u is None:
+        u = await db.users.find_one({"id": uid}, {"_id": 0, "password_hash": 0})
         if not u: raise HTTPException(401, "User not found")
-        return u
-    except jwt.ExpiredSignatureError: raise HTTPException(401, "Token expired")
-    except Exception: raise HTTPException(401, "Invalid token")
+        USER_CACHE.set(uid, u)
+    return dict(u)
+
+# ── Joins ──
+# Write-time search and facet keys never leave the server
+COMPANY_HIDDEN = {f: 0 for f in (*search.SEARCH_FIELDS, "industry_key", "hq_key", "import_key", "content_hash")}
+EXPO_HIDDEN = {"region_key": 0, "industry_key": 0}
+
+async def fetch_by_ids(coll, ids, proj: Optional[dict] = None) -> dict:
+    ids = [i for i in ids if i]
+    if not ids: return {}
+    docs = await coll.find({"id": {"$in": ids}}, {"_id": 0, **(proj or {})}).to_list(None)
+    return {d["id"]: d for d in docs}
+
+async def load_refs(items: list, company_proj: Optional[dict] = None, expo_proj: Optional[dict] = None):
+    # One $in query per referenced collection, regardless of len(items)
+    return await asyncio.gather(
+        fetch_by_ids(db.companies, {i.get("company_id") for i in items}, company_proj or COMPANY_HIDDEN),
+        fetch_by_ids(db.expos, {i.get("expo_id") for i in items}, expo_proj or EXPO_HIDDEN))
+
+async def attach_refs(items: list, joins: Optional[dict] = None) -> list:
+    # joins from parse_fields: only the named joins are fetched, each with its own projection
+    if joins is None: companies, expos = await load_refs(items)
+    else:
+        ids = lambda j: {i.get(f"{j}_id") for i in items} if j in joins else ()
+        companies, expos = await asyncio.gather(
+            fetch_by_ids(db.companies, ids("company"), sparse_projection(joins.get("company"), COMPANY_HIDDEN)),
+            fetch_by_ids(db.expos, ids("expo"), sparse_projection(joins.get("expo"), EXPO_HIDDEN)))
+    for i in items:
+        c = companies.get(i.get("company_id"))
+        if c: i["company"] = c
+        e = expos.get(i.get("expo_id"))
+        if e: i["expo"] = e
+    return items
+
+# ── Expo Stats ──
+# expos.company_count is maintained incrementally on every company insert/delete
+async def bump_company_count(expo_id: str, delta: int):
+    # Only once counted: $inc on a pre-counter expo would store just the delta, which fill_company_counts then trusts
+    if expo_id and delta: await db.expos.update_one({"id": expo_id, "company_count": {"$exists": True}}, {"$inc": {"company_count": delta}})
+
+def company_count_pipeline(expo_ids: Optional[list] = None) -> list:
+    # Sorting on expo_id first lets the $group read the expo_id index instead of every document
+    return ([{"$match": {"expo_id": {"$in": expo_ids}}}] if expo_ids is not None else []) + \
+           [{"$sort": {"expo_id": 1}}, {"$group": {"_id": "$expo_id", "n": {"$sum": 1}}}]
+
+async def count_companies_by_expo(expo_ids: Optional[list] = None) -> dict:
+    return {r["_id"]: r["n"] for r in await db.companies.aggregate(company_count_pipeline(expo_ids)).to_list(None)}
+
+async def settle_company_count(expo_id: str, tries: int = 3) -> int:
+    # Compare-and-set until a count taken after reading the stored value matches it. A bump skipped before the
+    # first $set (no field yet) shows up in the recount; one that lands mid-round fails the CAS and is recounted.
+    for _ in range(tries):
+        stored = (await db.expos.find_one({"id": expo_id}, {"_id": 0, "company_count": 1}) or {}).get("company_count")
+        n = (await count_companies_by_expo([expo_id])).get(expo_id, 0)
+        if stored == n: break
+        await db.expos.update_one({"id": expo_id, "company_count": stored}, {"$set": {"company_count": n}})
+    return n
+
+async def fill_company_counts(expos: list) -> list:
+    # Self-heal expos created before counters existed; costs nothing once they are populated
+    for e in expos:
+        if "company_count" not in e: e["company_count"] = await settle_company_count(e["id"])
+    return expos
+
+async def rebuild_expo_stats() -> dict:
+    counts = await count_companies_by_expo()
+    expos = await db.expos.find({}, {"_id": 0, "id": 1, "company_count": 1}).sort("_id", 1).to_list(None)
+    drifted = [UpdateOne({"id": e["id"]}, {"$set": {"company_count": counts.get(e["id"], 0)}})
+               for e in expos if e.get("company_count") != counts.get(e["id"], 0)]
+    if drifted: await db.expos.bulk_write(drifted, ordered=False)
+    return {"expos": len(expos), "corrected": len(drifted)}
+
+# ── Indexes ──
+# Every query shape the routers issue must be served by one of these (see QUERY_SHAPES and audit_query_plans)
+COMPANY_KEY = [("expo_id", 1), ("import_key", 1)]
+INDEXES = {
+    "users": [([("id", 1)], {"unique": True}), ([("email", 1)], {"unique": True})],
+    "expos": [([("id", 1)], {"unique": True}), ([("region", 1)], {}), ([("industry", 1)], {}),
+              ([("region_key", 1)], {}), ([("industry_key", 1)], {})],
+    "companies": [([("id", 1)], {"unique": True}), ([("expo_id", 1), ("name", 1)], {}), ([("expo_id", 1), ("_id", 1)], {}),
+                  ([("name", 1)], {}), ([("industry", 1)], {}), ([("hq", 1)], {}), ([("revenue", 1)], {}),
+                  ([("industry_key", 1), ("_id", 1)], {}), ([("hq_key", 1), ("_id", 1)], {}),
+                  ([("expo_id", 1), ("industry_key", 1), ("_id", 1)], {}), ([("expo_id", 1), ("hq_key", 1), ("_id", 1)], {}),
+                  ([("import_key", 1), ("expo_id", 1)], {}),
+                  # Enforces one company per (name, booth) in an expo, so concurrent upsert imports cannot both insert
+                  (COMPANY_KEY, {"unique": True, "partialFilterExpression": {"import_key": {"$type": "string"}}}),
+                  ([("expo_id", 1), ("revenue", 1)], {}), ([("search_prefixes", 1), ("search_name", 1)], {}),
+                  ([("expo_id", 1), ("search_prefixes", 1), ("search_name", 1)], {}), ([("search_grams", 1)], {}),
+                  ([("search_name", 1)], {}), ([("expo_id", 1), ("search_name", 1)], {})],
+    "shortlists": [([("id", 1)], {"unique": True}), ([("user_id", 1), ("company_id", 1), ("expo_id", 1)], {"unique": True}),
+                   ([("user_id", 1), ("_id", 1)], {}), ([("user_id", 1), ("expo_id", 1), ("_id", 1)], {}),
+                   ([("user_id", 1), ("updated_at", 1)], {}), ([("updated_at", 1)], {})],
+    "networks": [([("id", 1)], {"unique": True}), ([("user_id", 1), ("_id", 1)], {}),
+                 ([("user_id", 1), ("expo_id", 1), ("_id", 1)], {}), ([("user_id", 1), ("status", 1), ("_id", 1)], {}),
+                 ([("user_id", 1), ("updated_at", 1)], {}), ([("updated_at", 1)], {})],
+    "import_jobs": [([("id", 1)], {"unique": True}), ([("created_at", -1)], {}), ([("status", 1)], {})],
+    "expo_days": [([("id", 1)], {"unique": True}), ([("user_id", 1), ("time_slot", 1), ("_id", 1)], {}),
+                  ([("user_id", 1), ("expo_id", 1), ("time_slot", 1), ("_id", 1)], {}), ([("user_id", 1), ("updated_at", 1)], {}),
+                  ([("updated_at", 1)], {})],
+    "tombstones": [([("user_id", 1), ("updated_at", 1)], {}),
+                   ([("updated_at", 1)], {"expireAfterSeconds": int(os.environ.get("TOMBSTONE_DAYS", 30)) * 86400})],
+}
+
+async def ensure_indexes():
+    for coll, specs in INDEXES.items():
+        for keys, opts in specs:
+            try: await db[coll].create_index(keys, **opts)
+            except Exception as e: logger.error(f"Index {coll}{keys} not created: {e}")
+
+# ── Pagination ──
+# Keyset pagination: the body stays a plain list, the opaque cursor for the next page
+# is returned in X-Next-Cursor and an optional total estimate in X-Total-Count.
+DEFAULT_PAGE, MAX_PAGE, TOTAL_COUNT_CAP = 500, 1000, 10000
+ID_KEY, SLOT_KEY = ("_id",), ("time_slot", "_id")
+
+def encode_cursor(doc: dict, keys: tuple) -> str:
+    vals = [str(doc[k]) if k == "_id" else doc.get(k) for k in keys]
+    return base64.urlsafe_b64encode(json.dumps(vals).encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, keys: tuple) -> list:
+    try:
+        vals = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if len(vals) != len(keys): raise ValueError
+        return [ObjectId(v) if k == "_id" else v for k, v in zip(keys, vals)]
+    except Exception: raise HTTPException(400, "Invalid cursor")
+
+def after_cursor(keys: tuple, vals: list) -> dict:
+    # (k1 > v1) OR (k1 == v1 AND k2 > v2) ... for an ascending sort on keys
+    branches = [{**{keys[j]: vals[j] for j in range(i)}, keys[i]: {"$gt": vals[i]}} for i in range(len(keys))]
+    return branches[0] if len(branches) == 1 else {"$or": branches}
+
+async def estimate_total(coll, q: dict) -> int:
+    if not q: return await coll.estimated_document_count()
+    if coll.name == "companies" and list(q) == ["expo_id"]:
+        e = await db.expos.find_one({"id": q["expo_id"]}, {"_id": 0, "company_count": 1})
+        if e and "company_count" in e: return e["company_count"]
+    return await coll.count_documents(q, limit=TOTAL_COUNT_CAP)
+
+def page_spec(q: dict, keys: tuple = ID_KEY, cursor: Optional[str] = None) -> tuple:
+    # (filter, sort) of one keyset page
+    return ({"$and": [q, after_cursor(keys, decode_cursor(cursor, keys))]} if cursor else q), [(k, 1) for k in keys]
+
+async def paginate(coll, q: dict, response: Response, limit: int, cursor: Optional[str] = None,
+                   with_total: bool = False, keys: tuple = ID_KEY, proj: Optional[dict] = None) -> list:
+    limit = max(1, min(limit, MAX_PAGE))
+    page_q, sort = page_spec(q, keys, cursor)
+    docs = await coll.find(page_q, proj).sort(sort).limit(limit + 1).to_list(None)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1], keys)
+    if with_total: response.headers["X-Total-Count"] = str(await estimate_total(coll, q))
+    for d in docs: d.pop("_id", None)
+    return docs
+
+def owned_query(user_id: str, **filters) -> dict:
+    # A user's own shortlists, networks or expo days; filters left as None are not applied
+    return {"user_id": user_id, **{k: v for k, v in filters.items() if v}}
+
+# ── Sparse Fieldsets ──
+# fields=id,name,booth limits list responses to those fields (id is always included) and is pushed
+# down as a Mongo inclusion projection; company.x / expo.x select fields of the joined documents
+# and a join that is not named is not fetched at all. Write-time keys stay hidden either way.
+FIELD_PATH = re.compile(r"[A-Za-z_]\w*(\.[A-Za-z_]\w*)*")
+JOINS = ("company", "expo")
+
+def parse_fields(fields: Optional[str], joins: tuple = ()) -> tuple:
+    # "id,notes,company.name,expo" -> ({"id", "notes"}, {"company": {"id", "name"}, "expo": None}); None joins whole docs
+    if fields is None: return None, None
+    top, nested = {"id"}, {}
+    for f in filter(None, (x.strip() for x in fields.split(","))):
+        if not FIELD_PATH.fullmatch(f): raise HTTPException(400, f"Invalid field: {f}")
+        head, _, rest = f.partition(".")
+        if head not in joins: top.add(f)
+        elif not rest: nested[head] = None
+        elif nested.get(head, set()) is not None: nested.setdefault(head, {"id"}).add(rest)
+    return top, nested
+
+def collapse_paths(paths) -> set:
+    # Mongo rejects a projection naming both "contacts" and "contacts.name"; the parent covers the child
+    return {p for p in paths if not any(p.startswith(q + ".") for q in paths)}
+
+def sparse_projection(fields: Optional[set], hidden: dict) -> Optional[dict]:
+    if fields is None: return hidden or None
+    return {f: 1 for f in collapse_paths(fields) if f.split(".")[0] not in hidden}
+
+def droppable(extra: set, fields: set) -> set:
+    # Fields fetched only for the server's use, minus parents of requested paths, which stay in the response
+    return {e for e in extra if not any(f.startswith(e + ".") for f in fields)}
+
+def drop_fields(docs: list, keys) -> list:
+    for d in docs:
+        for k in keys: d.pop(k, None)
+    return docs
+
+async def sparse_page(coll, q: dict, response: Response, limit: int, cursor: Optional[str], with_total: bool,
+                      fields: Optional[str], keys: tuple = ID_KEY) -> list:
+    # paginate + attach_refs for user documents
+    top, joins = parse_fields(fields, JOINS)
+    if top is None: return await attach_refs(await paginate(coll, q, response, limit, cursor, with_total, keys))
+    extra = {*keys, *(f"{j}_id" for j in joins)} - top - {"_id"}
+    docs = await paginate(coll, q, response, limit, cursor, with_total, keys, proj=sparse_projection(top | extra, {}))
+    return drop_fields(await attach_refs(docs, joins), droppable(extra, top))
+
+# ── Facet Keys ──
+# Filters match canonical keys written alongside the display value; match=substring keeps the old regex
+MATCH_MODES = ("exact", "substring")
+
+def facet_filter(q: dict, field: str, value: Optional[str], match: str):
+    if not value: return
+    if match not in MATCH_MODES: raise HTTPException(400, f"Invalid match. Must be one of: {list(MATCH_MODES)}")
+    if match == "substring": q[field] = {"$regex": value, "$options": "i"}
+    else: q[f"{field}_key"] = facet_key(value)
+
+def missing_any(fields) -> dict:
+    # Documents written before one of `fields` existed; each branch is served by that field's index
+    conds = [{f: {"$exists": False}} for f in fields]
+    return conds[0] if len(conds) == 1 else {"$or": conds}
+
+async def bulk_set(coll, query: dict, projection: dict, make_set, batch_size: int = 1000) -> int:
+    # Shared by the backfills: $sets make_set(doc) on every match in unordered batches, returns documents written.
+    # A write that would break a unique index is skipped and logged (see dedupe_companies), anything else raises.
+    cursor, n = coll.find(query, {"_id": 1, **projection}), 0
+    while True:
+        batch = await cursor.to_list(batch_size)
+        if not batch: return n
+        try:
+            await coll.bulk_write([UpdateOne({"_id": d["_id"]}, {"$set": make_set(d)}) for d in batch], ordered=False)
+            n += len(batch)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(err.get("code") != importer.DUPLICATE_KEY for err in errors): raise
+            n += len(batch) - len(errors)
+            logger.warning(f"{coll.name}: {len(errors)} documents not updated, they duplicate a unique key")
+
+async def backfill_facet_keys(batch_size: int = 1000) -> dict:
+    return {coll: await bulk_set(db[coll], missing_any(f"{f}_key" for f in fields), {f: 1 for f in fields},
+                                 lambda d, fields=fields: {f"{f}_key": facet_key(d.get(f)) for f in fields}, batch_size)
+            for coll, fields in FACET_FIELDS.items()}
+
+def company_conditions(industry: Optional[str], hq: Optional[str], match: str,
+                       min_revenue: Optional[float], max_revenue: Optional[float]) -> dict:
+    # One condition per facet, so /companies/facets can leave a facet's own filter out of its counts
+    conds = {}
+    for field, value in (("industry", industry), ("hq", hq)):
+        c = {}
+        facet_filter(c, field, value, match)
+        if c: conds[field] = c
+    rev = {}
+    if min_revenue is not None: rev["$gte"] = min_revenue
+    if max_revenue is not None: rev["$lte"] = max_revenue
+    if rev: conds["revenue"] = {"revenue": rev}
+    return conds
+
+def company_query(expo_id: Optional[str], industry: Optional[str], hq: Optional[str], match: str,
+                  min_revenue: Optional[float], max_revenue: Optional[float]) -> dict:
+    q = {"expo_id": expo_id} if expo_id else {}
+    for cond in company_conditions(industry, hq, match, min_revenue, max_revenue).values(): q.update(cond)
+    return q
+
+async def backfill_import_keys(batch_size: int = 1000) -> dict:
+    return {"companies": await bulk_set(db.companies, missing_any(("import_key",)), {f: 1 for f in importer.IMPORTED_FIELDS},
+                                        importer.identity_fields, batch_size)}
+
+async def dedupe_companies(batch_size: int = 1000) -> dict:
+    # A CSV uploaded twice before the unique COMPANY_KEY index existed stored each company twice. Keeps the
+    # oldest copy of each (expo_id, import_key), moves shortlists, networks and expo days onto it and deletes
+    # the rest. Copies the backfill could not key are found by their computed key; keyed duplicates can only
+    # exist while the unique index is missing, so that full-collection group runs only then.
+    proj = {"_id": 1, "id": 1, "expo_id": 1, "shortlist_stage": 1, **{f: 1 for f in importer.IMPORTED_FIELDS}}
+    groups = {}
+    async for c in db.companies.find(missing_any(("import_key",)), proj):
+        groups.setdefault((c.get("expo_id"), importer.identity_fields(c)["import_key"]), []).append(c)
+    for (expo_id, key), docs in groups.items():
+        docs += await db.companies.find({"expo_id": expo_id, "import_key": key}, proj).to_list(None)
+    indexes = (await db.companies.index_information()).values()
+    if not any(ix.get("unique") and [(k, int(d)) for k, d in ix["key"]] == COMPANY_KEY for ix in indexes):
+        async for g in db.companies.aggregate([
+                {"$match": {"import_key": {"$type": "string"}}},
+                {"$group": {"_id": {"expo_id": "$expo_id", "key": "$import_key"}, "n": {"$sum": 1}}},
+                {"$match": {"n": {"$gt": 1}}}], allowDiskUse=True):
+            expo_id, key = g["_id"].get("expo_id"), g["_id"]["key"]
+            if (expo_id, key) not in groups:
+                groups[(expo_id, key)] = await db.companies.find({"expo_id": expo_id, "import_key": key}, proj).to_list(None)
+    moved, keepers, extras = {}, [], []
+    for docs in groups.values():
+        if len(docs) < 2: continue
+        keep, *rest = sorted(docs, key=lambda d: d["_id"])
+        keepers.append((keep, next((d["shortlist_stage"] for d in rest if d.get("shortlist_stage") not in (None, "", "none")), None)))
+        extras += rest
+        moved.update((d["id"], keep["id"]) for d in rest)
+    if not extras: return {"merged": 0}
+    for coll in SYNC_COLLECTIONS:
+        ids = list(moved)
+        for i in range(0, len(ids), batch_size):
+            async for d in db[coll].find({"company_id": {"$in": ids[i:i + batch_size]}}, {"_id": 0, "id": 1, "user_id": 1, "company_id": 1}):
+                try: await db[coll].update_one({"id": d["id"]}, {"$set": {"company_id": moved[d["company_id"]], "updated_at": sync_now()}})
+                except DuplicateKeyError:  # the user already has one on the kept copy
+                    await tombstone(coll, d["id"], d["user_id"], await db[coll].delete_one({"id": d["id"]}))
+    await db.companies.delete_many({"_id": {"$in": [d["_id"] for d in extras]}})
+    for keep, stage in keepers:
+        fix = {} if "import_key" in keep else importer.identity_fields(keep)
+        if stage and keep.get("shortlist_stage") in (None, "", "none"): fix["shortlist_stage"] = stage
+        if fix: await db.companies.update_one({"_id": keep["_id"]}, {"$set": fix})
+    per_expo = {}
+    for d in extras: per_expo[d.get("expo_id")] = per_expo.get(d.get("expo_id"), 0) - 1
+    for expo_id, delta in per_expo.items(): await bump_company_count(expo_id, delta)
+    logger.warning(f"Merged {len(extras)} duplicate companies into {len(keepers)} originals: {sorted(moved)[:20]}")
+    return {"merged": len(extras), "kept": len(keepers)}
+
+# ── Search ──
+SEARCH_MODES = ("prefix", "fuzzy", "substring")
+SEARCH_CANDIDATES = 2000
+
+async def search_companies(text: str, q: dict, limit: int, mode: str = "prefix", fields: Optional[set] = None) -> list:
+    if mode not in SEARCH_MODES: raise HTTPException(400, f"Invalid search_mode. Must be one of: {list(SEARCH_MODES)}")
+    limit = max(1, min(limit, MAX_PAGE))
+    if fields is None: return await ranked_companies(text, q, limit, mode, {"_id": 0, **COMPANY_HIDDEN})
+    # ranking reads the weighted fields, so they are fetched and dropped after
+    extra = set(search.FIELD_WEIGHTS) - fields
+    return drop_fields(await ranked_companies(text, q, limit, mode, {"_id": 0, **sparse_projection(fields | extra, COMPANY_HIDDEN)}),
+                       droppable(extra, fields))
+
+def substring_query(q: dict, text: str) -> dict:
+    return {**q, "name": {"$regex": text, "$options": "i"}}
+
+def prefix_queries(q: dict, text: str) -> Optional[tuple]:
+    # Names starting with the query outrank every other match, so they are read first (index order on
+    # search_name); the remaining slots take other prefix matches in the same order, never an arbitrary subset
+    pf = search.prefix_filter(text)
+    if not pf: return None
+    starts = search.name_start_pattern(text)
+    return {**q, "search_name": starts}, {**q, **pf, "search_name": {"$not": starts}}
+
+def fuzzy_pipeline(q: dict, grams: list, proj: dict) -> list:
+    return [{"$match": {**q, "search_grams": {"$in": grams}}},
+            {"$addFields": {"_overlap": {"$size": {"$filter": {"input": "$search_grams", "cond": {"$in": ["$$this", grams]}}}}}},
+            {"$sort": {"_overlap": -1}}, {"$limit": SEARCH_CANDIDATES // 10},
+            {"$project": proj if 1 in proj.values() else {**proj, "_overlap": 0}}]
+
+async def ranked_companies(text: str, q: dict, limit: int, mode: str, proj: dict) -> list:
+    if mode == "substring":
+        return await db.companies.find(substring_query(q, text), proj).sort("_id", 1).limit(limit).to_list(None)
+    if mode == "prefix":
+        queries = prefix_queries(q, text)
+        if not queries: return []
+        starts, rest = queries
+        docs = await db.companies.find(starts, proj).sort("search_name", 1).limit(SEARCH_CANDIDATES).to_list(None)
+        if len(docs) < SEARCH_CANDIDATES:
+            docs += await db.companies.find(rest, proj).sort("search_name", 1).limit(SEARCH_CANDIDATES - len(docs)).to_list(None)
+        return search.rank(docs, text, limit=limit)
+    grams = search.query_grams(text)
+    if not grams: return []
+    return search.rank(await db.companies.aggregate(fuzzy_pipeline(q, grams, proj)).to_list(None), text, fuzzy=True, limit=limit)
+
+async def reindex_search(batch_size: int = 1000, only_missing: bool = False) -> dict:
+    # only_missing runs at startup so companies stored before a search field existed become searchable
+    q = missing_any(search.SEARCH_FIELDS) if only_missing else {}
+    return {"reindexed": await bulk_set(db.companies, q, {"name": 1, "industry": 1, "hq": 1, "contacts": 1},
+                                        search.index_fields, batch_size)}
 
 # ── Models ──
 class AuthIn(BaseModel):
@@ -71,12 +483,19 @@ class ExpoDayIn(BaseModel):
     booth: Optional[str] = ""
     notes: Optional[str] = ""
 
+class BatchCall(BaseModel):
+    id: Optional[str] = None
+    path: str
+
+class BatchIn(BaseModel):
+    requests: List[BatchCall]
+
 # ── Auth ──
 @api_router.post("/auth/register")
 async def register(data: AuthIn):
     if await db.users.find_one({"email": data.email}):
         raise HTTPException(400, "Email already registered")
-    u = {"id": str(uuid.uuid4()), "email": data.email, "password_hash": hash_pw(data.password),
+    u = {"id": str(uuid.uuid4()), "email": data.email, "password_hash": await hash_pw_async(data.password),
          "name": data.name or data.email.split("@")[0], "role": "user", "created_at": datetime.now(timezone.utc).isoformat()}
     await db.users.insert_one(u)
     return {"token": make_token(u["id"], u["role"]), "user": {"id": u["id"], "email": u["email"], "name": u["name"], "role": u["role"]}}
@@ -84,7 +503,7 @@ async def register(data: AuthIn):
 @api_router.post("/auth/login")
 async def login(data: AuthIn):
     u = await db.users.find_one({"email": data.email}, {"_id": 0})
-    if not u or not verify_pw(data.password, u["password_hash"]):
+    if not u or not await verify_pw_async(data.password, u["password_hash"]):
         raise HTTPException(401, "Invalid credentials")
     return {"token": make_token(u["id"], u["role"]), "user": {"id": u["id"], "email": u["email"], "name": u["name"], "role": u["role"]}}
 
@@ -92,123 +511,240 @@ async def login(data: AuthIn):
 async def get_me(user=Depends(current_user)):
     return {"id": user["id"], "email": user["email"], "name": user["name"], "role": user["role"]}
 
+# ── Read Coalescing ──
+# Identical concurrent reads of public (not user-scoped) routes share one Mongo round trip: the
+# first request runs the query and later arrivals with the same route and query await its result.
+READS = SingleFlight()
+
+def read_key(request: Request) -> tuple:
+    return (request.url.path, tuple(sorted((k, v) for k, v in request.query_params.multi_items() if v != "")))
+
+async def coalesce(request: Optional[Request], response: Optional[Response], fn):
+    # fn(response) -> body; followers get the leader's body and its X- headers (cursor, total)
+    if request is None: return await fn(response)
+    async def run():
+        shadow = Response()
+        body = await fn(shadow)
+        return body, [(k, v) for k, v in shadow.headers.items() if k.startswith("x-")]
+    body, headers = await READS.do(read_key(request), run)
+    if response is not None:
+        for k, v in headers: response.headers[k] = v
+    return body
+
+# ── Catalog Cache ──
+# Expo and filter-option responses only change on CSV import, seed and stage updates, which call
+# invalidate_catalog(). Bodies are cached per negotiated media type (JSON or MessagePack) with a
+# strong ETag; If-None-Match revalidation gets a 304.
+# CATALOG_CACHE_SHARED=1 keeps several workers coherent through a version counter in Mongo,
+# checked at most every CATALOG_SYNC_INTERVAL seconds.
+CATALOG_CACHE = VersionedCache(maxsize=int(os.environ.get("CATALOG_CACHE_SIZE", 1000)), ttl=float(os.environ.get("CATALOG_CACHE_TTL", 300)))
+CATALOG_SHARED = os.environ.get("CATALOG_CACHE_SHARED", "0") == "1"
+CATALOG_SYNC_INTERVAL = float(os.environ.get("CATALOG_SYNC_INTERVAL", 1.0))
+_catalog_synced_at = float("-inf")
+
+async def sync_catalog_version():
+    global _catalog_synced_at
+    if not CATALOG_SHARED or CATALOG_CACHE.clock() - _catalog_synced_at < CATALOG_SYNC_INTERVAL: return
+    _catalog_synced_at = CATALOG_CACHE.clock()
+    doc = await db.cache_versions.find_one({"_id": "catalog"})
+    if doc and doc["v"] != CATALOG_CACHE.version: CATALOG_CACHE.bump(doc["v"])
+
+async def invalidate_catalog():
+    if not CATALOG_SHARED: return CATALOG_CACHE.bump()
+    doc = await db.cache_versions.find_one_and_update({"_id": "catalog"}, {"$inc": {"v": 1}}, upsert=True, return_document=True)
+    CATALOG_CACHE.bump(doc["v"])
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header: return False
+    tags = [t.strip() for t in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+async def catalog_response(request: Request, compute) -> Response:
+    await sync_catalog_version()
+    media_type = serialize.negotiated_type(request.headers.get("accept", ""))
+    key = (*read_key(request), media_type)
+    hit = CATALOG_CACHE.get(key)
+    if hit is None:
+        async def fill():
+            version = CATALOG_CACHE.version
+            body = serialize.encode(await compute(), media_type)
+            entry = ('"' + hashlib.sha256(body).hexdigest()[:32] + '"', body)
+            CATALOG_CACHE.set_if_current(key, entry, version)
+            return entry
+        hit = await READS.do(key, fill)
+    etag, body = hit
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if etag_matches(request.headers.get("if-none-match"), etag): return Response(status_code=304, headers=headers)
+    return Response(body, media_type=media_type, headers=headers)
+
 # ── Expos ──
-@api_router.get("/expos")
-async def get_expos(region: Optional[str] = None, industry: Optional[str] = None):
+def expo_query(region: Optional[str], industry: Optional[str], match: str) -> dict:
     q = {}
-    if region: q["region"] = {"$regex": region, "$options": "i"}
-    if industry: q["industry"] = {"$regex": industry, "$options": "i"}
-    expos = await db.expos.find(q, {"_id": 0}).to_list(100)
-    for e in expos:
-        e["company_count"] = await db.companies.count_documents({"expo_id": e["id"]})
-    return expos
+    facet_filter(q, "region", region, match)
+    facet_filter(q, "industry", industry, match)
+    return q
+
+@api_router.get("/expos")
+async def get_expos(request: Request, region: Optional[str] = None, industry: Optional[str] = None, match: str = "exact"):
+    q = expo_query(region, industry, match)
+    async def compute():
+        return await fill_company_counts(await db.expos.find(q, {"_id": 0, **EXPO_HIDDEN}).sort("_id", 1).limit(100).to_list(None))
+    return await catalog_response(request, compute)
 
 @api_router.get("/expos/{eid}")
-async def get_expo(eid: str):
-    e = await db.expos.find_one({"id": eid}, {"_id": 0})
-    if not e: raise HTTPException(404, "Expo not found")
-    e["company_count"] = await db.companies.count_documents({"expo_id": eid})
-    return e
+async def get_expo(eid: str, request: Request):
+    async def compute():
+        e = await db.expos.find_one({"id": eid}, {"_id": 0, **EXPO_HIDDEN})
+        if not e: raise HTTPException(404, "Expo not found")
+        return (await fill_company_counts([e]))[0]
+    return await catalog_response(request, compute)
 
 @api_router.get("/expos/meta/filters")
-async def expo_filters():
-    regions = await db.expos.distinct("region")
-    industries = await db.expos.distinct("industry")
-    return {"regions": sorted([r for r in regions if r]), "industries": sorted([i for i in industries if i])}
+async def expo_filters(request: Request):
+    async def compute():
+        regions = await db.expos.distinct("region")
+        industries = await db.expos.distinct("industry")
+        return {"regions": sorted([r for r in regions if r]), "industries": sorted([i for i in industries if i])}
+    return await catalog_response(request, compute)
 
 # ── Companies ──
 @api_router.get("/companies")
 async def get_companies(expo_id: Optional[str] = None, industry: Optional[str] = None,
-                        hq: Optional[str] = None, min_revenue: Optional[float] = None,
-                        max_revenue: Optional[float] = None, search: Optional[str] = None):
-    q = {}
-    if expo_id: q["expo_id"] = expo_id
-    if industry: q["industry"] = {"$regex": industry, "$options": "i"}
-    if hq: q["hq"] = {"$regex": hq, "$options": "i"}
-    if min_revenue is not None or max_revenue is not None:
-        q["revenue"] = {}
-        if min_revenue is not None: q["revenue"]["$gte"] = min_revenue
-        if max_revenue is not None: q["revenue"]["$lte"] = max_revenue
-        if not q["revenue"]: del q["revenue"]
-    if search: q["name"] = {"$regex": search, "$options": "i"}
-    return await db.companies.find(q, {"_id": 0}).to_list(500)
+                        hq: Optional[str] = None, match: str = "exact", min_revenue: Optional[float] = None,
+                        max_revenue: Optional[float] = None, search: Optional[str] = None, search_mode: str = "prefix",
+                        response: Response = None, limit: int = DEFAULT_PAGE, cursor: Optional[str] = None, with_total: bool = False,
+                        fields: Optional[str] = None, request: Request = None):
+    q = company_query(expo_id, industry, hq, match, min_revenue, max_revenue)
+    top, _ = parse_fields(fields)
+    if search: return await coalesce(request, None, lambda _: search_companies(search, q, limit, search_mode, top))  # ranked, single page
+    proj = sparse_projection(top, COMPANY_HIDDEN)
+    return await coalesce(request, response, lambda r: paginate(db.companies, q, r, limit, cursor, with_total, proj=proj))
+
+@api_router.get("/companies/facets")
+async def company_facets(expo_id: str, industry: Optional[str] = None, hq: Optional[str] = None,
+                         match: str = "exact", min_revenue: Optional[float] = None, max_revenue: Optional[float] = None,
+                         limit: int = 50, cursor: Optional[str] = None, buckets: int = 8, request: Request = None):
+    return await coalesce(request, None, lambda _: facet_page(expo_id, industry, hq, match, min_revenue, max_revenue, limit, cursor, buckets))
+
+def facet_pipeline(expo_id: str, conds: dict, limit: int, cursor: Optional[str], buckets: int) -> list:
+    # Each facet's counts apply every filter except its own, so no filter but expo_id is common to all
+    # branches; expo_id is required because without it every facet would read the whole collection.
+    def others(skip: Optional[str] = None) -> dict:
+        return {"$match": {k: v for f, c in conds.items() if f != skip for k, v in c.items()}}
+    def counts(field: str) -> list:
+        return [others(field), {"$group": {"_id": f"${field}", "count": {"$sum": 1}}}, {"$sort": {"count": -1, "_id": 1}}]
+    items_match = others()
+    if cursor: items_match = {"$match": {"$and": [items_match["$match"], after_cursor(ID_KEY, decode_cursor(cursor, ID_KEY))]}}
+    return [{"$match": {"expo_id": expo_id}}, {"$facet": {
+        "items": [items_match, {"$sort": {"_id": 1}}, {"$limit": limit + 1}, {"$project": COMPANY_HIDDEN}],
+        "total": [others(), {"$count": "n"}],
+        "industries": counts("industry"), "hqs": counts("hq"),
+        "revenue": [others("revenue"), {"$match": {"revenue": {"$type": "number"}}},
+                    {"$bucketAuto": {"groupBy": "$revenue", "buckets": max(1, min(buckets, 50))}}]}}]
+
+async def facet_page(expo_id, industry, hq, match, min_revenue, max_revenue, limit, cursor, buckets) -> dict:
+    # Page of companies plus facet counts in one $facet aggregation whose expo_id $match is served by an index
+    limit = max(1, min(limit, MAX_PAGE))
+    conds = company_conditions(industry, hq, match, min_revenue, max_revenue)
+    r = (await db.companies.aggregate(facet_pipeline(expo_id, conds, limit, cursor, buckets)).to_list(1))[0]
+    items, next_cursor = r["items"], None
+    if len(items) > limit:
+        items = items[:limit]
+        next_cursor = encode_cursor(items[-1], ID_KEY)
+    for i in items: i.pop("_id", None)
+    return {"items": items, "next_cursor": next_cursor, "total": r["total"][0]["n"] if r["total"] else 0,
+            "facets": {"industries": [{"value": x["_id"], "count": x["count"]} for x in r["industries"] if x["_id"]],
+                       "hqs": [{"value": x["_id"], "count": x["count"]} for x in r["hqs"] if x["_id"]],
+                       "revenue": [{"min": b["_id"]["min"], "max": b["_id"]["max"], "count": b["count"]} for b in r["revenue"]]}}
 
 @api_router.get("/companies/{cid}")
-async def get_company(cid: str):
-    c = await db.companies.find_one({"id": cid}, {"_id": 0})
-    if not c: raise HTTPException(404, "Company not found")
-    return c
+async def get_company(cid: str, request: Request = None):
+    async def fetch(_):
+        c = await db.companies.find_one({"id": cid}, {"_id": 0, **COMPANY_HIDDEN})
+        if not c: raise HTTPException(404, "Company not found")
+        return c
+    return await coalesce(request, None, fetch)
 
 @api_router.put("/companies/{cid}/stage")
 async def update_stage(cid: str, stage: str = Form(...), user=Depends(current_user)):
     valid = ["prospecting", "prospecting_complete", "engaging", "closed_won", "closed_lost"]
     if stage not in valid: raise HTTPException(400, f"Invalid stage. Must be one of: {valid}")
-    await db.companies.update_one({"id": cid}, {"$set": {"shortlist_stage": stage}})
+    c = await db.companies.find_one_and_update({"id": cid}, {"$set": {"shortlist_stage": stage}}, {"_id": 0, "id": 1, "expo_id": 1})
+    await invalidate_catalog()
+    if c: notify(events.stage_event({**c, "shortlist_stage": stage}))
     return {"status": "updated", "stage": stage}
 
+def revenue_bound_query(q: dict) -> dict:
+    return {**q, "revenue": {"$type": "number"}}
+
 @api_router.get("/companies/filters/options")
-async def company_filter_options(expo_id: Optional[str] = None):
-    q = {"expo_id": expo_id} if expo_id else {}
-    pipeline = [{"$match": q}, {"$group": {"_id": None,
-        "industries": {"$addToSet": "$industry"}, "hqs": {"$addToSet": "$hq"},
-        "min_revenue": {"$min": "$revenue"}, "max_revenue": {"$max": "$revenue"}}}]
-    r = await db.companies.aggregate(pipeline).to_list(1)
-    if not r: return {"industries": [], "hqs": [], "min_revenue": 0, "max_revenue": 1000}
-    return {"industries": sorted([x for x in r[0].get("industries",[]) if x]),
-            "hqs": sorted([x for x in r[0].get("hqs",[]) if x]),
-            "min_revenue": r[0].get("min_revenue", 0), "max_revenue": r[0].get("max_revenue", 1000)}
+async def company_filter_options(request: Request, expo_id: Optional[str] = None):
+    # Distinct values and the revenue bounds each come from an index, so no request reads every company
+    async def compute():
+        q = {"expo_id": expo_id} if expo_id else {}
+        async def bound(direction):
+            d = await db.companies.find_one(revenue_bound_query(q), {"_id": 0, "revenue": 1}, sort=[("revenue", direction)])
+            return d["revenue"] if d else None
+        industries, hqs, lo, hi = await asyncio.gather(db.companies.distinct("industry", q), db.companies.distinct("hq", q),
+                                                       bound(1), bound(-1))
+        if not industries and not hqs and lo is None: return {"industries": [], "hqs": [], "min_revenue": 0, "max_revenue": 1000}
+        return {"industries": sorted([x for x in industries if x]), "hqs": sorted([x for x in hqs if x]),
+                "min_revenue": lo, "max_revenue": hi}
+    return await catalog_response(request, compute)
 
 # ── Shortlists ──
+async def companies_at_stage(q: dict, stage: str) -> list:
+    # The stage lives on the company, so resolve the matching ids first and filter in the paged query
+    return await db.companies.distinct("id", stage_query(await db.shortlists.distinct("company_id", q), stage))
+
+def stage_query(company_ids: list, stage: str) -> dict:
+    return {"id": {"$in": company_ids}, "shortlist_stage": stage}
+
 @api_router.get("/shortlists")
-async def get_shortlists(stage: Optional[str] = None, expo_id: Optional[str] = None, user=Depends(current_user)):
-    q = {"user_id": user["id"]}
-    if expo_id: q["expo_id"] = expo_id
-    sls = await db.shortlists.find(q, {"_id": 0}).to_list(500)
-    for sl in sls:
-        c = await db.companies.find_one({"id": sl["company_id"]}, {"_id": 0})
-        if c:
-            sl["company"] = c
-            if stage and c.get("shortlist_stage") != stage: continue
-        e = await db.expos.find_one({"id": sl["expo_id"]}, {"_id": 0})
-        if e: sl["expo"] = e
-    if stage:
-        sls = [s for s in sls if s.get("company", {}).get("shortlist_stage") == stage]
-    return sls
+async def get_shortlists(stage: Optional[str] = None, expo_id: Optional[str] = None, response: Response = None,
+                         limit: int = DEFAULT_PAGE, cursor: Optional[str] = None, with_total: bool = False,
+                         fields: Optional[str] = None, user=Depends(current_user)):
+    q = owned_query(user["id"], expo_id=expo_id)
+    if stage: q = {**q, "company_id": {"$in": await companies_at_stage(q, stage)}}
+    return await sparse_page(db.shortlists, q, response, limit, cursor, with_total, fields)
 
 @api_router.post("/shortlists")
 async def create_shortlist(data: ShortlistIn, user=Depends(current_user)):
     existing = await db.shortlists.find_one({"user_id": user["id"], "company_id": data.company_id, "expo_id": data.expo_id})
     if existing: return {"status": "already_exists", "id": existing.get("id", "")}
     sl = {"id": str(uuid.uuid4()), "user_id": user["id"], "company_id": data.company_id,
-          "expo_id": data.expo_id, "notes": data.notes or "", "created_at": datetime.now(timezone.utc).isoformat()}
-    await db.shortlists.insert_one(sl)
-    await db.companies.update_one({"id": data.company_id, "shortlist_stage": {"$in": [None, "", "none"]}},
-                                   {"$set": {"shortlist_stage": "prospecting"}})
+          "expo_id": data.expo_id, "notes": data.notes or "", "created_at": datetime.now(timezone.utc).isoformat(),
+          "updated_at": sync_now()}
+    try: await db.shortlists.insert_one(sl)
+    except DuplicateKeyError:
+        existing = await db.shortlists.find_one({"user_id": user["id"], "company_id": data.company_id, "expo_id": data.expo_id})
+        return {"status": "already_exists", "id": existing.get("id", "") if existing else ""}
+    staged = await db.companies.update_one({"id": data.company_id, "shortlist_stage": {"$in": [None, "", "none"]}},
+                                            {"$set": {"shortlist_stage": "prospecting"}})
+    notify_change("shortlists", "upsert", sl)
+    if staged.modified_count:
+        notify(events.stage_event({"id": data.company_id, "expo_id": data.expo_id, "shortlist_stage": "prospecting"}))
     return {k: v for k, v in sl.items() if k != "_id"}
 
 @api_router.put("/shortlists/{sid}")
 async def update_shortlist(sid: str, notes: str = Form(""), user=Depends(current_user)):
-    await db.shortlists.update_one({"id": sid, "user_id": user["id"]}, {"$set": {"notes": notes}})
+    now = sync_now()
+    r = await db.shortlists.update_one({"id": sid, "user_id": user["id"]}, {"$set": {"notes": notes, "updated_at": now}})
+    if r.matched_count: notify_change("shortlists", "upsert", {"id": sid, "user_id": user["id"], "updated_at": now})
     return {"status": "updated"}
 
 @api_router.delete("/shortlists/{sid}")
 async def delete_shortlist(sid: str, user=Depends(current_user)):
-    await db.shortlists.delete_one({"id": sid, "user_id": user["id"]})
+    await tombstone("shortlists", sid, user["id"], await db.shortlists.delete_one({"id": sid, "user_id": user["id"]}))
     return {"status": "deleted"}
 
 # ── Networks ──
 @api_router.get("/networks")
-async def get_networks(expo_id: Optional[str] = None, status: Optional[str] = None, user=Depends(current_user)):
-    q = {"user_id": user["id"]}
-    if expo_id: q["expo_id"] = expo_id
-    if status: q["status"] = status
-    nets = await db.networks.find(q, {"_id": 0}).to_list(500)
-    for n in nets:
-        c = await db.companies.find_one({"id": n["company_id"]}, {"_id": 0})
-        if c: n["company"] = c
-        e = await db.expos.find_one({"id": n["expo_id"]}, {"_id": 0})
-        if e: n["expo"] = e
-    return nets
+async def get_networks(expo_id: Optional[str] = None, status: Optional[str] = None, response: Response = None,
+                       limit: int = DEFAULT_PAGE, cursor: Optional[str] = None, with_total: bool = False,
+                       fields: Optional[str] = None, user=Depends(current_user)):
+    q = owned_query(user["id"], expo_id=expo_id, status=status)
+    return await sparse_page(db.networks, q, response, limit, cursor, with_total, fields)
 
 @api_router.post("/networks")
 async def create_network(data: NetworkIn, user=Depends(current_user)):
@@ -216,8 +752,9 @@ async def create_network(data: NetworkIn, user=Depends(current_user)):
          "expo_id": data.expo_id, "contact_name": data.contact_name, "contact_role": data.contact_role,
          "status": data.status or "request_sent", "meeting_type": data.meeting_type or "booth_visit",
          "scheduled_time": data.scheduled_time or "", "notes": data.notes or "",
-         "created_at": datetime.now(timezone.utc).isoformat()}
+         "created_at": datetime.now(timezone.utc).isoformat(), "updated_at": sync_now()}
     await db.networks.insert_one(n)
+    notify_change("networks", "upsert", n)
     return {k: v for k, v in n.items() if k != "_id"}
 
 @api_router.put("/networks/{nid}")
@@ -233,34 +770,31 @@ async def update_network(nid: str, status: Optional[str] = Form(None), meeting_t
     if contact_name is not None: updates["contact_name"] = contact_name
     if contact_role is not None: updates["contact_role"] = contact_role
     if updates:
-        await db.networks.update_one({"id": nid, "user_id": user["id"]}, {"$set": updates})
+        now = sync_now()
+        r = await db.networks.update_one({"id": nid, "user_id": user["id"]}, {"$set": {**updates, "updated_at": now}})
+        if r.matched_count: notify_change("networks", "upsert", {"id": nid, "user_id": user["id"], "updated_at": now})
     return {"status": "updated"}
 
 @api_router.delete("/networks/{nid}")
 async def delete_network(nid: str, user=Depends(current_user)):
-    await db.networks.delete_one({"id": nid, "user_id": user["id"]})
+    await tombstone("networks", nid, user["id"], await db.networks.delete_one({"id": nid, "user_id": user["id"]}))
     return {"status": "deleted"}
 
 # ── Expo Days ──
 @api_router.get("/expo-days")
-async def get_expo_days(expo_id: Optional[str] = None, user=Depends(current_user)):
-    q = {"user_id": user["id"]}
-    if expo_id: q["expo_id"] = expo_id
-    eds = await db.expo_days.find(q, {"_id": 0}).sort("time_slot", 1).to_list(500)
-    for ed in eds:
-        c = await db.companies.find_one({"id": ed["company_id"]}, {"_id": 0})
-        if c: ed["company"] = c
-        e = await db.expos.find_one({"id": ed["expo_id"]}, {"_id": 0})
-        if e: ed["expo"] = e
-    return eds
+async def get_expo_days(expo_id: Optional[str] = None, response: Response = None, limit: int = DEFAULT_PAGE,
+                        cursor: Optional[str] = None, with_total: bool = False, fields: Optional[str] = None, user=Depends(current_user)):
+    q = owned_query(user["id"], expo_id=expo_id)
+    return await sparse_page(db.expo_days, q, response, limit, cursor, with_total, fields, keys=SLOT_KEY)
 
 @api_router.post("/expo-days")
 async def create_expo_day(data: ExpoDayIn, user=Depends(current_user)):
     ed = {"id": str(uuid.uuid4()), "user_id": user["id"], "expo_id": data.expo_id,
           "company_id": data.company_id, "time_slot": data.time_slot, "status": "planned",
           "meeting_type": data.meeting_type or "booth_visit", "booth": data.booth or "",
-          "notes": data.notes or "", "created_at": datetime.now(timezone.utc).isoformat()}
+          "notes": data.notes or "", "created_at": datetime.now(timezone.utc).isoformat(), "updated_at": sync_now()}
     await db.expo_days.insert_one(ed)
+    notify_change("expo_days", "upsert", ed)
     return {k: v for k, v in ed.items() if k != "_id"}
 
 @api_router.put("/expo-days/{eid}")
@@ -269,72 +803,260 @@ async def update_expo_day(eid: str, status: Optional[str] = Form(None), notes: O
     if status: updates["status"] = status
     if notes is not None: updates["notes"] = notes
     if updates:
-        await db.expo_days.update_one({"id": eid, "user_id": user["id"]}, {"$set": updates})
+        now = sync_now()
+        r = await db.expo_days.update_one({"id": eid, "user_id": user["id"]}, {"$set": {**updates, "updated_at": now}})
+        if r.matched_count: notify_change("expo_days", "upsert", {"id": eid, "user_id": user["id"], "updated_at": now})
     return {"status": "updated"}
 
 @api_router.delete("/expo-days/{eid}")
 async def delete_expo_day(eid: str, user=Depends(current_user)):
-    await db.expo_days.delete_one({"id": eid, "user_id": user["id"]})
+    await tombstone("expo_days", eid, user["id"], await db.expo_days.delete_one({"id": eid, "user_id": user["id"]}))
     return {"status": "deleted"}
 
+# ── Sync ──
+# User-owned documents carry updated_at and deletions leave a tombstone (expired after TOMBSTONE_DAYS).
+# GET /sync?since=<token> returns what changed in (since, now - SYNC_SETTLE_MS]; the settle window lets
+# writes stamped just before the cut land before it is handed out as the next token. No or expired
+# token: a reset with every current document.
+SYNC_COLLECTIONS = ("shortlists", "networks", "expo_days")
+SYNC_SETTLE = timedelta(milliseconds=int(os.environ.get("SYNC_SETTLE_MS", 2000)))
+TOMBSTONE_TTL = timedelta(days=int(os.environ.get("TOMBSTONE_DAYS", 30)))
+
+def sync_now() -> datetime:
+    t = datetime.now(timezone.utc)
+    return t.replace(microsecond=t.microsecond // 1000 * 1000)  # BSON dates keep milliseconds
+
+async def tombstone(coll: str, doc_id: str, user_id: str, result):
+    if result.deleted_count:
+        t = {"collection": coll, "id": doc_id, "user_id": user_id, "updated_at": sync_now()}
+        await db.tombstones.insert_one(t)
+        notify_change(coll, "delete", t)
+
+def encode_sync_token(t: datetime) -> str:
+    return encode_cursor({"t": int(t.timestamp() * 1000)}, ("t",))
+
+def decode_sync_token(token: str) -> datetime:
+    try: return datetime.fromtimestamp(int(decode_cursor(token, ("t",))[0]) / 1000, timezone.utc)
+    except (HTTPException, TypeError, ValueError, OverflowError, OSError): raise HTTPException(400, "Invalid sync token")
+
+def sync_query(user_id: str, window: Optional[dict]) -> dict:
+    # window None: every document of the user (a reset)
+    return {"user_id": user_id} if window is None else {"user_id": user_id, "updated_at": window}
+
+@api_router.get("/sync")
+async def sync(since: Optional[str] = None, user=Depends(current_user)):
+    upto = sync_now() - SYNC_SETTLE
+    start = decode_sync_token(since) if since else None
+    reset = start is None or start < upto - TOMBSTONE_TTL
+    window = {"$lte": upto} if reset else {"$gt": start, "$lte": upto}
+    async def changed(coll):
+        q = sync_query(user["id"], None if reset else window)
+        return await attach_refs(await db[coll].find(q, {"_id": 0}).sort("updated_at", 1).to_list(None))
+    upserted = await asyncio.gather(*[changed(c) for c in SYNC_COLLECTIONS])
+    deleted = {c: [] for c in SYNC_COLLECTIONS}
+    if not reset:
+        async for t in db.tombstones.find(sync_query(user["id"], window), {"_id": 0, "collection": 1, "id": 1}).sort("updated_at", 1):
+            deleted.setdefault(t["collection"], []).append(t["id"])
+    return {"token": encode_sync_token(upto), "reset": reset,
+            "changes": {c: {"upserted": docs, "deleted": deleted[c]} for c, docs in zip(SYNC_COLLECTIONS, upserted)}}
+
+async def backfill_updated_at(batch_size: int = 1000) -> dict:
+    # Stamps pre-sync documents from created_at so the first delta after a reset is not the whole collection
+    def stamp(d):
+        try: t = datetime.fromisoformat(d.get("created_at") or "")
+        except (TypeError, ValueError): t = sync_now()
+        return {"updated_at": t if t.tzinfo else t.replace(tzinfo=timezone.utc)}
+    return {coll: await bulk_set(db[coll], missing_any(("updated_at",)), {"created_at": 1}, stamp, batch_size)
+            for coll in SYNC_COLLECTIONS}
+
+# ── Events ──
+# GET /events streams change notifications as server-sent events: the caller's shortlists, networks and
+# expo-days, plus company stage changes (narrowed to one expo with ?expo_id=). Events say what changed;
+# clients fetch the data through /sync. With a replica set they come from the change stream, so every
+# worker sees every write; otherwise each worker publishes its own writes (EVENTS.source == "local").
+# A client that falls SSE_QUEUE_SIZE events behind gets one `resync` event instead of its backlog.
+EVENTS = events.Broker(max_subscribers=int(os.environ.get("SSE_MAX_SUBSCRIBERS", 1000)),
+                       queue_size=int(os.environ.get("SSE_QUEUE_SIZE", 100)))
+SSE_HEARTBEAT = float(os.environ.get("SSE_HEARTBEAT_SECONDS", 15))
+SSE_RETRY_MS = int(os.environ.get("SSE_RETRY_MS", 3000))
+
+def notify(event: dict):
+    if EVENTS.source == "local": EVENTS.publish(event)  # the change stream reports these otherwise
+
+def notify_change(coll: str, op: str, doc: dict):
+    notify(events.change_event(coll, op, doc))
+
+def sse_message(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {serialize.dumps(event).decode()}\n\n"
+
+@api_router.get("/events")
+async def event_stream(expo_id: Optional[str] = None, user=Depends(current_user)):
+    try: sub = EVENTS.subscribe(user["id"], expo_id)
+    except events.Full: raise HTTPException(503, "Too many event streams open, retry later", headers={"Retry-After": "30"})
+    async def stream():
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                try: event = await asyncio.wait_for(sub.queue.get(), SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"  # keeps proxies from closing an idle connection
+                    continue
+                if event is events.CLOSED: return
+                yield sse_message(event)
+        finally: EVENTS.unsubscribe(sub)  # also when the response task is cancelled mid-stream
+    # The background task covers a stream that is never started
+    return StreamingResponse(stream(), media_type="text/event-stream", background=BackgroundTask(EVENTS.unsubscribe, sub),
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # ── Admin CSV ──
+# Background imports run here with bounded concurrency so large files cannot starve interactive traffic
+JOBS = JobManager(lambda: db.import_jobs, max_concurrent=int(os.environ.get("IMPORT_JOBS_CONCURRENCY", 2)))
+
+def spool_upload(file: Optional[UploadFile], file_content: Optional[str]) -> str:
+    # The request's UploadFile is closed when the response is sent, so background jobs read their own copy
+    fd, path = tempfile.mkstemp(prefix="expointel-import-", suffix=".csv")
+    with os.fdopen(fd, "wb") as out:
+        if file: shutil.copyfileobj(file.file, out)
+        else: out.write(file_content.encode())
+    return path
+
+# Files above the threshold are split on line boundaries and parsed across cores; one writer streams the batches to Mongo.
+# Smaller imports still normalize each batch in the pool so the event loop only reads and writes.
+IMPORT_POOL = BoundedPool("csv-parse", kind=os.environ.get("IMPORT_POOL", "process"),
+                          workers=int(os.environ.get("IMPORT_WORKERS", 0)) or os.cpu_count() or 1)
+PARALLEL_IMPORT_MIN_BYTES = int(os.environ.get("PARALLEL_IMPORT_MIN_BYTES", 8 * 1024 * 1024))
+
+async def import_path(path: str, expo_id: str, mode: str, stats: dict, on_batch=None):
+    # Returns (stats, preview); files above PARALLEL_IMPORT_MIN_BYTES go through the parallel path
+    size = max(os.path.getsize(path), 1)
+    if size >= PARALLEL_IMPORT_MIN_BYTES:
+        return await importer.import_csv_parallel(path, db.companies, expo_id, IMPORT_POOL, prepare=prepare_company,
+                                                  stats=stats, mode=mode, on_batch=on_batch)
+    with open(path, "rb") as raw:
+        async def progress(st, _): await on_batch(st, raw.tell() / size)
+        return await importer.import_csv(io.TextIOWrapper(raw, encoding="utf-8-sig", newline=""), db.companies, expo_id,
+                                         prepare=prepare_company, stats=stats, mode=mode,
+                                         on_batch=progress if on_batch else None, pool=IMPORT_POOL)
+
+async def run_import_job(path: str, expo_id: str, mode: str, report) -> dict:
+    stats = importer.new_stats()
+    async def on_batch(st, progress): await report({"stats": st}, progress=progress)
+    try: await import_path(path, expo_id, mode, stats, on_batch)
+    finally:
+        await bump_company_count(expo_id, stats["inserted"])
+        await invalidate_catalog()
+    return stats
+
 @api_router.post("/admin/upload-csv")
-async def upload_csv(file_content: str = Form(...), expo_id: str = Form(...), user=Depends(current_user)):
+async def upload_csv(expo_id: str = Form(...), file: Optional[UploadFile] = File(None),
+                     file_content: Optional[str] = Form(None), mode: str = Form("insert"),
+                     background: bool = Form(False), user=Depends(current_user)):
+    # Multipart `file` is parsed incrementally from the spooled upload; `file_content` is the legacy form field.
+    # mode=upsert re-imports idempotently on (expo_id, name, booth), keeping existing company ids.
+    # background=true returns a job_id at once; poll GET /api/admin/jobs/{job_id} for progress.
+    if file is None and file_content is None: raise HTTPException(400, "Provide a CSV file or file_content")
+    if mode not in importer.IMPORT_MODES: raise HTTPException(400, f"Invalid mode. Must be one of: {list(importer.IMPORT_MODES)}")
+    if background:
+        path = await asyncio.to_thread(spool_upload, file, file_content)
+        # The job unlinks the spool file when it ends, including when it is cancelled before it starts
+        jid = await JOBS.submit("csv_import", lambda report: run_import_job(path, expo_id, mode, report),
+                                {"expo_id": expo_id, "mode": mode, "user_id": user["id"], "bytes": os.path.getsize(path)},
+                                cleanup=lambda: os.unlink(path))
+        return {"status": "queued", "job_id": jid}
+    stats = importer.new_stats()
     try:
-        reader = csv.DictReader(io.StringIO(file_content))
-        rows = list(reader)
-        if not rows: raise HTTPException(400, "Empty CSV")
-        docs = []
-        for row in rows:
-            contacts = []
-            cj = row.get("contacts", "")
-            if cj:
-                try: contacts = json.loads(cj)
-                except: pass
-            rev_str = row.get("revenue", "0").replace("€", "").replace("$", "").replace("M", "").replace(",", "").strip()
-            try: revenue = float(rev_str)
-            except: revenue = 0
-            docs.append({"id": str(uuid.uuid4()), "expo_id": expo_id, "name": row.get("name", "").strip(),
-                         "hq": row.get("HQ", row.get("hq", "")).strip(), "revenue": revenue,
-                         "booth": row.get("booth", "").strip(), "industry": row.get("industry", "").strip(),
-                         "shortlist_stage": "none", "contacts": contacts,
-                         "created_at": datetime.now(timezone.utc).isoformat()})
-        if docs: await db.companies.insert_many(docs)
-        return {"status": "uploaded", "count": len(docs), "preview": [{k:v for k,v in d.items() if k!="_id"} for d in docs[:3]]}
-    except HTTPException: raise
+        if file is not None and (file.size or 0) >= PARALLEL_IMPORT_MIN_BYTES:
+            # Worker processes read chunks by path, so large uploads are spooled to a file first
+            path = await asyncio.to_thread(spool_upload, file, None)
+            try: _, preview = await import_path(path, expo_id, mode, stats)
+            finally: os.unlink(path)
+        else:
+            fh = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="") if file else io.StringIO(file_content)
+            _, preview = await importer.import_csv(fh, db.companies, expo_id, prepare=prepare_company, stats=stats,
+                                                   mode=mode, pool=IMPORT_POOL)
     except Exception as e:
         raise HTTPException(500, str(e))
+    finally:
+        await bump_company_count(expo_id, stats["inserted"])
+        await invalidate_catalog()
+    if not stats["rows"] and not stats["errors"]: raise HTTPException(400, "Empty CSV")
+    return {"status": "uploaded", "count": stats["inserted"], "stats": stats,
+            "preview": [{k: v for k, v in d.items() if k != "_id" and k not in COMPANY_HIDDEN} for d in preview]}
+
+@api_router.get("/admin/jobs")
+async def list_jobs(limit: int = 20, user=Depends(current_user)):
+    return await JOBS.recent(max(1, min(limit, 100)))
+
+@api_router.get("/admin/jobs/{jid}")
+async def get_job(jid: str, user=Depends(current_user)):
+    job = await JOBS.get(jid)
+    if not job: raise HTTPException(404, "Job not found")
+    return job
+
+@api_router.post("/admin/expo-stats/rebuild")
+async def rebuild_stats(user=Depends(current_user)):
+    result = await rebuild_expo_stats()
+    await invalidate_catalog()
+    return result
+
+@api_router.get("/admin/stats")
+async def admin_stats(user=Depends(current_user)):
+    return {"caches": {"users": USER_CACHE.stats(), "tokens": TOKEN_CACHE.stats()}, "password_pool": PASSWORD_POOL.stats(),
+            "import_jobs": JOBS.stats(), "import_pool": IMPORT_POOL.stats(),
+            "catalog_cache": CATALOG_CACHE.stats(), "coalesced_reads": READS.stats(), "events": EVENTS.stats()}
+
+@api_router.get("/admin/db-metrics")
+async def db_metrics(reset: bool = False, user=Depends(current_user)):
+    # Per-route Mongo command counts and DB time collected by dbtrace.TraceMiddleware
+    snap = DB_METRICS.snapshot()
+    if reset: DB_METRICS.reset()
+    return snap
 
 @api_router.get("/admin/users")
-async def get_users(user=Depends(current_user)):
-    return await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(100)
+async def get_users(response: Response = None, limit: int = 100, cursor: Optional[str] = None,
+                    with_total: bool = False, user=Depends(current_user)):
+    return await paginate(db.users, {}, response, limit, cursor, with_total, proj={"password_hash": 0})
 
 # ── Export CSV ──
+EXPORT_COLLECTIONS = {"shortlists": "shortlists", "networks": "networks", "expo-days": "expo_days"}
+EXPORT_BATCH = 500
+
+async def export_chunks(coll, q: dict):
+    # Yields CSV text one batch at a time; the header comes from the first row's fields
+    out, writer, batch = io.StringIO(), None, []
+    async def render(items: list) -> str:
+        nonlocal writer
+        companies, expos = await load_refs(items, {"id": 1, "name": 1}, {"id": 1, "name": 1})
+        for item in items:
+            c, e = companies.get(item.get("company_id")), expos.get(item.get("expo_id"))
+            row = {**item, "company_name": c.get("name", "") if c else "", "expo_name": e.get("name", "") if e else ""}
+            if writer is None:
+                writer = csv.DictWriter(out, fieldnames=list(row.keys()), extrasaction="ignore")
+                writer.writeheader()
+            writer.writerow(row)
+        chunk = out.getvalue()
+        out.seek(0); out.truncate()
+        return chunk
+    async for item in coll.find(q, {"_id": 0, "user_id": 0}).sort("_id", 1).batch_size(EXPORT_BATCH):
+        batch.append(item)
+        if len(batch) >= EXPORT_BATCH:
+            yield await render(batch)
+            batch = []
+    if batch: yield await render(batch)
+
 @api_router.get("/export/{collection}")
-async def export_csv(collection: str, expo_id: Optional[str] = None, user=Depends(current_user)):
-    q = {"user_id": user["id"]}
-    if expo_id: q["expo_id"] = expo_id
-    coll_map = {"shortlists": db.shortlists, "networks": db.networks, "expo-days": db.expo_days}
-    if collection not in coll_map: raise HTTPException(400, "Invalid collection")
-    items = await coll_map[collection].find(q, {"_id": 0}).to_list(500)
-    rows = []
-    for item in items:
-        c = await db.companies.find_one({"id": item.get("company_id")}, {"_id": 0})
-        e = await db.expos.find_one({"id": item.get("expo_id")}, {"_id": 0})
-        row = {**{k:v for k,v in item.items() if k not in ["_id","user_id"]},
-               "company_name": c.get("name","") if c else "", "expo_name": e.get("name","") if e else ""}
-        rows.append(row)
-    out = io.StringIO()
-    if rows:
-        w = csv.DictWriter(out, fieldnames=rows[0].keys())
-        w.writeheader()
-        w.writerows(rows)
-    return {"csv_data": out.getvalue(), "filename": f"{collection}_export.csv"}
+async def export_csv(collection: str, expo_id: Optional[str] = None, stream: bool = False, user=Depends(current_user)):
+    q = owned_query(user["id"], expo_id=expo_id)
+    if collection not in EXPORT_COLLECTIONS: raise HTTPException(400, "Invalid collection")
+    chunks, filename = export_chunks(db[EXPORT_COLLECTIONS[collection]], q), f"{collection}_export.csv"
+    if stream:
+        return StreamingResponse(chunks, media_type="text/csv", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+    return {"csv_data": "".join([c async for c in chunks]), "filename": filename}
 
 # ── Seed ──
 @api_router.post("/seed")
 async def seed_data():
-    if await db.expos.count_documents({}) > 0:
+    if await db.expos.estimated_document_count() > 0:
         return {"status": "already_seeded"}
 
     expos_data = [
@@ -348,7 +1070,7 @@ async def seed_data():
     for ed in expos_data:
         eid = str(uuid.uuid4())
         expo_ids[ed["name"]] = eid
-        await db.expos.insert_one({**ed, "id": eid, "created_at": datetime.now(timezone.utc).isoformat()})
+        await db.expos.insert_one(with_facet_keys({**ed, "id": eid, "company_count": 0, "created_at": datetime.now(timezone.utc).isoformat()}, "expos"))
 
     companies_data = [
         # IFA Berlin
@@ -380,25 +1102,228 @@ async def seed_data():
     for cd in companies_data:
         eid = expo_ids.get(cd["expo"])
         if not eid: continue
-        await db.companies.insert_one({"id": str(uuid.uuid4()), "expo_id": eid, "name": cd["name"],
+        await db.companies.insert_one(prepare_company({"id": str(uuid.uuid4()), "expo_id": eid, "name": cd["name"],
             "hq": cd["hq"], "revenue": cd["revenue"], "booth": cd["booth"], "industry": cd["industry"],
             "shortlist_stage": "none", "contacts": cd.get("contacts", []),
-            "created_at": datetime.now(timezone.utc).isoformat()})
+            "created_at": datetime.now(timezone.utc).isoformat()}))
+        await bump_company_count(eid, 1)
 
     for email, pw, name, role in [("admin@expointel.com","admin123","Admin User","admin"), ("demo@expointel.com","demo123","Sarah Mitchell","user")]:
         if not await db.users.find_one({"email": email}):
-            await db.users.insert_one({"id": str(uuid.uuid4()), "email": email, "password_hash": hash_pw(pw),
+            await db.users.insert_one({"id": str(uuid.uuid4()), "email": email, "password_hash": await hash_pw_async(pw),
                 "name": name, "role": role, "created_at": datetime.now(timezone.utc).isoformat()})
 
+    await invalidate_catalog()
     return {"status": "seeded", "expos": len(expos_data), "companies": len(companies_data)}
 
+# ── Batch ──
+# POST /api/batch runs up to BATCH_MAX GET sub-requests concurrently through the API router (no
+# middleware) and returns each one's status, paging headers and body, in request order. Streaming
+# routes (/events, ?stream=true exports) never finish into a buffered body and are refused; any
+# sub-request still running after BATCH_TIMEOUT_SECONDS answers 504.
+BATCH_MAX = int(os.environ.get("BATCH_MAX", 20))
+BATCH_TIMEOUT = float(os.environ.get("BATCH_TIMEOUT_SECONDS", 10))
+BATCH_STREAMING = ("/api/events",)
+BATCH_SCOPE_KEYS = ("type", "asgi", "http_version", "scheme", "server", "client", "root_path", "app", "starlette.exception_handlers")
+BATCH_HEADERS = ("x-next-cursor", "x-total-count", "etag")
+
+async def run_subrequest(request: Request, path: str) -> dict:
+    path = path if path.startswith("/api/") else "/api/" + path.lstrip("/")
+    url_path, _, qs = path.partition("?")
+    if url_path.rstrip("/") == "/api/batch": return {"status": 400, "headers": {}, "body": {"detail": "Nested batch"}}
+    streamed = parse_qs(qs).get("stream", [""])[-1].lower() in ("1", "true", "on", "yes", "y", "t")
+    if url_path.rstrip("/") in BATCH_STREAMING or streamed:
+        return {"status": 400, "headers": {}, "body": {"detail": "Streaming responses cannot be batched"}}
+    scope = {**{k: request.scope[k] for k in BATCH_SCOPE_KEYS if k in request.scope}, "method": "GET",
+             "path": url_path, "raw_path": url_path.encode(), "query_string": qs.encode(),
+             "headers": [(k, v) for k, v in request.scope["headers"] if k in (b"host", b"authorization")] + [(b"accept", b"application/json")]}
+    sent = {"status": 500, "headers": [], "body": b""}
+    body_sent = False
+    async def receive():
+        # GET carries no body; after it, wait like a client that stays connected (never a busy disconnect poll)
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()
+    async def send(message):
+        if message["type"] == "http.response.start": sent["status"], sent["headers"] = message["status"], message.get("headers", [])
+        elif message["type"] == "http.response.body": sent["body"] += message.get("body", b"")
+    try: await asyncio.wait_for(request.app.router(scope, receive, send), BATCH_TIMEOUT)
+    except asyncio.TimeoutError: return {"status": 504, "headers": {}, "body": {"detail": "Sub-request timed out"}}
+    except StarletteHTTPException as e: return {"status": e.status_code, "headers": {}, "body": {"detail": e.detail}}
+    except Exception:
+        logger.exception("Batch sub-request %s failed", path)
+        return {"status": 500, "headers": {}, "body": {"detail": "Internal Server Error"}}
+    headers = {k.decode().lower(): v.decode() for k, v in sent["headers"]}
+    body = sent["body"]
+    if headers.get("content-type", "").startswith("application/json") and body: body = json.loads(body)
+    else: body = body.decode(errors="replace")
+    return {"status": sent["status"], "headers": {k: v for k, v in headers.items() if k in BATCH_HEADERS}, "body": body}
+
+@api_router.post("/batch")
+async def batch(data: BatchIn, request: Request, cred: HTTPAuthorizationCredentials = Depends(security)):
+    if not data.requests: return {"responses": []}
+    if len(data.requests) > BATCH_MAX: raise HTTPException(400, f"At most {BATCH_MAX} requests per batch")
+    user = await current_user(cred) if cred else None  # resolved once; public sub-requests work without a token
+    token = BATCH_USER.set(user)
+    try: results = await asyncio.gather(*[run_subrequest(request, c.path) for c in data.requests])
+    finally: BATCH_USER.reset(token)
+    return {"responses": [{"id": c.id, **r} for c, r in zip(data.requests, results)]}
+
+# ── Query Shapes ──
+# Generated from the query helpers the routes call, over every combination of their optional filters,
+# so the audit explains what is actually sent. A shape is {"collection", "filter", "sort"} for a find,
+# {"collection", "pipeline"} for an aggregate or {"collection", "distinct", "filter"} for a distinct.
+def query_shapes() -> list:
+    x, any_ = "x", (None, "x")
+    shapes = []
+    def find(coll, q, sort=None): shapes.append({"collection": coll, "filter": q, "sort": sort})
+    def aggregate(coll, pipeline): shapes.append({"collection": coll, "pipeline": pipeline})
+    def distinct(coll, key, q): shapes.append({"collection": coll, "distinct": key, "filter": q})
+    def paged(coll, q, keys=ID_KEY):
+        if q: find(coll, q)  # X-Total-Count; an empty filter uses estimated_document_count
+        for cursor in (None, encode_cursor({"_id": ObjectId(), "time_slot": x}, keys)): find(coll, *page_spec(q, keys, cursor))
+
+    find("users", {"id": x}); find("users", {"email": x}); paged("users", {})
+    for region, industry, match in product(any_, any_, MATCH_MODES): find("expos", expo_query(region, industry, match), [("_id", 1)])
+    find("expos", {"id": x}); find("expos", {}, [("_id", 1)])
+    distinct("expos", "region", {}); distinct("expos", "industry", {})
+    aggregate("companies", company_count_pipeline()); aggregate("companies", company_count_pipeline([x]))
+    for expo_id, industry, hq, match, revenue in product(any_, any_, any_, MATCH_MODES, (None, 0)):
+        q = company_query(expo_id, industry, hq, match, revenue, None if revenue is None else 1)
+        paged("companies", q)
+        find("companies", substring_query(q, x), [("_id", 1)])
+        for pq in prefix_queries(q, x): find("companies", pq, [("search_name", 1)])
+        aggregate("companies", fuzzy_pipeline(q, search.query_grams(x), {"_id": 0}))
+        if expo_id:
+            for cursor in (None, encode_cursor({"_id": ObjectId()}, ID_KEY)):
+                aggregate("companies", facet_pipeline(expo_id, company_conditions(industry, hq, match, revenue, None), 10, cursor, 4))
+    for q in ({}, {"expo_id": x}):
+        distinct("companies", "industry", q); distinct("companies", "hq", q)
+        for direction in (1, -1): find("companies", revenue_bound_query(q), [("revenue", direction)])
+    find("companies", {"id": x}); find("companies", {"id": {"$in": [x]}}); distinct("companies", "id", stage_query([x], x))
+    find("companies", {"id": x, "shortlist_stage": {"$in": [None, "", "none"]}})
+    find("companies", {"expo_id": x, "import_key": {"$in": [x]}})
+    for coll, fields in FACET_FIELDS.items(): find(coll, missing_any(f"{f}_key" for f in fields))
+    find("companies", missing_any(("import_key",))); find("companies", missing_any(search.SEARCH_FIELDS))
+    for expo_id in any_:
+        paged("shortlists", owned_query(x, expo_id=expo_id)); paged("expo_days", owned_query(x, expo_id=expo_id), SLOT_KEY)
+        distinct("shortlists", "company_id", owned_query(x, expo_id=expo_id))
+        paged("shortlists", {**owned_query(x, expo_id=expo_id), "company_id": {"$in": [x]}})
+        for status in any_: paged("networks", owned_query(x, expo_id=expo_id, status=status))
+    find("shortlists", {"user_id": x, "company_id": x, "expo_id": x})
+    window = {"$gt": datetime(2026, 1, 1), "$lte": datetime(2026, 1, 2)}
+    for coll in SYNC_COLLECTIONS:
+        find(coll, {"id": x, "user_id": x}); find(coll, missing_any(("updated_at",)))
+        for w in (None, window): find(coll, sync_query(x, w), [("updated_at", 1)])
+    find("tombstones", sync_query(x, window), [("updated_at", 1)])
+    find("import_jobs", {"id": x}); find("import_jobs", {}, [("created_at", -1)]); find("import_jobs", orphaned_filter(x))
+    seen = set()
+    return [sh for sh in shapes if repr(sh) not in seen and not seen.add(repr(sh))]
+
+QUERY_SHAPES = query_shapes()
+
+async def explain_shape(shape: dict) -> dict:
+    coll, q = shape["collection"], shape.get("filter") or {}
+    if "pipeline" in shape: cmd = {"aggregate": coll, "pipeline": shape["pipeline"], "cursor": {}}
+    elif "distinct" in shape: cmd = {"distinct": coll, "key": shape["distinct"], "query": q}
+    else: cmd = {"find": coll, "filter": q, **({"sort": dict(shape["sort"])} if shape.get("sort") else {})}
+    return await db.command("explain", cmd, verbosity="queryPlanner")
+
+def _winning_plans(explain) -> list:
+    # Only winning plans: rejected candidates may well be COLLSCANs
+    if isinstance(explain, dict):
+        if "winningPlan" in explain: return [explain["winningPlan"]]
+        return [p for v in explain.values() for p in _winning_plans(v)]
+    if isinstance(explain, list): return [p for v in explain for p in _winning_plans(v)]
+    return []
+
+def _plan_stages(plan) -> set:
+    if isinstance(plan, dict):
+        return ({plan["stage"]} if "stage" in plan else set()).union(*[_plan_stages(v) for v in plan.values()])
+    if isinstance(plan, list): return set().union(*[_plan_stages(v) for v in plan])
+    return set()
+
+async def audit_query_plans() -> list:
+    # Explain every query shape (finds, aggregates and distincts); returns those whose winning plan has a COLLSCAN
+    bad = []
+    for shape in QUERY_SHAPES:
+        if "COLLSCAN" in _plan_stages(_winning_plans(await explain_shape(shape))): bad.append(shape)
+    return bad
+
+# ── Metrics ──
+METRICS = metrics.Registry()
+
+@METRICS.collect
+def scrape_metrics():
+    # Read at scrape time from counters the caches, pools and tracer already keep
+    hits = metrics.Counter("cache_hits_total", "Cache hits", ("cache",))
+    misses = metrics.Counter("cache_misses_total", "Cache misses", ("cache",))
+    evictions = metrics.Counter("cache_evictions_total", "Cache evictions", ("cache",))
+    for name, cache in (("users", USER_CACHE), ("tokens", TOKEN_CACHE), ("catalog", CATALOG_CACHE)):
+        st = cache.stats()
+        hits.inc(name, amount=st["hits"]); misses.inc(name, amount=st["misses"]); evictions.inc(name, amount=st["evictions"])
+    tasks = metrics.Counter("worker_pool_tasks_total", "Pool tasks by result (pool=bcrypt is password hashing)", ("pool", "result"))
+    seconds = metrics.Counter("worker_pool_seconds_total", "Time tasks spent queued or running", ("pool", "phase"))
+    queued = metrics.Gauge("worker_pool_queued", "Tasks waiting for a pool slot", ("pool",))
+    running = metrics.Gauge("worker_pool_running", "Tasks running in the pool", ("pool",))
+    for pool in (PASSWORD_POOL, IMPORT_POOL):
+        tasks.inc(pool.name, "ok", amount=pool.completed); tasks.inc(pool.name, "error", amount=pool.failed)
+        seconds.inc(pool.name, "wait", amount=round(pool.wait_seconds, 6)); seconds.inc(pool.name, "run", amount=round(pool.run_seconds, 6))
+        queued.set(pool.name, value=pool.queued); running.set(pool.name, value=pool.running)
+    commands = metrics.Counter("mongodb_commands_total", "Mongo commands issued while serving each route", ("method", "route"))
+    db_seconds = metrics.Counter("mongodb_command_seconds_total", "Mongo command time per route", ("method", "route"))
+    for key, r in DB_METRICS.routes.items():
+        method, _, route = key.partition(" ")
+        commands.inc(method, route, amount=r["commands"]); db_seconds.inc(method, route, amount=round(r["db_ms"] / 1000, 6))
+    flights = metrics.Counter("singleflight_requests_total", "Coalesced reads: leader ran the query, collapsed awaited it", ("result",))
+    flights.inc("leader", amount=READS.leaders); flights.inc("collapsed", amount=READS.collapsed)
+    ev = EVENTS.stats()
+    subscribers = metrics.Gauge("sse_subscribers", "Open event streams")
+    subscribers.set(value=ev["subscribers"])
+    sse = metrics.Counter("sse_events_total", "Events per subscriber: delivered, or dropped for a slow client", ("result",))
+    sse.inc("delivered", amount=ev["delivered"]); sse.inc("dropped", amount=ev["dropped"])
+    rejected = metrics.Counter("sse_rejected_total", "Event streams refused at SSE_MAX_SUBSCRIBERS")
+    rejected.inc(amount=ev["rejected"])
+    return [hits, misses, evictions, tasks, seconds, queued, running, commands, db_seconds, flights, subscribers, sse, rejected,
+            *POOL_LISTENER.collect(client.options.pool_options.max_pool_size)]
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
 @api_router.get("/health")
 async def health():
     return {"status": "ok"}
 
+# Every request records its Mongo commands; repeated identical find_one shapes are logged as N+1 suspects
+DB_METRICS = dbtrace.DbMetrics()
 app.include_router(api_router)
-app.add_middleware(CORSMiddleware, allow_credentials=True, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+# Bodies of at least COMPRESS_MIN_BYTES go out as br (when brotli is installed) or gzip per Accept-Encoding
+if os.environ.get("COMPRESSION_ENABLED", "1") != "0":
+    app.add_middleware(compress.CompressionMiddleware, minimum_size=int(os.environ.get("COMPRESS_MIN_BYTES", 1024)),
+                       gzip_level=int(os.environ.get("GZIP_LEVEL", 6)), brotli_quality=int(os.environ.get("BROTLI_QUALITY", 4)))
+app.add_middleware(dbtrace.TraceMiddleware, metrics=DB_METRICS,
+                   find_one_threshold=int(os.environ.get("N_PLUS_ONE_THRESHOLD", 5)))
+app.add_middleware(metrics.MetricsMiddleware, registry=METRICS, enabled=os.environ.get("METRICS_ENABLED", "1") != "0")
+app.add_middleware(CORSMiddleware, allow_credentials=True, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"],
+                   expose_headers=["X-Next-Cursor", "X-Total-Count", "Server-Timing", "ETag"])
+
+@app.on_event("startup")
+async def startup():
+    await ensure_indexes()
+    await backfill_facet_keys()
+    await backfill_import_keys()
+    if (await dedupe_companies())["merged"]: await ensure_indexes()  # builds the unique index the duplicates blocked
+    await reindex_search(only_missing=True)
+    await JOBS.recover()
+    await EVENTS.start(client, db, os.environ.get("EVENTS_SOURCE", "auto"))
 
 @app.on_event("shutdown")
 async def shutdown():
+    EVENTS.close()
+    await JOBS.shutdown()
+    PASSWORD_POOL.shutdown()
+    IMPORT_POOL.shutdown()
     client.close()
@@ -0,0 +1,108 @@
+"""
+Deterministic synthetic dataset for scale testing (see `manage.py seed-scale`).
+
+The same seed and sizes always produce the same documents, ids and timestamps included:
+ids are uuid5 values derived from (seed, kind, index) and every generator draws from its
+own Random seeded by name, so one collection can be regenerated without the others.
+
+Activity follows the skew seen in production: expo popularity is Zipf-like, most users
+shortlist a handful of companies while a few power users shortlist hundreds, roughly half
+of shortlisted companies become network contacts and about half of those get an expo-day
+slot. Documents are raw; the caller adds derived fields (facet/search/import keys).
+"""
+import uuid
+import random
+from itertools import accumulate
+from datetime import datetime, timedelta, timezone
+
+NAMESPACE = uuid.UUID("6f1d3c52-8a4e-4b7f-9c1e-2d5a7b9e0f13")
+BASE_TIME = datetime(2026, 1, 1, tzinfo=timezone.utc)
+PASSWORD = "synthetic123"
+
+REGIONS = ["Europe", "North America", "Middle East", "Asia Pacific", "Latin America"]
+EXPO_KINDS = ["Expo", "Summit", "Messe", "World Congress", "Show", "Forum"]
+INDUSTRIES = ["Consumer Electronics", "Smart Home", "Semiconductors", "Telecoms", "Robotics", "Enterprise Software",
+              "FinTech", "Health Tech", "Industrial Automation", "Automotive & Energy", "Home Appliances", "XR & Metaverse"]
+CITIES = ["Munich, Germany", "Berlin, Germany", "Austin, USA", "San Jose, USA", "Seoul, South Korea", "Shenzhen, China",
+          "Dubai, UAE", "Espoo, Finland", "Zurich, Switzerland", "Amsterdam, Netherlands", "Tokyo, Japan", "Bangalore, India"]
+WORDS = ["Global", "Tech", "Systems", "Solutions", "Dynamics", "Networks", "Energy", "Robotics", "Micro", "Data",
+         "Cloud", "Industrial", "Smart", "Digital", "Quantum", "Bio", "Motors", "Logistics", "Labs", "Analytics"]
+FIRST = ["Anna", "Klaus", "Sarah", "Wei", "Omar", "Julia", "Erik", "Min-jun", "Sophie", "David", "Lisa", "Ahmed"]
+LAST = ["Weber", "Chen", "Park", "Hassan", "Wagner", "Lindberg", "Fischer", "Torres", "Kim", "Laurent", "Braun"]
+ROLES = ["VP Sales", "Head of Partnerships", "CTO", "BD Manager", "Director Strategy", "Sales Manager"]
+# (value, weight) pairs
+STAGES = [("none", 80), ("prospecting", 8), ("prospecting_complete", 4), ("engaging", 4), ("closed_won", 2), ("closed_lost", 2)]
+NETWORK_STATUSES = [("request_sent", 45), ("meeting_scheduled", 25), ("expo_day", 15), ("completed", 15)]
+MEETING_TYPES = [("booth_visit", 60), ("scheduled", 30), ("drop_by", 10)]
+DAY_STATUSES = [("planned", 60), ("visited", 25), ("followed_up", 15)]
+MAX_SHORTLIST = 500
+
+
+def make_id(seed: int, kind: str, *parts) -> str:
+    return str(uuid.uuid5(NAMESPACE, ":".join(map(str, (seed, kind, *parts)))))
+
+
+def stamp(rng: random.Random, days: int = 365) -> str:
+    return (BASE_TIME + timedelta(seconds=rng.randrange(days * 86400))).isoformat()
+
+
+def pick(rng: random.Random, weighted: list):
+    return rng.choices([v for v, _ in weighted], [w for _, w in weighted])[0]
+
+
+def expo_docs(seed: int, expos: int, companies_per_expo: int):
+    rng = random.Random(f"{seed}:expos")
+    for i in range(expos):
+        yield {"id": make_id(seed, "expo", i), "name": f"{rng.choice(WORDS)} {rng.choice(EXPO_KINDS)} {i + 1} 2026",
+               "region": rng.choice(REGIONS), "industry": rng.choice(INDUSTRIES),
+               "date": (BASE_TIME + timedelta(days=rng.randrange(365))).date().isoformat(),
+               "company_count": companies_per_expo, "created_at": stamp(rng)}
+
+
+def company_docs(seed: int, expo_index: int, companies_per_expo: int):
+    rng, expo_id = random.Random(f"{seed}:companies:{expo_index}"), make_id(seed, "expo", expo_index)
+    for j in range(companies_per_expo):
+        yield {"id": make_id(seed, "company", expo_index, j), "expo_id": expo_id,
+               "name": f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.choice(WORDS)} {expo_index}-{j}",
+               "hq": rng.choice(CITIES), "revenue": round(rng.lognormvariate(7, 2), 1),
+               "booth": f"Hall {rng.randint(1, 20)} {rng.choice('ABCDEF')}-{rng.randint(100, 999)}",
+               "industry": rng.choice(INDUSTRIES), "shortlist_stage": pick(rng, STAGES),
+               "contacts": [{"name": f"{rng.choice(FIRST)} {rng.choice(LAST)}", "role": rng.choice(ROLES)}
+                            for _ in range(rng.randint(1, 3))],
+               "created_at": stamp(rng)}
+
+
+def user_docs(seed: int, users: int, password_hash: str):
+    rng = random.Random(f"{seed}:users")
+    for i in range(users):
+        yield {"id": make_id(seed, "user", i), "email": f"user{i}@synthetic.expointel.com", "password_hash": password_hash,
+               "name": f"{rng.choice(FIRST)} {rng.choice(LAST)}", "role": "admin" if i == 0 else "user",
+               "created_at": stamp(rng)}
+
+
+def activity_docs(seed: int, user_index: int, expos: int, companies_per_expo: int):
+    # Yields (collection, doc) for one user's shortlists, networks and expo-day slots
+    rng, user_id = random.Random(f"{seed}:activity:{user_index}"), make_id(seed, "user", user_index)
+    if not expos or not companies_per_expo: return
+    count = min(int(rng.paretovariate(1.2) * 4) - 4, MAX_SHORTLIST, expos * companies_per_expo)
+    cum_weights = list(accumulate(1 / (k + 1) for k in range(expos)))
+    picked = set()
+    while len(picked) < count:
+        picked.add((rng.choices(range(expos), cum_weights=cum_weights)[0], rng.randrange(companies_per_expo)))
+    for e, c in sorted(picked):
+        expo_id, company_id, created = make_id(seed, "expo", e), make_id(seed, "company", e, c), stamp(rng)
+        updated = datetime.fromisoformat(created)
+        yield "shortlists", {"id": make_id(seed, "shortlist", user_index, e, c), "user_id": user_id,
+                             "company_id": company_id, "expo_id": expo_id, "notes": "", "created_at": created, "updated_at": updated}
+        if rng.random() >= 0.5: continue
+        meeting = pick(rng, MEETING_TYPES)
+        yield "networks", {"id": make_id(seed, "network", user_index, e, c), "user_id": user_id,
+                           "company_id": company_id, "expo_id": expo_id,
+                           "contact_name": f"{rng.choice(FIRST)} {rng.choice(LAST)}", "contact_role": rng.choice(ROLES),
+                           "status": pick(rng, NETWORK_STATUSES), "meeting_type": meeting, "scheduled_time": "",
+                           "notes": "", "created_at": created, "updated_at": updated}
+        if rng.random() >= 0.5: continue
+        yield "expo_days", {"id": make_id(seed, "expo_day", user_index, e, c), "user_id": user_id, "expo_id": expo_id,
+                            "company_id": company_id, "time_slot": f"{rng.randint(9, 17):02d}:{rng.choice(('00', '30'))}",
+                            "status": pick(rng, DAY_STATUSES), "meeting_type": meeting,
+                            "booth": "", "notes": "", "created_at": created, "updated_at": updated}
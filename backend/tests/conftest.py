@@ -0,0 +1,63 @@
+"""
+Shared fixtures for in-process backend tests.
+These import server.py directly and run against a throwaway database on the
+MongoDB at MONGO_URL (skipped when no server is reachable).
+"""
+import os
+import sys
+import uuid
+import asyncio
+import pytest
+from pathlib import Path
+from dotenv import load_dotenv
+from pymongo import monitoring
+from motor.motor_asyncio import AsyncIOMotorClient
+
+BACKEND_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+load_dotenv(BACKEND_DIR / ".env")
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "expointel_test")
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Records every command name sent to MongoDB"""
+    def __init__(self):
+        self.commands = []
+    def started(self, event):
+        if event.command_name not in ("ping", "endSessions", "dropDatabase"):
+            self.commands.append(event.command_name)
+    def succeeded(self, event): pass
+    def failed(self, event): pass
+    def reset(self):
+        self.commands = []
+
+
+@pytest.fixture(scope="session")
+def server():
+    import server as srv
+    return srv
+
+
+@pytest.fixture
+def run_db(server):
+    """Run `scenario(db, counter)` on a fresh database swapped into server.db"""
+    def run(scenario):
+        async def main():
+            counter = CommandCounter()
+            client = AsyncIOMotorClient(os.environ["MONGO_URL"], serverSelectionTimeoutMS=2000, event_listeners=[counter])
+            try:
+                await client.admin.command("ping")
+            except Exception:
+                client.close()
+                pytest.skip("MongoDB not reachable at MONGO_URL")
+            name = f"expointel_test_{uuid.uuid4().hex[:8]}"
+            prev, server.db = server.db, client[name]
+            try:
+                return await scenario(server.db, counter)
+            finally:
+                server.db = prev
+                await client.drop_database(name)
+                client.close()
+        return asyncio.run(main())
+    return run
@@ -0,0 +1,76 @@
+"""
+Batch endpoint tests: concurrent GET sub-requests with per-request status and shared auth
+"""
+import asyncio
+import httpx
+
+
+async def post(server, payload, token=None):
+    headers = {"Authorization": f"Bearer {token}"} if token else {}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://t") as http:
+        return await http.post("/api/batch", json=payload, headers=headers)
+
+
+async def populate(db):
+    await db.users.insert_one({"id": "u-batch", "email": "batch@test.com", "name": "B", "role": "user", "password_hash": "h"})
+    await db.expos.insert_one({"id": "e1", "name": "IFA", "region": "Europe", "company_count": 2})
+    await db.companies.insert_many([{"id": f"c{i}", "expo_id": "e1", "name": f"Co {i}"} for i in range(2)])
+    await db.shortlists.insert_one({"id": "s1", "user_id": "u-batch", "company_id": "c0", "expo_id": "e1"})
+
+
+class TestBatch:
+    """POST /api/batch"""
+
+    def test_results_in_order_with_status(self, run_db, server):
+        async def scenario(db, counter):
+            await populate(db)
+            return await post(server, {"requests": [
+                {"id": "expos", "path": "/api/expos"}, {"id": "page", "path": "/companies?expo_id=e1&limit=1"},
+                {"id": "mine", "path": "/shortlists?fields=company.name"}, {"id": "gone", "path": "/api/companies/nope"},
+                {"id": "bad", "path": "/api/nowhere"}, {"id": "loop", "path": "/api/batch"}]}, server.make_token("u-batch", "user"))
+        r = run_db(scenario)
+        out = {x["id"]: x for x in r.json()["responses"]}
+        assert r.status_code == 200 and [x["id"] for x in r.json()["responses"]] == ["expos", "page", "mine", "gone", "bad", "loop"]
+        assert out["expos"]["status"] == 200 and out["expos"]["body"][0]["id"] == "e1" and out["expos"]["headers"]["etag"]
+        assert out["page"]["body"][0]["id"] == "c0" and out["page"]["headers"]["x-next-cursor"]
+        assert out["mine"]["body"] == [{"id": "s1", "company": {"id": "c0", "name": "Co 0"}}]
+        assert [out[k]["status"] for k in ("gone", "bad", "loop")] == [404, 404, 400]
+        print("✓ Sub-requests answered in order with their own status, headers and body")
+
+    def test_public_calls_without_token(self, run_db, server):
+        async def scenario(db, counter):
+            await populate(db)
+            return await post(server, {"requests": [{"path": "/expos"}, {"path": "/shortlists"}]})
+        statuses = [x["status"] for x in run_db(scenario).json()["responses"]]
+        assert statuses == [200, 401]
+        print("✓ Unauthenticated batch serves public routes and 401s user-scoped ones")
+
+    def test_size_capped(self, run_db, server):
+        async def scenario(db, counter):
+            return await post(server, {"requests": [{"path": "/expos"}] * (server.BATCH_MAX + 1)})
+        assert run_db(scenario).status_code == 400
+        print("✓ Oversized batches rejected")
+
+    def test_streaming_routes_refused_and_slow_calls_time_out(self, run_db, server, monkeypatch):
+        async def scenario(db, counter):
+            await populate(db)
+            token = server.make_token("u-batch", "user")
+            refused = await post(server, {"requests": [{"path": "/export/shortlists?stream=true"}, {"path": "/events"}]}, token)
+            # An event stream let through never completes: the sub-request times out and frees its slot
+            monkeypatch.setattr(server, "BATCH_STREAMING", ())
+            monkeypatch.setattr(server, "BATCH_TIMEOUT", 0.2)
+            ticks = 0
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+            t = asyncio.create_task(ticker())
+            try: slow = await asyncio.wait_for(post(server, {"requests": [{"path": "/events"}, {"path": "/expos"}]}, token), 5)
+            finally: t.cancel()
+            return refused, slow, ticks
+        refused, slow, ticks = run_db(scenario)
+        assert [x["status"] for x in refused.json()["responses"]] == [400, 400]
+        assert [x["status"] for x in slow.json()["responses"]] == [504, 200]
+        assert ticks > 5 and server.EVENTS.stats()["subscribers"] == 0
+        print("✓ Streaming sub-requests refused; a hung one times out without blocking the loop")
@@ -0,0 +1,124 @@
+"""
+Cache tests: TTL/LRU behaviour of cache.TTLCache / VersionedCache, SingleFlight coalescing and the cached current_user path
+"""
+import asyncio
+import pytest
+from fastapi import HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from cache import TTLCache, VersionedCache, SingleFlight
+
+
+class FakeClock:
+    def __init__(self): self.now = 0.0
+    def __call__(self): return self.now
+
+
+class TestTTLCache:
+    """cache.TTLCache"""
+
+    def test_lru_eviction(self):
+        c = TTLCache(maxsize=2, ttl=60)
+        c.set("a", 1); c.set("b", 2)
+        assert c.get("a") == 1  # refresh a
+        c.set("c", 3)
+        assert c.get("b") is None and c.get("a") == 1 and c.get("c") == 3
+        assert c.evictions == 1
+        print("✓ Least recently used entry evicted")
+
+    def test_ttl_expiry(self):
+        clock = FakeClock()
+        c = TTLCache(maxsize=10, ttl=5, clock=clock)
+        c.set("a", 1); c.set("b", 2, ttl=1)
+        clock.now = 2
+        assert c.get("a") == 1 and c.get("b") is None
+        clock.now = 6
+        assert c.get("a") is None and len(c) == 0
+        print("✓ Entries expire after their TTL")
+
+    def test_stats_and_invalidate(self):
+        c = TTLCache(maxsize=10, ttl=60)
+        c.set("a", 1); c.get("a"); c.get("x"); c.invalidate("a"); c.get("a")
+        st = c.stats()
+        assert (st["hits"], st["misses"], st["size"]) == (1, 2, 0)
+        print("✓ Hit/miss counters exposed")
+
+
+class TestVersionedCache:
+    """cache.VersionedCache"""
+
+    def test_bump_drops_entries(self):
+        c = VersionedCache(maxsize=10, ttl=60)
+        c.set("a", 1)
+        c.bump()
+        assert c.get("a") is None and c.version == 1
+        c.bump(7)
+        assert c.stats()["version"] == 7 and c.stats()["invalidations"] == 2
+        print("✓ New generation drops cached entries")
+
+    def test_stale_value_not_stored(self):
+        c = VersionedCache(maxsize=10, ttl=60)
+        version = c.version
+        c.bump()  # a write lands while the value is being computed
+        c.set_if_current("a", "stale", version)
+        c.set_if_current("b", "fresh", c.version)
+        assert c.get("a") is None and c.get("b") == "fresh"
+        print("✓ Values computed before an invalidation are discarded")
+
+
+class TestSingleFlight:
+    """cache.SingleFlight"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        flight, calls = SingleFlight(), []
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"n": len(calls)}
+        async def scenario():
+            same = await asyncio.gather(*[flight.do(("/api/companies", ()), fetch) for _ in range(5)])
+            other = await flight.do(("/api/companies", (("limit", "5"),)), fetch)
+            return same, other
+        same, other = asyncio.run(scenario())
+        assert same == [{"n": 1}] * 5 and other == {"n": 2} and len(calls) == 2
+        assert flight.stats() == {"in_flight": 0, "leaders": 2, "collapsed": 4, "collapse_rate": 0.6667}
+        print("✓ Identical concurrent calls run once; different keys run separately")
+
+    def test_error_reaches_every_caller(self):
+        flight = SingleFlight()
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise HTTPException(404, "Company not found")
+        async def scenario():
+            return await asyncio.gather(*[flight.do("k", fail) for _ in range(3)], return_exceptions=True)
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, HTTPException) and r.status_code == 404 for r in results)
+        assert flight.stats()["in_flight"] == 0
+        print("✓ Failure propagates to all waiters and the key is released")
+
+
+class TestCachedCurrentUser:
+    """server.current_user with USER_CACHE / TOKEN_CACHE"""
+
+    def test_second_request_skips_mongo(self, run_db, server):
+        async def scenario(db, counter):
+            server.USER_CACHE.clear(); server.TOKEN_CACHE.clear()
+            await db.users.insert_one({"id": "u-cache", "email": "c@test.com", "name": "C", "role": "user", "password_hash": "h"})
+            cred = HTTPAuthorizationCredentials(scheme="Bearer", credentials=server.make_token("u-cache", "user"))
+            counter.reset()
+            first = await server.current_user(cred)
+            after_first = len(counter.commands)
+            second = await server.current_user(cred)
+            after_second = len(counter.commands)
+            server.invalidate_user("u-cache")
+            await server.current_user(cred)
+            return first, second, after_first, after_second, len(counter.commands)
+        first, second, n1, n2, n3 = run_db(scenario)
+        assert first == second and "password_hash" not in first
+        assert n1 == 1 and n2 == 1 and n3 == 2
+        print("✓ Cached user served without a Mongo round trip")
+
+    def test_invalid_token_rejected(self, server):
+        with pytest.raises(HTTPException) as exc:
+            server.decode_token("not-a-jwt")
+        assert exc.value.status_code == 401
+        print("✓ Invalid token still returns 401")
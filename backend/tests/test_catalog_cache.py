@@ -0,0 +1,136 @@
+"""
+Catalog response cache tests: strong ETags, 304 revalidation and invalidation on write
+"""
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+import serialize
+
+
+async def get(server, path, **headers):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://t") as http:
+        return await http.get(path, headers=headers)
+
+
+class TestCatalogCache:
+    """server.catalog_response on /expos, /expos/{eid}, /expos/meta/filters, /companies/filters/options"""
+
+    def test_etag_and_not_modified(self, run_db, server):
+        async def scenario(db, counter):
+            await server.invalidate_catalog()
+            await db.expos.insert_one({"id": "e1", "name": "IFA", "region": "Europe", "company_count": 0})
+            first = await get(server, "/api/expos")
+            counter.reset()
+            again = await get(server, "/api/expos", **{"If-None-Match": first.headers["etag"]})
+            other = await get(server, "/api/expos", **{"If-None-Match": '"nope"'})
+            return first, again, other, counter.commands
+        first, again, other, commands = run_db(scenario)
+        assert first.status_code == 200 and first.json()[0]["id"] == "e1"
+        assert first.headers["etag"].startswith('"') and first.headers["cache-control"] == "no-cache"
+        assert again.status_code == 304 and again.headers["etag"] == first.headers["etag"] and not again.content
+        assert other.status_code == 200 and other.json() == first.json()
+        assert commands == []
+        print("✓ Cached catalog served with a strong ETag; If-None-Match gets 304 without Mongo")
+
+    def test_write_invalidates(self, run_db, server):
+        async def scenario(db, counter):
+            await server.invalidate_catalog()
+            await db.companies.insert_one({"id": "c1", "expo_id": "e1", "industry": "Robotics", "hq": "Munich", "revenue": 5})
+            before = await get(server, "/api/companies/filters/options?expo_id=e1")
+            await db.companies.insert_one({"id": "c2", "expo_id": "e1", "industry": "FinTech", "hq": "Dubai", "revenue": 9})
+            stale = await get(server, "/api/companies/filters/options?expo_id=e1")
+            await server.invalidate_catalog()
+            after = await get(server, "/api/companies/filters/options?expo_id=e1")
+            return before, stale, after
+        before, stale, after = run_db(scenario)
+        assert stale.headers["etag"] == before.headers["etag"]
+        assert after.json()["industries"] == ["FinTech", "Robotics"] and after.headers["etag"] != before.headers["etag"]
+        print("✓ invalidate_catalog() drops cached responses")
+
+    def test_shared_version_counter(self, run_db, server):
+        async def scenario(db, counter):
+            prev = server.CATALOG_SHARED, server.CATALOG_SYNC_INTERVAL
+            server.CATALOG_SHARED, server.CATALOG_SYNC_INTERVAL = True, 0
+            try:
+                await server.invalidate_catalog()
+                await db.expos.insert_one({"id": "e1", "name": "IFA", "region": "Europe", "company_count": 0})
+                before = await get(server, "/api/expos/meta/filters")
+                await db.expos.insert_one({"id": "e2", "name": "CES", "region": "North America", "company_count": 0})
+                # another worker invalidates through the shared counter
+                await db.cache_versions.update_one({"_id": "catalog"}, {"$inc": {"v": 1}})
+                after = await get(server, "/api/expos/meta/filters")
+            finally:
+                server.CATALOG_SHARED, server.CATALOG_SYNC_INTERVAL = prev
+            return before, after
+        before, after = run_db(scenario)
+        assert before.json()["regions"] == ["Europe"] and after.json()["regions"] == ["Europe", "North America"]
+        print("✓ Workers pick up invalidations from the Mongo version counter")
+
+
+class TestCatalogNegotiation:
+    """server.catalog_response with Accept: application/msgpack"""
+
+    def test_msgpack_cached_separately(self, server):
+        pytest.importorskip("msgpack")
+        calls = []
+        async def scenario():
+            app = FastAPI()
+            @app.get("/catalog")
+            async def catalog(request: Request):
+                async def compute():
+                    calls.append(1)
+                    return [{"id": "e1", "name": "IFA"}]
+                return await server.catalog_response(request, compute)
+            server.CATALOG_CACHE.bump()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+                js = await http.get("/catalog")
+                mp = await http.get("/catalog", headers={"Accept": "application/msgpack"})
+                again = await http.get("/catalog", headers={"Accept": "application/msgpack", "If-None-Match": mp.headers["etag"]})
+                cross = await http.get("/catalog", headers={"If-None-Match": mp.headers["etag"]})
+            return js, mp, again, cross
+        js, mp, again, cross = asyncio.run(scenario())
+        assert js.headers["content-type"] == "application/json" and js.json() == [{"id": "e1", "name": "IFA"}]
+        assert mp.headers["content-type"] == "application/msgpack" and serialize.msgpack.unpackb(mp.content) == js.json()
+        assert all(r.headers["vary"] == "Accept" for r in (js, mp, again))
+        assert mp.headers["etag"] != js.headers["etag"] and again.status_code == 304
+        assert cross.status_code == 200 and cross.json() == js.json() and len(calls) == 2
+        print("✓ Catalog bodies and ETags are kept per media type, with Vary: Accept")
+
+
+class TestCompanyCount:
+    """server.bump_company_count / fill_company_counts"""
+
+    def test_uncounted_expo_filled_from_companies(self, run_db, server):
+        async def scenario(db, counter):
+            await db.expos.insert_many([{"id": "old", "name": "Pre-counter"}, {"id": "new", "name": "Counted", "company_count": 2}])
+            await db.companies.insert_many([{"id": f"c{i}", "expo_id": "old"} for i in range(25)])
+            await server.bump_company_count("old", 5)
+            await server.bump_company_count("new", 5)
+            stored = await db.expos.find_one({"id": "old"})
+            filled = await server.fill_company_counts(await db.expos.find({}, {"_id": 0}).sort("id", 1).to_list(None))
+            return stored, filled
+        stored, filled = run_db(scenario)
+        assert "company_count" not in stored
+        assert [(e["id"], e["company_count"]) for e in filled] == [("new", 7), ("old", 25)]
+        print("✓ Increments skip uncounted expos, which are then counted in full")
+
+    def test_bump_during_fill_not_lost(self, run_db, server, monkeypatch):
+        count, raced = server.count_companies_by_expo, []
+        async def racing_count(expo_ids=None):
+            counts = await count(expo_ids)
+            if not raced:  # an insert lands between the first count and the $set
+                raced.append(True)
+                await server.db.companies.insert_one({"id": "late", "expo_id": "old"})
+                await server.bump_company_count("old", 1)
+            return counts
+        monkeypatch.setattr(server, "count_companies_by_expo", racing_count)
+        async def scenario(db, counter):
+            await db.expos.insert_one({"id": "old", "name": "Pre-counter"})
+            await db.companies.insert_many([{"id": f"c{i}", "expo_id": "old"} for i in range(3)])
+            filled = await server.fill_company_counts(await db.expos.find({}, {"_id": 0}).to_list(None))
+            await server.bump_company_count("old", 1)
+            return filled, await db.expos.find_one({"id": "old"})
+        filled, stored = run_db(scenario)
+        assert filled[0]["company_count"] == 4 and stored["company_count"] == 5
+        print("✓ A bump skipped while an expo is being counted is picked up by the recount")
@@ -0,0 +1,31 @@
+"""
+Read coalescing tests: identical concurrent public reads share one query and its paging headers
+"""
+import asyncio
+import httpx
+
+
+class TestCoalescedReads:
+    """server.coalesce on /companies, /companies/{cid} and the catalog routes"""
+
+    def test_concurrent_pages_share_query_and_headers(self, run_db, server):
+        async def scenario(db, counter):
+            await db.companies.insert_many([{"id": f"c{i}", "expo_id": "e1", "name": f"Co {i}"} for i in range(3)])
+            before = server.READS.stats()
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://t") as http:
+                pages = await asyncio.gather(*[http.get("/api/companies?limit=2&expo_id=e1&industry=") for _ in range(4)],
+                                             http.get("/api/companies?expo_id=e1&limit=2"))
+            after = server.READS.stats()
+            return pages, after["leaders"] - before["leaders"], after["collapsed"] - before["collapsed"]
+        pages, leaders, collapsed = run_db(scenario)
+        assert all(p.status_code == 200 and [c["id"] for c in p.json()] == ["c0", "c1"] for p in pages)
+        assert len({p.headers["x-next-cursor"] for p in pages}) == 1
+        assert leaders + collapsed == 5 and collapsed >= 1
+        print("✓ Reordered and blank query params coalesce; followers get the leader's cursor")
+
+    def test_not_found_reaches_followers(self, run_db, server):
+        async def scenario(db, counter):
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://t") as http:
+                return await asyncio.gather(*[http.get("/api/companies/missing") for _ in range(3)])
+        assert [r.status_code for r in run_db(scenario)] == [404, 404, 404]
+        print("✓ Errors from the shared query are returned to every caller")
@@ -0,0 +1,97 @@
+"""
+Response compression and MessagePack negotiation tests: compress.CompressionMiddleware, serialize.FastJSONRoute
+"""
+import asyncio
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, Response
+from starlette.responses import StreamingResponse
+import compress
+import serialize
+
+ROWS = [{"id": f"c{i}", "name": f"Company {i}", "booth": f"Hall {i % 9} A-{i}"} for i in range(200)]
+
+
+def make_app(minimum_size=1024):
+    app, router = FastAPI(), APIRouter(route_class=serialize.FastJSONRoute)
+
+    @router.get("/companies")
+    async def companies(response: Response, limit: int = 200):
+        response.headers["X-Next-Cursor"] = "abc"
+        return ROWS[:limit]
+
+    @router.get("/expos")
+    async def expos():
+        return Response(serialize.dumps(ROWS), media_type="application/json", headers={"ETag": '"v1"'})
+
+    @router.get("/export")
+    async def export():
+        async def rows():
+            for r in ROWS: yield f"{r['id']},{r['name']}\n"
+        return StreamingResponse(rows(), media_type="text/csv")
+
+    @router.get("/events")
+    async def events():
+        return Response("data: x\n\n" * 500, media_type="text/event-stream")
+
+    app.include_router(router)
+    app.add_middleware(compress.CompressionMiddleware, minimum_size=minimum_size)
+    return app
+
+
+def get(app, path, **headers):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+            return await http.get(path, headers=headers)
+    return asyncio.run(go())
+
+
+class TestCompression:
+    """compress.CompressionMiddleware"""
+
+    def test_gzip_above_threshold(self):
+        r = get(make_app(), "/companies", **{"Accept-Encoding": "gzip"})
+        assert r.headers["content-encoding"] == "gzip" and r.headers["vary"] == "Accept, Accept-Encoding"
+        assert int(r.headers["content-length"]) < len(serialize.dumps(ROWS)) // 4
+        assert r.json() == ROWS and r.headers["x-next-cursor"] == "abc"
+        print("✓ Large JSON gzipped with headers preserved")
+
+    def test_small_and_unaccepted_pass_through(self):
+        small = get(make_app(), "/companies?limit=1", **{"Accept-Encoding": "gzip"})
+        identity = get(make_app(), "/companies", **{"Accept-Encoding": "identity"})
+        events = get(make_app(), "/events", **{"Accept-Encoding": "gzip"})
+        assert all("content-encoding" not in r.headers for r in (small, identity, events))
+        assert identity.json() == ROWS
+        print("✓ Below threshold, identity-only clients and event streams are not compressed")
+
+    def test_streamed_body_and_weak_etag(self):
+        csv = get(make_app(), "/export", **{"Accept-Encoding": "gzip"})
+        expos = get(make_app(), "/expos", **{"Accept-Encoding": "gzip"})
+        assert csv.headers["content-encoding"] == "gzip" and "content-length" not in csv.headers
+        assert csv.text.splitlines()[-1] == "c199,Company 199"
+        assert expos.headers["etag"] == 'W/"v1"'
+        print("✓ Streaming CSV compressed chunk by chunk; strong ETag weakened")
+
+    def test_encoding_negotiation(self):
+        assert compress.choose_encoding("gzip;q=0, *") == ("br" if compress.brotli else None)
+        assert compress.choose_encoding("br;q=0, gzip") == "gzip" and compress.choose_encoding("*;q=0") is None
+        print("✓ q=0 opts an encoding out")
+
+    @pytest.mark.skipif(compress.brotli is None, reason="brotli not installed")
+    def test_brotli_preferred(self):
+        r = get(make_app(), "/companies", **{"Accept-Encoding": "gzip, deflate, br"})
+        assert r.headers["content-encoding"] == "br"
+        assert r.json() == ROWS  # httpx decodes br when brotli is installed
+        print("✓ Brotli preferred when installed and accepted")
+
+
+@pytest.mark.skipif(serialize.msgpack is None, reason="msgpack not installed")
+class TestMsgpackNegotiation:
+    """serialize.FastJSONRoute with Accept: application/msgpack"""
+
+    def test_msgpack_body(self):
+        r = get(make_app(), "/companies", Accept="application/msgpack")
+        assert r.headers["content-type"] == "application/msgpack" and r.headers["x-next-cursor"] == "abc"
+        assert serialize.msgpack.unpackb(r.content) == ROWS
+        assert get(make_app(), "/companies", Accept="application/json").json() == ROWS
+        print("✓ MessagePack on request, JSON by default")
@@ -0,0 +1,70 @@
+"""
+Per-request Mongo tracing tests: command attribution, Server-Timing and the N+1 warning
+"""
+import asyncio
+import logging
+from types import SimpleNamespace
+import httpx
+from fastapi import FastAPI
+import dbtrace
+
+LISTENER = dbtrace.TraceListener()
+
+
+def command(name, cmd, request_id, micros=1000):
+    # Fires started + succeeded the way pymongo does for one command
+    ev = SimpleNamespace(command_name=name, command={name: cmd.pop("coll", None), **cmd}, connection_id=("db", 27017),
+                         request_id=request_id, duration_micros=micros)
+    LISTENER.started(ev)
+    LISTENER.succeeded(ev)
+
+
+def make_app(metrics, threshold=3):
+    app = FastAPI()
+
+    @app.get("/items/{iid}")
+    async def item(iid: str, n: int = 1):
+        for i in range(n): command("find", {"coll": "companies", "filter": {"id": f"c{i}"}, "limit": 1, "singleBatch": True}, i)
+        command("aggregate", {"coll": "expos", "pipeline": []}, 99, micros=7500)
+        return {"ok": True}
+
+    app.add_middleware(dbtrace.TraceMiddleware, metrics=metrics, find_one_threshold=threshold)
+    return app
+
+
+def get(app, path):
+    async def go():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+            return await http.get(path)
+    return asyncio.run(go())
+
+
+class TestRequestTrace:
+    """dbtrace.TraceMiddleware / TraceListener / DbMetrics"""
+
+    def test_server_timing_header(self):
+        r = get(make_app(dbtrace.DbMetrics()), "/items/x?n=2")
+        assert r.headers["server-timing"] == 'db;desc="3 commands";dur=9.50, db-slowest;desc="aggregate expos";dur=7.50'
+        print("✓ Server-Timing reports command count, DB time and slowest command")
+
+    def test_per_route_metrics(self):
+        metrics = dbtrace.DbMetrics()
+        app = make_app(metrics)
+        get(app, "/items/a?n=1"); get(app, "/items/b?n=3")
+        m = metrics.snapshot()["GET /items/{iid}"]
+        assert (m["requests"], m["commands"], m["max_commands"], m["avg_commands"]) == (2, 6, 4, 3.0)
+        assert m["slowest"] == "aggregate expos" and m["n_plus_one"] == 0
+        print("✓ Metrics aggregate per route template")
+
+    def test_repeated_find_one_warns(self, caplog):
+        metrics = dbtrace.DbMetrics()
+        with caplog.at_level(logging.WARNING, logger="dbtrace"):
+            get(make_app(metrics, threshold=3), "/items/x?n=4")
+        assert "issued 4 identical find_one companies {id:?}" in caplog.text
+        assert metrics.snapshot()["GET /items/{iid}"]["n_plus_one"] == 1
+        print("✓ More identical find_one shapes than the threshold are logged")
+
+    def test_commands_outside_requests_ignored(self):
+        command("find", {"coll": "companies", "filter": {}}, 1)
+        assert dbtrace.CURRENT.get() is None
+        print("✓ Commands outside a request are not traced")
@@ -0,0 +1,107 @@
+"""
+Event stream tests: broker scoping and backpressure, change stream mapping and GET /api/events
+"""
+import json
+import asyncio
+import pytest
+from fastapi import HTTPException
+import events
+
+USER = {"id": "events-test-user", "email": "events@test.com", "name": "Events", "role": "user"}
+OTHER = {**USER, "id": "events-other-user"}
+
+
+@pytest.fixture
+def broker(server):
+    prev, server.EVENTS = server.EVENTS, events.Broker(max_subscribers=2, queue_size=10)
+    yield server.EVENTS
+    server.EVENTS = prev
+
+
+def drain(sub):
+    out = []
+    while not sub.queue.empty(): out.append(sub.queue.get_nowait())
+    return out
+
+
+async def next_message(body, timeout=1.0):
+    chunk = await asyncio.wait_for(body.__anext__(), timeout)
+    kind, data = chunk.split("\n")[:2]
+    return kind.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+class TestBroker:
+    """events.Broker / Subscription / from_change"""
+
+    def test_scoping(self):
+        b = events.Broker()
+        mine, expo, other = b.subscribe("u1"), b.subscribe("u1", "e2"), b.subscribe("u2")
+        b.publish(events.change_event("networks", "upsert", {"id": "n1", "user_id": "u1", "expo_id": "e1", "notes": "x"}))
+        b.publish(events.stage_event({"id": "c1", "expo_id": "e1", "shortlist_stage": "engaging"}))
+        assert drain(mine) == [{"type": "networks", "op": "upsert", "id": "n1", "expo_id": "e1"},
+                               {"type": "stage", "op": "update", "id": "c1", "expo_id": "e1", "stage": "engaging"}]
+        assert drain(expo) == [] and [e["type"] for e in drain(other)] == ["stage"]
+        b.unsubscribe(mine)
+        assert b.stats()["subscribers"] == 2 and b.stats()["delivered"] == 3
+        print("✓ User events reach only their owner; stage changes reach everyone on that expo")
+
+    def test_backpressure_and_cap(self):
+        b = events.Broker(max_subscribers=2, queue_size=3)
+        slow, fast = b.subscribe("u1"), b.subscribe("u1")
+        for i in range(5):
+            b.publish(events.change_event("shortlists", "upsert", {"id": f"s{i}", "user_id": "u1"}))
+            if i < 4: drain(fast)
+        assert drain(slow) == [{"type": "resync"}, {"type": "shortlists", "op": "upsert", "id": "s4"}]
+        assert len(drain(fast)) == 1 and b.stats()["dropped"] == 1
+        with pytest.raises(events.Full):
+            b.subscribe("u2")
+        assert b.stats()["rejected"] == 1
+        print("✓ A full queue collapses to one resync without blocking others; subscribers capped")
+
+    def test_from_change(self):
+        ns = lambda coll: {"db": "x", "coll": coll}
+        assert events.from_change({"ns": ns("expo_days"), "fullDocument": {"id": "d1", "user_id": "u1", "expo_id": "e1", "_id": 1}}) == \
+            {"type": "expo_days", "op": "upsert", "id": "d1", "user_id": "u1", "expo_id": "e1"}
+        assert events.from_change({"ns": ns("tombstones"), "fullDocument": {"collection": "networks", "id": "n1", "user_id": "u1"}}) == \
+            {"type": "networks", "op": "delete", "id": "n1", "user_id": "u1"}
+        assert events.from_change({"ns": ns("companies"), "fullDocument": {"id": "c1", "expo_id": "e1", "shortlist_stage": "engaging"}})["stage"] == "engaging"
+        assert events.from_change({"ns": ns("networks"), "fullDocument": None}) is None
+        print("✓ Change stream documents map to the same events the routes publish locally")
+
+
+class TestEventStream:
+    """server.event_stream with the in-process source"""
+
+    def test_stream_receives_writes(self, run_db, server, broker):
+        async def scenario(db, counter):
+            await db.companies.insert_one({"id": "c1", "expo_id": "e1", "name": "Co 1"})
+            r = await server.event_stream(expo_id=None, user=USER)
+            body = r.body_iterator
+            assert (await body.__anext__()).startswith("retry: ")
+            sl = await server.create_shortlist(server.ShortlistIn(company_id="c1", expo_id="e1"), user=USER)
+            await server.create_network(server.NetworkIn(company_id="c1", expo_id="e1", contact_name="Bob"), user=OTHER)
+            await server.update_stage("c1", stage="engaging", user=USER)
+            await server.delete_shortlist(sl["id"], user=USER)
+            got = [await next_message(body) for _ in range(4)]
+            broker.close()
+            with pytest.raises(StopAsyncIteration):
+                await body.__anext__()
+            await r.background()
+            return got, sl["id"]
+        got, sid = run_db(scenario)
+        assert [(k, e["op"]) for k, e in got] == [("shortlists", "upsert"), ("stage", "update"), ("stage", "update"), ("shortlists", "delete")]
+        assert got[0][1]["id"] == got[3][1]["id"] == sid and "user_id" not in got[0][1]
+        assert [e["stage"] for _, e in got[1:3]] == ["prospecting", "engaging"]
+        assert broker.stats()["subscribers"] == 0
+        print("✓ Own shortlist changes and stage updates streamed; other users' writes are not")
+
+    def test_subscriber_cap(self, run_db, server, broker):
+        async def scenario(db, counter):
+            await server.event_stream(expo_id=None, user=USER)
+            await server.event_stream(expo_id=None, user=OTHER)
+            with pytest.raises(HTTPException) as exc:
+                await server.event_stream(expo_id=None, user=USER)
+            return exc.value
+        err = run_db(scenario)
+        assert err.status_code == 503 and err.headers["Retry-After"]
+        print("✓ Streams past SSE_MAX_SUBSCRIBERS get 503 with Retry-After")
@@ -0,0 +1,69 @@
+"""
+Facet key tests: exact industry/hq/region filters on the canonical *_key fields,
+match=substring opting back into the regex, and the startup backfill
+"""
+import httpx
+
+
+async def get(server, path, **params):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://t") as http:
+        return await http.get(path, params=params)
+
+
+def ids(response):
+    return sorted(d["id"] for d in response.json())
+
+
+class TestFacetKeys:
+    """server.facet_filter via /companies and /expos, server.backfill_facet_keys"""
+
+    def test_companies_exact_match_on_keys(self, run_db, server):
+        async def scenario(db, counter):
+            await db.companies.insert_many([
+                server.prepare_company({"id": "c1", "expo_id": "e1", "name": "Sony", "industry": "Consumer Electronics", "hq": "Tokyo, Japan"}),
+                server.prepare_company({"id": "c2", "expo_id": "e1", "name": "Conrad", "industry": "Electronics Retail", "hq": "Hirschau"}),
+                server.prepare_company({"id": "c3", "expo_id": "e1", "name": "Loewe", "industry": " consumer electronics", "hq": "Kronach"})])
+            return (await get(server, "/api/companies", expo_id="e1", industry="consumer  electronics"),
+                    await get(server, "/api/companies", expo_id="e1", industry="Electro"),
+                    await get(server, "/api/companies", expo_id="e1", hq="TOKYO, JAPAN"),
+                    await get(server, "/api/companies", expo_id="e1", industry="Electro", match="substring"),
+                    await get(server, "/api/companies", expo_id="e1", industry="Electro", match="fuzzy"))
+        exact, partial, hq, substring, bad = run_db(scenario)
+        assert ids(exact) == ["c1", "c3"] and ids(partial) == [] and ids(hq) == ["c1"]
+        assert ids(substring) == ["c1", "c2", "c3"]
+        assert bad.status_code == 400 and "match" in bad.json()["detail"]
+        assert all(k not in exact.json()[0] for k in ("industry_key", "hq_key"))
+        print("✓ /companies filters match whole values case- and space-insensitively; substring opts into the regex")
+
+    def test_expos_exact_match_on_keys(self, run_db, server):
+        async def scenario(db, counter):
+            await server.invalidate_catalog()
+            await db.expos.insert_many([
+                server.with_facet_keys({"id": "e1", "name": "IFA", "region": "Europe", "industry": "Consumer Electronics", "company_count": 0}, "expos"),
+                server.with_facet_keys({"id": "e2", "name": "CES", "region": "North America", "industry": "Electronics", "company_count": 0}, "expos")])
+            return (await get(server, "/api/expos", region="EUROPE"),
+                    await get(server, "/api/expos", region="Euro"),
+                    await get(server, "/api/expos", region="Euro", match="substring"),
+                    await get(server, "/api/expos", industry="electronics"),
+                    await get(server, "/api/expos", region="Europe", match="prefix"))
+        exact, partial, substring, industry, bad = run_db(scenario)
+        assert ids(exact) == ["e1"] and ids(partial) == [] and ids(substring) == ["e1"] and ids(industry) == ["e2"]
+        assert bad.status_code == 400
+        print("✓ /expos region and industry filters match on the canonical keys")
+
+    def test_backfill_stamps_legacy_documents(self, run_db, server):
+        async def scenario(db, counter):
+            await db.expos.insert_one({"id": "e1", "region": "Middle  East", "industry": "Energy"})
+            await db.companies.insert_many([{"id": "old", "expo_id": "e1", "industry": "Oil & Gas", "hq": "Abu Dhabi"},
+                                            {"id": "keyed", "expo_id": "e1", "industry": "Solar", "hq": "Dubai",
+                                             "industry_key": "kept", "hq_key": "kept"}])
+            first = await server.backfill_facet_keys()
+            again = await server.backfill_facet_keys()
+            docs = {d["id"]: d for d in await db.companies.find({}, {"_id": 0}).to_list(None)}
+            return first, again, await db.expos.find_one({"id": "e1"}), docs
+        first, again, expo, docs = run_db(scenario)
+        assert first == {"expos": 1, "companies": 1} and again == {"expos": 0, "companies": 0}
+        assert (expo["region_key"], expo["industry_key"]) == ("middle east", "energy")
+        assert (docs["old"]["industry_key"], docs["old"]["hq_key"]) == ("oil & gas", "abu dhabi")
+        assert docs["keyed"]["industry_key"] == "kept"
+        print("✓ Backfill stamps keys on legacy documents and skips keyed ones")
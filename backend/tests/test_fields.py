@@ -0,0 +1,103 @@
+"""
+Sparse fieldset and fast serialization tests: fields= projections on list endpoints and serialize.FastJSONRoute
+"""
+import asyncio
+from datetime import datetime, timezone
+import httpx
+import pytest
+from fastapi import APIRouter, FastAPI, HTTPException, Response
+import serialize
+
+USER = {"id": "fields-test-user", "email": "fields@test.com", "name": "Fields", "role": "user"}
+
+
+async def populate(db):
+    await db.expos.insert_one({"id": "e1", "name": "IFA", "region": "Europe", "region_key": "europe"})
+    await db.companies.insert_many([{"id": f"c{i}", "expo_id": "e1", "name": f"Co {i}", "booth": f"B{i}", "revenue": i,
+                                     "contacts": [{"name": "Ann", "email": "a@x.com"}], "search_prefixes": ["co"],
+                                     "shortlist_stage": "engaging" if i % 2 else "prospecting"} for i in range(4)])
+    await db.shortlists.insert_many([{"id": f"s{i}", "user_id": USER["id"], "company_id": f"c{i}", "expo_id": "e1",
+                                      "notes": "n", "created_at": "2026-01-01"} for i in range(4)])
+    await db.expo_days.insert_many([{"id": f"d{i}", "user_id": USER["id"], "expo_id": "e1", "company_id": f"c{i}",
+                                     "time_slot": f"{i % 2:02d}:00", "status": "planned"} for i in range(4)])
+
+
+class TestSparseFieldsets:
+    """parse_fields / sparse_page on /companies, /shortlists, /expo-days"""
+
+    def test_companies_projection(self, run_db, server):
+        async def scenario(db, counter):
+            await populate(db)
+            return await server.get_companies(expo_id="e1", response=Response(), fields="name,booth,search_prefixes")
+        rows = run_db(scenario)
+        assert rows[0] == {"id": "c0", "name": "Co 0", "booth": "B0"}
+        print("✓ /companies returns only the requested fields; hidden keys stay hidden")
+
+    def test_joined_fields_and_skipped_join(self, run_db, server):
+        async def scenario(db, counter):
+            await populate(db)
+            return await server.get_shortlists(stage="engaging", expo_id=None, response=Response(), fields="notes,company.name", user=USER)
+        rows = run_db(scenario)
+        assert [r["id"] for r in rows] == ["s1", "s3"]
+        assert set(rows[0]) == {"id", "notes", "company"} and rows[0]["company"]["name"] == "Co 1"
+        assert "contacts" not in rows[0]["company"] and "expo" not in rows[0]
+        print("✓ Joined documents are projected; unnamed joins are not fetched")
+
+    def test_cursor_keys_fetched_then_dropped(self, run_db, server):
+        async def scenario(db, counter):
+            await populate(db)
+            rows, cursor = [], None
+            while True:
+                response = Response()
+                rows += await server.get_expo_days(expo_id=None, response=response, limit=3, cursor=cursor, fields="status", user=USER)
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor: return rows
+        rows = run_db(scenario)
+        assert sorted(r["id"] for r in rows) == ["d0", "d1", "d2", "d3"] and all(set(r) == {"id", "status"} for r in rows)
+        print("✓ Keyset paging works when the sort keys are not requested")
+
+    def test_overlapping_paths_collapse_to_parent(self, run_db, server):
+        assert server.sparse_projection({"id", "contacts", "contacts.name", "name"}, {}) == {"id": 1, "contacts": 1, "name": 1}
+        async def scenario(db, counter):
+            await populate(db)
+            listed = await server.get_companies(expo_id="e1", response=Response(), fields="contacts,contacts.name")
+            searched = await server.get_companies(expo_id="e1", search="co", response=Response(), fields="contacts.name")
+            return listed, searched
+        listed, searched = run_db(scenario)
+        assert listed[0] == {"id": "c0", "contacts": [{"name": "Ann", "email": "a@x.com"}]}
+        # search fetches whole contacts to rank them; a requested sub-path keeps the parent in the response
+        assert searched and all(r["contacts"][0]["name"] == "Ann" and "name" not in r for r in searched)
+        print("✓ fields=contacts,contacts.name projects the parent instead of failing")
+
+    def test_invalid_field_rejected(self, server):
+        with pytest.raises(HTTPException) as exc:
+            server.parse_fields("name,$where")
+        assert exc.value.status_code == 400
+        print("✓ Operator-like field names rejected")
+
+
+class TestFastJSONRoute:
+    """serialize.FastJSONRoute"""
+
+    def test_matches_default_encoding_and_keeps_headers(self):
+        app, router = FastAPI(), APIRouter(route_class=serialize.FastJSONRoute)
+        when = datetime(2026, 1, 2, 3, 4, 5, 678000, tzinfo=timezone.utc)
+
+        @router.get("/items")
+        async def items(response: Response):
+            response.headers["X-Next-Cursor"] = "abc"
+            return [{"id": 1, "at": when, "tags": {"a"}, "name": "Zürich"}]
+
+        @router.get("/raw")
+        def raw():
+            return Response(b"ok", media_type="text/plain")
+
+        app.include_router(router)
+        async def go():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+                return await http.get("/items"), await http.get("/raw")
+        r, raw_r = asyncio.run(go())
+        assert r.json() == [{"id": 1, "at": when.isoformat(), "tags": ["a"], "name": "Zürich"}]
+        assert r.headers["x-next-cursor"] == "abc" and r.headers["content-type"] == "application/json"
+        assert raw_r.text == "ok"
+        print("✓ Fast path encodes like jsonable_encoder and carries response headers")
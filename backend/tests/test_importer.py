@@ -0,0 +1,153 @@
+"""
+CSV importer tests: row normalization and batched, error-tolerant inserts
+"""
+import io
+import asyncio
+import bson
+import pytest
+from bson.raw_bson import RawBSONDocument
+from pymongo.results import InsertManyResult
+import importer
+import documents
+from workers import BoundedPool
+
+
+class TestNormalizeRow:
+    """importer.normalize_row / clean_revenue"""
+
+    def test_revenue_cleaning(self):
+        assert importer.clean_revenue("€1,200M") == 1200.0
+        assert importer.clean_revenue("$ 35") == 35.0
+        assert importer.clean_revenue("n/a") == 0 and importer.clean_revenue(None) == 0
+        print("✓ Revenue strings normalized")
+
+    def test_row_fields(self):
+        doc = importer.normalize_row({"name": " Bosch ", "HQ": "Stuttgart", "revenue": "88,000",
+                                      "contacts": '[{"name": "Lisa"}]'}, "e1", "now")
+        assert (doc["name"], doc["hq"], doc["revenue"], doc["expo_id"]) == ("Bosch", "Stuttgart", 88000.0, "e1")
+        assert doc["contacts"] == [{"name": "Lisa"}] and doc["shortlist_stage"] == "none"
+        assert importer.normalize_row({"name": "X", "contacts": "{bad"}, "e1", "now")["contacts"] == []
+        print("✓ Row normalized to a company document")
+
+    def test_missing_name_rejected(self):
+        with pytest.raises(ValueError):
+            importer.normalize_row({"name": "  "}, "e1", "now")
+        print("✓ Row without a name rejected")
+
+    def test_revenue_column_matches_rows(self):
+        values = ["€1,200M", "$ 35", " 12 ", "n/a", None, "", "-5", "3.5M", "nan", "NaN", "inf", "-Infinity",
+                  "1_000", "0x10", "1e999", "1e3", ".5", "7.", "١٢"] * 10
+        assert importer.clean_revenue_column(values) == [importer.clean_revenue(v) for v in values]
+        assert [importer.clean_revenue(v) for v in ("nan", "inf", "1_000", "0x10", "1e999", "١٢")] == [0.0] * 6
+        print("✓ Column revenue cleaning matches per-row cleaning")
+
+
+class TestImportCsv:
+    """importer.import_csv"""
+
+    def test_batches_and_rejects(self, run_db):
+        body = "name,revenue,booth\n" + "".join(f"Co {i},{i},B{i}\n" if i % 100 else f",{i},B{i}\n" for i in range(1, 2501))
+        async def scenario(db, counter):
+            stats, preview = await importer.import_csv(io.StringIO(body), db.companies, "e1", batch_size=1000)
+            return stats, preview, await db.companies.count_documents({"expo_id": "e1"})
+        stats, preview, stored = run_db(scenario)
+        assert stats["rows"] == 2500 and stats["inserted"] == 2475 == stored
+        assert stats["rejected"] == 25 and stats["errors"][0] == {"row": 100, "error": "missing name"}
+        assert stats["batches"] == 3 and len(preview) == 3
+        print("✓ Import inserts in batches and reports per-row errors")
+
+    def test_upsert_reimport_is_idempotent(self, run_db):
+        body = "name,booth,revenue\nBosch GmbH,Hall 2,88000\nMiele,Hall 4,5200\nMiele,Hall 4,5300\n"
+        async def scenario(db, counter):
+            prepare = lambda d: {**d, **importer.identity_fields(d)}
+            first, _ = await importer.import_csv(io.StringIO(body), db.companies, "e1", prepare=prepare, mode="upsert")
+            bosch = await db.companies.find_one({"name": "Bosch GmbH"})
+            await db.companies.update_one({"_id": bosch["_id"]}, {"$set": {"shortlist_stage": "engaging"}})
+            again, _ = await importer.import_csv(io.StringIO(body), db.companies, "e1", prepare=prepare, mode="upsert")
+            changed, _ = await importer.import_csv(io.StringIO(body.replace("88000", "90000")), db.companies, "e1",
+                                                   prepare=prepare, mode="upsert")
+            after = await db.companies.find_one({"name": "Bosch GmbH"})
+            return first, again, changed, bosch, after, await db.companies.count_documents({})
+        first, again, changed, bosch, after, total = run_db(scenario)
+        assert (first["inserted"], first["unchanged"]) == (2, 1)
+        assert (again["inserted"], again["updated"], again["unchanged"]) == (0, 0, 3)
+        assert (changed["updated"], changed["unchanged"]) == (1, 2)
+        assert total == 2 and after["id"] == bosch["id"] and after["revenue"] == 90000.0
+        assert after["shortlist_stage"] == "engaging"
+        print("✓ Upsert re-import keeps ids and skips unchanged rows")
+
+    def test_concurrent_upserts_do_not_duplicate(self, run_db):
+        body = "name,booth\n" + "".join(f"Co {i},B{i}\n" for i in range(300))
+        async def scenario(db, counter):
+            await db.companies.create_index([("expo_id", 1), ("import_key", 1)], unique=True,
+                                            partialFilterExpression={"import_key": {"$type": "string"}})
+            prepare = lambda d: {**d, **importer.identity_fields(d)}
+            runs = await asyncio.gather(*(importer.import_csv(io.StringIO(body), db.companies, "e1", prepare=prepare,
+                                                              mode="upsert", batch_size=50) for _ in range(3)))
+            dup, _ = await importer.import_csv(io.StringIO(body), db.companies, "e1", prepare=prepare)
+            return [s for s, _ in runs], dup, await db.companies.count_documents({})
+        runs, dup, total = run_db(scenario)
+        assert total == 300 and sum(s["inserted"] for s in runs) == 300
+        assert all(not s["errors"] for s in runs)
+        assert dup["inserted"] == 0 and dup["rejected"] == 300 and "mode=upsert" in dup["errors"][0]["error"]
+        print("✓ Concurrent upsert imports insert each company once")
+
+
+class TestParallelImport:
+    """importer.split_chunks / parse_chunk / import_csv_parallel"""
+
+    BODY = "name,booth,contacts\n" + "".join(f'Co {i},"Hall\nB{i}","[{{""name"": ""Ann""}}]"\n' if i % 50 else f",B{i},\n"
+                                            for i in range(1, 1001))
+
+    @pytest.fixture
+    def path(self, tmp_path):
+        p = tmp_path / "import.csv"
+        p.write_text("\ufeff" + self.BODY, encoding="utf-8")
+        return str(p)
+
+    def test_chunks_cover_rows_on_boundaries(self, path):
+        header, chunks = importer.split_chunks(path, 2048)
+        assert header == ["name", "booth", "contacts"] and len(chunks) > 5
+        assert all(a[1] == b[0] for a, b in zip(chunks, chunks[1:]))
+        assert sum(importer.parse_chunk(path, s, e, header, "e1", "now")[0] for s, e in chunks) == 1000
+        print("✓ Chunks split on row boundaries, never inside quoted fields")
+
+    def test_process_workers_not_forked(self):
+        # The server is multi-threaded (Motor, pymongo monitors), so workers start from a clean interpreter
+        pool = BoundedPool("test", kind="process", workers=1)
+        try:
+            doc = asyncio.run(pool.run(documents.prepare_company, {"name": "Bosch", "booth": "Hall 2", "industry": "Tools"}))
+            method = pool._pool()._mp_context.get_start_method()
+        finally:
+            pool.shutdown()
+        assert method in ("forkserver", "spawn")
+        assert doc["import_key"] == importer.identity_fields({"name": "Bosch", "booth": "Hall 2"})["import_key"]
+        assert doc["industry_key"] == "tools" and doc["search_name"] == "bosch"
+        print(f"✓ Import workers start with {method} and prepare rows without the app")
+
+    def test_parallel_matches_sequential(self, path, run_db):
+        async def scenario(db, counter):
+            pool = BoundedPool("test", kind="thread", workers=2)
+            try:
+                stats, preview = await importer.import_csv_parallel(path, db.companies, "e1", pool, chunk_bytes=2048, batch_size=100)
+            finally:
+                pool.shutdown()
+            seq, _ = await importer.import_csv(io.StringIO(self.BODY), db.seq, "e1")
+            return stats, preview, seq, await db.companies.find_one({"name": "Co 7"}), await db.companies.count_documents({})
+        stats, preview, seq, doc, stored = run_db(scenario)
+        assert (stats["rows"], stats["inserted"], stats["rejected"]) == (seq["rows"], seq["inserted"], seq["rejected"])
+        assert stats["errors"] == seq["errors"] and stored == stats["inserted"] == 980
+        assert doc["booth"] == "Hall\nB7" and doc["contacts"] == [{"name": "Ann"}]
+        assert [d["name"] for d in preview] == ["Co 1", "Co 2", "Co 3"]
+        print("✓ Parallel import matches the sequential path")
+
+    def test_raw_documents_counted(self):
+        class RawLikeInsert:
+            # pymongo reports no inserted_ids for RawBSONDocuments
+            async def insert_many(self, docs, ordered=True):
+                return InsertManyResult([], True)
+        stats = importer.new_stats()
+        docs = [RawBSONDocument(bson.encode({"name": f"Co {i}"})) for i in range(3)]
+        asyncio.run(importer.insert_batch(RawLikeInsert(), docs, [2, 3, 4], stats))
+        assert stats["inserted"] == 3 and stats["batches"] == 1
+        print("✓ Inserted rows counted from the batch, not inserted_ids")
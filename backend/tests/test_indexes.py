@@ -0,0 +1,92 @@
+"""
+Index manifest tests: every query shape the routers issue must be planned
+as an index scan once the startup indexes exist.
+"""
+
+
+class TestIndexes:
+    """server.INDEXES / server.QUERY_SHAPES"""
+
+    def test_no_collscan_plans(self, run_db, server):
+        """Explain each declared query shape against a populated database"""
+        async def scenario(db, counter):
+            await server.ensure_indexes()
+            for coll in server.INDEXES:
+                await db[coll].insert_one({"id": f"{coll}-probe", "user_id": "u", "expo_id": "e", "email": f"{coll}@probe"})
+            return await server.audit_query_plans()
+        bad = run_db(scenario)
+        assert bad == [], f"COLLSCAN plans: {bad}"
+        print(f"✓ {len(server.QUERY_SHAPES)} query shapes use indexes")
+
+    def test_ensure_indexes_idempotent(self, run_db, server):
+        async def scenario(db, counter):
+            await server.ensure_indexes()
+            await server.ensure_indexes()
+            return {c: await db[c].index_information() for c in server.INDEXES}
+        info = run_db(scenario)
+        assert info["users"]["email_1"]["unique"] is True
+        assert ("user_id", 1) in info["shortlists"]["user_id_1_company_id_1_expo_id_1"]["key"]
+        # Leads with import_key so the startup backfill's {"import_key": {"$exists": False}} scan is indexed
+        assert info["companies"]["import_key_1_expo_id_1"]["key"][0] == ("import_key", 1)
+        print("✓ Startup index bootstrap is idempotent")
+
+    def test_shapes_cover_helpers(self, server):
+        """Shapes come from the routes' query helpers, aggregates and distincts included"""
+        shapes = server.QUERY_SHAPES
+        assert {"collection": "expos", "filter": {}, "sort": [("_id", 1)]} in shapes
+        assert {"collection": "shortlists", "filter": {"updated_at": {"$exists": False}}, "sort": None} in shapes
+        assert {"collection": "companies", "distinct": "industry", "filter": {}} in shapes
+        pipelines = [s["pipeline"] for s in shapes if "pipeline" in s]
+        assert any("search_grams" in p[0].get("$match", {}) for p in pipelines)
+        assert all(p[0]["$match"].get("expo_id") for p in pipelines if "$facet" in p[-1])
+        assert len({repr(s) for s in shapes}) == len(shapes)
+        print(f"✓ {len(shapes)} generated query shapes, {len(pipelines)} of them aggregates")
+
+
+class TestDuplicateCompanies:
+    """server.startup / dedupe_companies on companies stored twice before the unique import key"""
+
+    def seed(self, server, keyed):
+        key = server.prepare_company if keyed else dict
+        async def seed(db):
+            await db.expos.insert_one({"id": "e1", "name": "IFA", "company_count": 3})
+            await db.companies.insert_many([key({"id": "c1", "expo_id": "e1", "name": "Bosch", "booth": "Hall 2", "shortlist_stage": "none"}),
+                                            key({"id": "c2", "expo_id": "e1", "name": "Bosch", "booth": "Hall 2", "shortlist_stage": "engaging"}),
+                                            key({"id": "c3", "expo_id": "e1", "name": "Miele", "booth": "Hall 4"})])
+            await db.shortlists.insert_many([{"id": "s1", "user_id": "u", "company_id": "c1", "expo_id": "e1"},
+                                             {"id": "s2", "user_id": "u", "company_id": "c2", "expo_id": "e1"},
+                                             {"id": "s3", "user_id": "v", "company_id": "c2", "expo_id": "e1"}])
+            await db.networks.insert_one({"id": "n1", "user_id": "u", "company_id": "c2", "expo_id": "e1"})
+        return seed
+
+    def run_startup(self, run_db, server, monkeypatch, seed, before=None):
+        monkeypatch.setenv("EVENTS_SOURCE", "local")
+        async def scenario(db, counter):
+            if before: await before(db)
+            await seed(db)
+            await server.startup()
+            server.EVENTS.close()
+            companies = await db.companies.find({}, {"_id": 0}).sort("id", 1).to_list(None)
+            shortlists = {s["id"]: s["company_id"] for s in await db.shortlists.find().to_list(None)}
+            return (companies, shortlists, (await db.networks.find_one({"id": "n1"}))["company_id"],
+                    await db.tombstones.count_documents({"id": "s2"}), (await db.expos.find_one({"id": "e1"}))["company_count"],
+                    await db.companies.index_information())
+        return run_db(scenario)
+
+    def assert_merged(self, result):
+        companies, shortlists, network, tombstones, count, indexes = result
+        assert [c["id"] for c in companies] == ["c1", "c3"] and all(c.get("import_key") for c in companies)
+        assert companies[0]["shortlist_stage"] == "engaging"
+        assert shortlists == {"s1": "c1", "s3": "c1"} and tombstones == 1 and network == "c1"
+        assert count == 2 and indexes["expo_id_1_import_key_1"]["unique"] is True
+
+    def test_legacy_duplicates_merged_at_startup(self, run_db, server, monkeypatch):
+        # The partial unique index builds over unkeyed rows, so the backfill collides instead of failing startup
+        self.assert_merged(self.run_startup(run_db, server, monkeypatch, self.seed(server, keyed=False),
+                                            before=lambda db: server.ensure_indexes()))
+        print("✓ Unkeyed duplicates are merged into the oldest copy at startup")
+
+    def test_keyed_duplicates_unblock_unique_index(self, run_db, server, monkeypatch):
+        # Already backfilled: the unique index cannot build until the duplicates are merged
+        self.assert_merged(self.run_startup(run_db, server, monkeypatch, self.seed(server, keyed=True)))
+        print("✓ Keyed duplicates are merged and the unique index is created")
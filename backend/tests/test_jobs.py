@@ -0,0 +1,73 @@
+"""
+Background job tests: bounded concurrency and persisted progress (jobs.JobManager)
+"""
+import asyncio
+import jobs
+from jobs import JobManager
+
+
+class TestJobManager:
+    """jobs.JobManager"""
+
+    def test_concurrency_cap_and_progress(self, run_db):
+        async def scenario(db, counter):
+            manager = JobManager(lambda: db.import_jobs, max_concurrent=2, progress_interval=0)
+            gate, peak = asyncio.Event(), []
+            async def work(report):
+                peak.append(manager.running)
+                await report({"stats": {"rows": 5}}, progress=0.5)
+                await gate.wait()
+                return {"inserted": 10}
+            ids = [await manager.submit("test", work, {"user_id": "u"}) for _ in range(3)]
+            await asyncio.sleep(0.05)
+            during = [(await manager.get(j))["status"] for j in ids]
+            mid = await manager.get(ids[0])
+            gate.set()
+            await manager.wait()
+            return during, mid, [await manager.get(j) for j in ids], max(peak)
+        during, mid, done, peak = run_db(scenario)
+        assert sorted(during) == ["queued", "running", "running"] and peak <= 2
+        assert mid["progress"] == 0.5 and mid["stats"] == {"rows": 5} and mid["eta_seconds"] is not None
+        assert all(j["status"] == "done" and j["result"] == {"inserted": 10} for j in done)
+        print("✓ At most max_concurrent jobs run; progress is persisted")
+
+    def test_failure_recorded(self, run_db):
+        async def scenario(db, counter):
+            manager = JobManager(lambda: db.import_jobs, max_concurrent=1)
+            async def boom(report): raise RuntimeError("bad file")
+            jid = await manager.submit("test", boom)
+            await manager.wait()
+            return await manager.get(jid)
+        job = run_db(scenario)
+        assert job["status"] == "failed" and job["error"] == "bad file"
+        print("✓ Failed job reports its error")
+
+    def test_cancel_while_queued_fails_and_cleans_up(self, run_db):
+        async def scenario(db, counter):
+            manager = JobManager(lambda: db.import_jobs, max_concurrent=1)
+            gate, cleaned = asyncio.Event(), []
+            async def work(report): await gate.wait()
+            ids = [await manager.submit("test", work, cleanup=lambda i=i: cleaned.append(i)) for i in range(2)]
+            await asyncio.sleep(0.05)
+            await manager.shutdown()
+            return [await manager.get(j) for j in ids], cleaned, manager.running
+        jobs, cleaned, running = run_db(scenario)
+        assert [j["status"] for j in jobs] == ["failed", "failed"] and all(j["error"] == "cancelled" for j in jobs)
+        assert sorted(cleaned) == [0, 1] and running == 0
+        print("✓ Cancelled jobs, queued or running, are marked failed and cleaned up")
+
+    def test_recover_fails_orphaned_jobs(self, run_db):
+        async def scenario(db, counter):
+            manager = JobManager(lambda: db.import_jobs, heartbeat_interval=30)
+            fresh, stale = jobs._now(), "2020-01-01T00:00:00+00:00"
+            await db.import_jobs.insert_many([
+                {"id": "mine", "status": "running", "worker": jobs.WORKER_ID, "heartbeat_at": fresh},
+                {"id": "stale", "status": "queued", "worker": "other:1", "heartbeat_at": stale},
+                {"id": "legacy", "status": "running", "worker": "other:2"},
+                {"id": "alive", "status": "running", "worker": "other:3", "heartbeat_at": fresh},
+                {"id": "done", "status": "done", "worker": jobs.WORKER_ID, "heartbeat_at": stale}])
+            n = await manager.recover()
+            return n, {j["id"]: j["status"] async for j in db.import_jobs.find({}, {"_id": 0, "id": 1, "status": 1})}
+        n, status = run_db(scenario)
+        assert n == 3 and status == {"mine": "failed", "stale": "failed", "legacy": "failed", "alive": "running", "done": "done"}
+        print("✓ recover() fails jobs left by a stopped worker and keeps live ones")
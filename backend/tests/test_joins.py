@@ -0,0 +1,64 @@
+"""
+Join layer tests: list endpoints must resolve company/expo references with a
+constant number of Mongo commands, independent of the number of rows.
+"""
+import uuid
+from fastapi import Response
+
+USER = {"id": "join-test-user", "email": "join@test.com", "name": "Join", "role": "user"}
+
+
+async def populate(db, n):
+    eid = str(uuid.uuid4())
+    await db.expos.insert_one({"id": eid, "name": "Join Expo", "region": "Europe", "industry": "Tech"})
+    companies = [{"id": str(uuid.uuid4()), "expo_id": eid, "name": f"Co {i}", "shortlist_stage": "prospecting"} for i in range(n)]
+    await db.companies.insert_many(companies)
+    rows = [{"id": str(uuid.uuid4()), "user_id": USER["id"], "company_id": c["id"], "expo_id": eid} for c in companies]
+    await db.shortlists.insert_many([dict(r) for r in rows])
+    await db.networks.insert_many([{**r, "contact_name": "X", "status": "request_sent"} for r in rows])
+    await db.expo_days.insert_many([{**r, "time_slot": f"{i:04d}"} for i, r in enumerate(rows)])
+
+
+class TestBatchedJoins:
+    """get_shortlists / get_networks / get_expo_days / export_csv"""
+
+    def commands_for(self, run_db, server, n, call):
+        async def scenario(db, counter):
+            await populate(db, n)
+            counter.reset()
+            result = await call(server)
+            return len(counter.commands), result
+        return run_db(scenario)
+
+    def assert_constant(self, run_db, server, call):
+        small, res_small = self.commands_for(run_db, server, 3, call)
+        large, res_large = self.commands_for(run_db, server, 60, call)
+        assert small == large, f"command count grew with N: {small} -> {large}"
+        return res_small, res_large
+
+    def test_shortlists_constant_commands(self, run_db, server):
+        _, sls = self.assert_constant(run_db, server, lambda s: s.get_shortlists(stage=None, expo_id=None, response=Response(), user=USER))
+        assert len(sls) == 60
+        assert all("company" in sl and "expo" in sl for sl in sls)
+        print("✓ /shortlists join is O(1) in round trips")
+
+    def test_shortlists_stage_filter(self, run_db, server):
+        _, sls = self.assert_constant(run_db, server, lambda s: s.get_shortlists(stage="engaging", expo_id=None, response=Response(), user=USER))
+        assert sls == []
+        print("✓ /shortlists stage filter runs in the query")
+
+    def test_networks_constant_commands(self, run_db, server):
+        _, nets = self.assert_constant(run_db, server, lambda s: s.get_networks(expo_id=None, status=None, response=Response(), user=USER))
+        assert all(n["company"]["name"].startswith("Co ") for n in nets)
+        print("✓ /networks join is O(1) in round trips")
+
+    def test_expo_days_constant_commands(self, run_db, server):
+        _, eds = self.assert_constant(run_db, server, lambda s: s.get_expo_days(expo_id=None, response=Response(), user=USER))
+        assert [e["time_slot"] for e in eds] == sorted(e["time_slot"] for e in eds)
+        print("✓ /expo-days join is O(1) in round trips")
+
+    def test_export_constant_commands(self, run_db, server):
+        _, out = self.assert_constant(run_db, server, lambda s: s.export_csv("shortlists", expo_id=None, user=USER))
+        assert "company_name" in out["csv_data"].splitlines()[0]
+        assert "Join Expo" in out["csv_data"]
+        print("✓ /export join is O(1) in round trips")
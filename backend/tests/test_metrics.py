@@ -0,0 +1,60 @@
+"""
+Prometheus exposition tests: histogram buckets, label escaping and the request middleware
+"""
+import asyncio
+import httpx
+from fastapi import FastAPI
+import metrics
+
+
+class TestExposition:
+    """metrics.Counter / Gauge / Histogram / Registry"""
+
+    def test_histogram_is_cumulative(self):
+        h = metrics.Histogram("lat", "Latency", ("route",), buckets=(0.1, 1.0))
+        for v in (0.05, 0.1, 0.5, 3.0): h.observe(v, "/x")
+        lines = list(h.render())
+        assert 'lat_bucket{route="/x",le="0.1"} 2' in lines and 'lat_bucket{route="/x",le="1.0"} 3' in lines
+        assert 'lat_bucket{route="/x",le="+Inf"} 4' in lines and 'lat_count{route="/x"} 4' in lines
+        assert 'lat_sum{route="/x"} 3.65' in lines
+        print("✓ Histogram buckets are cumulative with +Inf, sum and count")
+
+    def test_labels_escaped(self):
+        c = metrics.Counter("hits", "Hits", ("path",))
+        c.inc('a"b\\c')
+        assert list(c.render())[-1] == 'hits{path="a\\"b\\\\c"} 1'
+        print("✓ Label values escaped")
+
+    def test_collectors_run_at_scrape(self):
+        reg, calls = metrics.Registry(), []
+        @reg.collect
+        def scrape():
+            calls.append(1)
+            g = metrics.Gauge("queue", "Queue depth")
+            g.set(value=len(calls))
+            return [g]
+        assert "queue 1" in reg.render() and "queue 2" in reg.render()
+        print("✓ Collectors evaluated on every scrape")
+
+
+class TestMetricsMiddleware:
+    """metrics.MetricsMiddleware"""
+
+    def test_records_route_status_and_size(self):
+        reg, app = metrics.Registry(), FastAPI()
+
+        @app.get("/items/{iid}")
+        async def item(iid: str):
+            return {"id": iid}
+
+        app.add_middleware(metrics.MetricsMiddleware, registry=reg)
+        async def go():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://t") as http:
+                await http.get("/items/1"); await http.get("/items/2"); await http.get("/missing")
+        asyncio.run(go())
+        text = reg.render()
+        assert 'http_requests_total{method="GET",route="/items/{iid}",status="200"} 2' in text
+        assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in text
+        assert 'http_response_size_bytes_sum{method="GET",route="/items/{iid}"} 20.0' in text
+        assert 'http_requests_in_flight{method="GET"} 0' in text
+        print("✓ Requests counted per route template with status and body size")
@@ -0,0 +1,107 @@
+"""
+Keyset pagination tests: walking X-Next-Cursor must return every row exactly
+once, in sort order, with no page-size truncation.
+"""
+import pytest
+from fastapi import HTTPException, Response
+
+USER = {"id": "page-test-user", "email": "page@test.com", "name": "Page", "role": "user"}
+
+
+async def walk(call, limit):
+    rows, cursor, pages = [], None, 0
+    while True:
+        response = Response()
+        rows += await call(response=response, limit=limit, cursor=cursor)
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor: return rows, pages
+
+
+class TestKeysetPagination:
+    """/companies, /expo-days, /shortlists?stage=, cursor validation"""
+
+    def test_companies_walk_all_pages(self, run_db, server):
+        async def scenario(db, counter):
+            await db.expos.insert_one({"id": "e1", "name": "Expo", "company_count": 1205})
+            await db.companies.insert_many([{"id": f"c{i}", "expo_id": "e1", "name": f"Co {i}"} for i in range(1205)])
+            rows, pages = await walk(lambda **kw: server.get_companies(expo_id="e1", **kw), 100)
+            response = Response()
+            await server.get_companies(expo_id="e1", response=response, limit=10, with_total=True)
+            return rows, pages, response.headers["X-Total-Count"]
+        rows, pages, total = run_db(scenario)
+        assert len(rows) == 1205 and len({r["id"] for r in rows}) == 1205
+        assert pages == 13 and total == "1205"
+        assert all("_id" not in r for r in rows)
+        print("✓ /companies pages past the old 500-row cap")
+
+    def test_expo_days_keyset_on_time_slot(self, run_db, server):
+        async def scenario(db, counter):
+            await db.expo_days.insert_many([{"id": f"d{i}", "user_id": USER["id"], "expo_id": "e1", "company_id": "c",
+                                             "time_slot": f"{i % 7:02d}:00"} for i in range(50)])
+            return await walk(lambda **kw: server.get_expo_days(expo_id=None, user=USER, **kw), 6)
+        rows, _ = run_db(scenario)
+        slots = [r["time_slot"] for r in rows]
+        assert len({r["id"] for r in rows}) == 50 and slots == sorted(slots)
+        print("✓ /expo-days cursor handles duplicate time slots")
+
+    def test_shortlist_stage_filtered_before_limit(self, run_db, server):
+        async def scenario(db, counter):
+            await db.companies.insert_many([{"id": f"c{i}", "expo_id": "e1", "name": f"Co {i}",
+                                             "shortlist_stage": "engaging" if i % 3 == 0 else "prospecting"} for i in range(30)])
+            await db.shortlists.insert_many([{"id": f"s{i}", "user_id": USER["id"], "expo_id": "e1", "company_id": f"c{i}"}
+                                             for i in range(30)])
+            pages = []
+            async def call(**kw):
+                pages.append(await server.get_shortlists(stage="engaging", expo_id="e1", user=USER, **kw))
+                return pages[-1]
+            rows, _ = await walk(call, 4)
+            return rows, [len(p) for p in pages]
+        rows, sizes = run_db(scenario)
+        assert [r["id"] for r in rows] == [f"s{i}" for i in range(0, 30, 3)]
+        assert sizes == [4, 4, 2] and all(r["company"]["shortlist_stage"] == "engaging" for r in rows)
+        print("✓ /shortlists?stage= pages are full and the cursor ends with the matches")
+
+    def test_invalid_cursor_rejected(self, server):
+        with pytest.raises(HTTPException) as exc:
+            server.decode_cursor("not-a-cursor", server.ID_KEY)
+        assert exc.value.status_code == 400
+        print("✓ Invalid cursor returns 400")
+
+
+class TestCompanyFacets:
+    """/companies/facets: keyset page, per-facet counts and revenue buckets in one $facet"""
+
+    INDUSTRIES, HQS = ("AI", "Bio", "Chem"), ("Berlin", "Paris")
+
+    def company(self, server, i, expo_id="e1"):
+        return server.prepare_company({"id": f"c{i}", "expo_id": expo_id, "name": f"Co {i}", "revenue": i,
+                                       "industry": self.INDUSTRIES[i % 3], "hq": self.HQS[i % 2]})
+
+    def test_page_counts_and_buckets(self, run_db, server):
+        async def scenario(db, counter):
+            await db.companies.insert_many([self.company(server, i) for i in range(60)] +
+                                           [self.company(server, i, "e2") for i in range(60, 80)])
+            pages, cursor = [], None
+            while True:
+                page = await server.facet_page("e1", "ai", "Berlin", "exact", 12, None, 3, cursor, 4)
+                pages.append(page)
+                cursor = page["next_cursor"]
+                if not cursor: return pages
+        pages = run_db(scenario)
+        rows = [c for p in pages for c in p["items"]]
+        want = [i for i in range(12, 60) if i % 6 == 0]  # AI, Berlin, revenue >= 12 in e1
+        assert [c["id"] for c in rows] == [f"c{i}" for i in want] and len(pages) == 3
+        assert all(p["total"] == len(want) for p in pages)
+        assert all("import_key" not in c and "industry_key" not in c for c in rows)
+        facets = pages[0]["facets"]
+        # Each facet drops only its own filter: industries ignore industry=ai, hqs ignore hq=Berlin
+        assert facets["industries"] == [{"value": v, "count": sum(1 for i in range(12, 60) if i % 2 == 0 and i % 3 == k)}
+                                        for k, v in enumerate(self.INDUSTRIES)]
+        assert {f["value"]: f["count"] for f in facets["hqs"]} == {"Berlin": 8, "Paris": 8}
+        # Revenue buckets ignore the revenue filter: AI + Berlin revenues 0, 6, ..., 54 in 4 buckets
+        buckets = facets["revenue"]
+        assert sum(b["count"] for b in buckets) == 10 and len(buckets) == 4
+        assert buckets[0]["min"] == 0 and buckets[-1]["max"] == 54
+        assert all(a["max"] == b["min"] for a, b in zip(buckets, buckets[1:]))
+        print("✓ /companies/facets pages by cursor; each facet's counts leave out its own filter")
@@ -0,0 +1,53 @@
+"""
+Search ranking tests (pure functions in search.py, no database needed)
+"""
+import search
+
+SIEMENS = {"name": "Siemens AG", "industry": "Electronics", "hq": "Munich, Germany",
+           "contacts": [{"name": "Klaus Weber"}, {"name": "Anna Fischer"}]}
+SAMSUNG = {"name": "Samsung Electronics", "industry": "Consumer Electronics", "hq": "Seoul, South Korea", "contacts": []}
+MIELE = {"name": "Miele & Cie", "industry": "Home Appliances", "hq": "Gütersloh, Germany", "contacts": []}
+
+
+class TestSearchIndexFields:
+    """search.index_fields"""
+
+    def test_prefixes_cover_all_fields(self):
+        keys = set(search.index_fields(SIEMENS)["search_prefixes"])
+        assert {"s", "sie", "siemens", "elec", "munich", "klaus", "fisc"} <= keys
+        print("✓ Prefixes cover name, industry, hq and contacts")
+
+    def test_accents_folded(self):
+        assert "gutersloh" in search.index_fields(MIELE)["search_prefixes"]
+        assert search.tokenize("Gütersloh") == ["gutersloh"]
+        print("✓ Accents folded at index and query time")
+
+    def test_long_query_token_uses_capped_prefix(self):
+        pf = search.prefix_filter("Electronics")
+        assert pf == {"search_prefixes": {"$all": ["electronic"]}}
+        assert search.prefix_filter("  ") is None
+        print("✓ Query tokens capped at MAX_PREFIX")
+
+    def test_name_start_pattern(self):
+        assert search.index_fields(MIELE)["search_name"] == "miele cie"
+        assert search.name_start_pattern("Miele &  C").pattern == "^miele c"
+        assert search.name_start_pattern(" & ") is None
+        print("✓ Name-start pattern matches the normalized search_name")
+
+
+class TestSearchRanking:
+    """search.rank"""
+
+    def test_name_beats_industry(self):
+        ranked = search.rank([SIEMENS, SAMSUNG], "electronics")
+        assert [d["name"] for d in ranked] == ["Samsung Electronics", "Siemens AG"]
+        print("✓ Name match ranks above industry match")
+
+    def test_all_tokens_required_in_prefix_mode(self):
+        assert search.rank([SIEMENS, SAMSUNG], "samsung munich") == []
+        print("✓ Prefix mode requires every token")
+
+    def test_fuzzy_tolerates_typos(self):
+        assert search.rank([SIEMENS, SAMSUNG, MIELE], "seimens") == []
+        assert [d["name"] for d in search.rank([SIEMENS, SAMSUNG, MIELE], "seimens", fuzzy=True)] == ["Siemens AG"]
+        print("✓ Fuzzy mode matches transposed letters")
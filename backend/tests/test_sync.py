@@ -0,0 +1,71 @@
+"""
+Delta sync tests: updated_at stamping, tombstones and GET /api/sync tokens
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+import pytest
+from fastapi import HTTPException
+
+USER = {"id": "sync-test-user", "email": "sync@test.com", "name": "Sync", "role": "user"}
+OTHER = {**USER, "id": "sync-other-user"}
+
+
+@pytest.fixture
+def no_settle(server):
+    prev, server.SYNC_SETTLE = server.SYNC_SETTLE, timedelta(0)
+    yield
+    server.SYNC_SETTLE = prev
+
+
+async def tick():
+    await asyncio.sleep(0.005)  # tokens have millisecond resolution
+
+
+class TestDeltaSync:
+    """server.sync / tombstone / backfill_updated_at"""
+
+    def test_changes_since_token(self, run_db, server, no_settle):
+        async def scenario(db, counter):
+            await db.companies.insert_one({"id": "c1", "expo_id": "e1", "name": "Co 1"})
+            first = await server.sync(since=None, user=USER)
+            await tick()
+            sl = await server.create_shortlist(server.ShortlistIn(company_id="c1", expo_id="e1"), user=USER)
+            net = await server.create_network(server.NetworkIn(company_id="c1", expo_id="e1", contact_name="Ann"), user=USER)
+            await server.create_network(server.NetworkIn(company_id="c1", expo_id="e1", contact_name="Bob"), user=OTHER)
+            await tick()
+            second = await server.sync(since=first["token"], user=USER)
+            await tick()
+            await server.update_network(net["id"], status="completed", meeting_type=None, scheduled_time=None, notes=None,
+                                        contact_name=None, contact_role=None, user=USER)
+            await server.delete_shortlist(sl["id"], user=USER)
+            await tick()
+            third = await server.sync(since=second["token"], user=USER)
+            await tick()
+            quiet = await server.sync(since=third["token"], user=USER)
+            return first, second, third, quiet, sl["id"], net["id"]
+        first, second, third, quiet, sid, nid = run_db(scenario)
+        assert first["reset"] and not second["reset"]
+        assert all(not c["upserted"] for c in first["changes"].values())
+        assert [s["id"] for s in second["changes"]["shortlists"]["upserted"]] == [sid]
+        assert [n["contact_name"] for n in second["changes"]["networks"]["upserted"]] == ["Ann"]
+        assert second["changes"]["networks"]["upserted"][0]["company"]["name"] == "Co 1"
+        assert third["changes"]["shortlists"] == {"upserted": [], "deleted": [sid]}
+        assert [(n["id"], n["status"]) for n in third["changes"]["networks"]["upserted"]] == [(nid, "completed")]
+        assert all(c == {"upserted": [], "deleted": []} for c in quiet["changes"].values())
+        print("✓ Sync returns only this user's creates, updates and deletions since the token")
+
+    def test_reset_and_invalid_tokens(self, run_db, server, no_settle):
+        async def scenario(db, counter):
+            await db.expo_days.insert_one({"id": "d1", "user_id": USER["id"], "expo_id": "e1", "company_id": "c1",
+                                           "time_slot": "09:00", "created_at": "2026-01-01T09:00:00+00:00"})
+            stale = server.encode_sync_token(datetime.now(timezone.utc) - server.TOMBSTONE_TTL - timedelta(days=1))
+            reset = await server.sync(since=stale, user=USER)
+            backfilled = await server.backfill_updated_at()
+            return reset, backfilled, await db.expo_days.find_one({"id": "d1"})
+        reset, backfilled, doc = run_db(scenario)
+        assert reset["reset"] and [d["id"] for d in reset["changes"]["expo_days"]["upserted"]] == ["d1"]
+        assert backfilled["expo_days"] == 1 and doc["updated_at"].replace(tzinfo=timezone.utc) == datetime(2026, 1, 1, 9, tzinfo=timezone.utc)
+        with pytest.raises(HTTPException) as exc:
+            server.decode_sync_token("garbage")
+        assert exc.value.status_code == 400
+        print("✓ Expired tokens reset; pre-sync documents backfilled from created_at")
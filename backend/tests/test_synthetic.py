@@ -0,0 +1,39 @@
+"""
+Synthetic dataset tests: determinism and referential integrity of the scale seed
+"""
+import synthetic
+
+
+def activity(seed, users=200, expos=10, per_expo=500):
+    return [pair for u in range(users) for pair in synthetic.activity_docs(seed, u, expos, per_expo)]
+
+
+class TestSyntheticData:
+    """synthetic.*_docs generators"""
+
+    def test_same_seed_same_documents(self):
+        assert list(synthetic.company_docs(7, 3, 50)) == list(synthetic.company_docs(7, 3, 50))
+        assert activity(7) == activity(7)
+        assert list(synthetic.company_docs(7, 3, 50)) != list(synthetic.company_docs(8, 3, 50))
+        print("✓ Generation is deterministic per seed")
+
+    def test_activity_references_generated_docs(self):
+        expos = {e["id"] for e in synthetic.expo_docs(7, 10, 500)}
+        companies = {c["id"] for e in range(10) for c in synthetic.company_docs(7, e, 500)}
+        users = {u["id"] for u in synthetic.user_docs(7, 200, "x")}
+        docs = activity(7)
+        assert all(d["expo_id"] in expos and d["company_id"] in companies and d["user_id"] in users for _, d in docs)
+        keys = [(d["user_id"], d["company_id"]) for name, d in docs if name == "shortlists"]
+        assert len(keys) == len(set(keys))
+        print("✓ Activity points at generated users, expos and companies, one shortlist per company")
+
+    def test_skewed_distributions(self):
+        docs = activity(7, users=500)
+        per_user = {}
+        for name, d in docs:
+            if name == "shortlists": per_user[d["user_id"]] = per_user.get(d["user_id"], 0) + 1
+        counts = sorted(per_user.values())
+        assert counts[len(counts) // 2] < 10 < counts[-1] <= synthetic.MAX_SHORTLIST
+        by_coll = {n: sum(1 for name, _ in docs if name == n) for n in ("shortlists", "networks", "expo_days")}
+        assert by_coll["shortlists"] > by_coll["networks"] > by_coll["expo_days"] > 0
+        print("✓ Long-tailed shortlists, fewer networks, fewer expo-day slots")
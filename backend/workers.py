@@ -0,0 +1,71 @@
+"""
+Bounded executors for CPU-bound work that must not run on the event loop.
+"""
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+POOL_KINDS = ("thread", "process", "inline")
+# Workers are never forked from the server: it runs Motor and pymongo threads, and a forked copy of a
+# lock one of them held can deadlock the child. forkserver/spawn children import only what they unpickle.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class BoundedPool:
+    """Runs blocking callables in a thread or process pool with at most `concurrency` jobs
+    submitted at once; extra callers wait on a semaphore and are reported as queued.
+    kind="inline" runs on the event loop (for benchmarking the old behaviour)."""
+
+    def __init__(self, name: str, kind: str = "thread", workers: int = 4, concurrency: int = None):
+        if kind not in POOL_KINDS: raise ValueError(f"pool kind must be one of {POOL_KINDS}")
+        self.name, self.kind, self.workers = name, kind, workers
+        self.concurrency = concurrency or workers
+        self._sem = asyncio.Semaphore(self.concurrency)
+        self._executor = None
+        self.queued = self.running = self.max_queued = 0
+        self.completed = self.failed = 0
+        self.wait_seconds = self.run_seconds = 0.0
+
+    def _pool(self):
+        if self._executor is None and self.kind != "inline":
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(START_METHOD))
+            else: self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    async def run(self, fn, *args):
+        t0 = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._sem.acquire()
+        finally:
+            self.queued -= 1
+        t1 = time.perf_counter()
+        self.wait_seconds += t1 - t0
+        self.running += 1
+        try:
+            if self.kind == "inline": result = fn(*args)
+            else: result = await asyncio.get_running_loop().run_in_executor(self._pool(), fn, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.running -= 1
+            self.run_seconds += time.perf_counter() - t1
+            self._sem.release()
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        done = self.completed + self.failed
+        return {"kind": self.kind, "workers": self.workers, "concurrency": self.concurrency, "queued": self.queued,
+                "max_queued": self.max_queued, "running": self.running, "completed": self.completed, "failed": self.failed,
+                "avg_wait_ms": round(self.wait_seconds / done * 1000, 2) if done else 0.0,
+                "avg_run_ms": round(self.run_seconds / done * 1000, 2) if done else 0.0}
@@ -77,6 +77,10 @@ export const api = {
     return formPut(`/companies/${cid}/stage`, fd);
   },
   getCompanyFilters: (expoId?: string) => request(`/companies/filters/options${expoId ? `?expo_id=${expoId}` : ''}`),
+  getCompanyFacets: (params: Record<string, string> = {}) => {
+    const qs = new URLSearchParams(params).toString();
+    return request(`/companies/facets${qs ? `?${qs}` : ''}`);
+  },
 
   // Shortlists
   getShortlists: (params: Record<string, string> = {}) => {
@@ -130,4 +134,14 @@ export const api = {
 
   // Seed
   seed: () => request('/seed', { method: 'POST' }),
+
+  // Delta sync: pass the token from the previous response; reset=true means replace local copies
+  sync: (since?: string) => request(`/sync${since ? `?since=${encodeURIComponent(since)}` : ''}`),
+
+  // Batch: several GETs in one round trip, e.g. batch(['/expos', '/expos/meta/filters']).
+  // Resolves to one { status, headers, body } per path, in order.
+  batch: async (paths: string[]) => {
+    const r = await request('/batch', { method: 'POST', body: JSON.stringify({ requests: paths.map(path => ({ path })) }) });
+    return r.responses as { id: string | null; status: number; headers: Record<string, string>; body: any }[];
+  },
 };